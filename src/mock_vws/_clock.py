@@ -0,0 +1,37 @@
+"""
+Tools for getting the time from the clock of the mock which is handling a
+request.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import datetime
+from contextvars import ContextVar
+from typing import Iterator
+
+from mock_vws.clock import Clock
+
+_ACTIVE_CLOCK: ContextVar[Clock] = ContextVar('active_clock', default=Clock())
+
+
+@contextlib.contextmanager
+def use_clock(clock: Clock) -> Iterator[None]:
+    """
+    Use the given clock for the time while in the context.
+
+    Args:
+        clock: The clock of the mock which is handling a request.
+    """
+    token = _ACTIVE_CLOCK.set(clock)
+    try:
+        yield
+    finally:
+        _ACTIVE_CLOCK.reset(token)
+
+
+def time_now() -> datetime.datetime:
+    """
+    Return the current time in the GMT time zone, as given by the clock in use.
+    """
+    return _ACTIVE_CLOCK.get().now()
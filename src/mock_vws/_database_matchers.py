@@ -11,6 +11,22 @@ from vws_auth_tools import authorization_header
 from mock_vws.database import VuforiaDatabase
 
 
+def get_access_key(request_headers: Dict[str, str]) -> str:
+    """
+    Return the access key given in the ``Authorization`` header of a request.
+
+    Args:
+        request_headers: The headers sent with the request.
+
+    Returns:
+        The access key, or an empty string if no access key is given.
+    """
+    auth_header = request_headers.get('Authorization', '')
+    first_part, _, _ = auth_header.partition(':')
+    _, _, access_key = first_part.partition(' ')
+    return access_key
+
+
 def get_database_matching_client_keys(
     request_headers: Dict[str, str],
     request_body: bytes | None,
@@ -36,8 +52,14 @@ def get_database_matching_client_keys(
     auth_header = request_headers.get('Authorization')
     content = request_body or b''
     date = request_headers.get('Date', '')
+    access_key = get_access_key(request_headers=request_headers)
 
     for database in databases:
+        # Only the database with the given access key can match, so we avoid
+        # computing a signature for any other database.
+        if database.client_access_key != access_key:
+            continue
+
         expected_authorization_header = authorization_header(
             access_key=database.client_access_key,
             secret_key=database.client_secret_key,
@@ -78,8 +100,14 @@ def get_database_matching_server_keys(
     auth_header = request_headers.get('Authorization')
     content = request_body or b''
     date = request_headers.get('Date', '')
+    access_key = get_access_key(request_headers=request_headers)
 
     for database in databases:
+        # Only the database with the given access key can match, so we avoid
+        # computing a signature for any other database.
+        if database.server_access_key != access_key:
+            continue
+
         expected_authorization_header = authorization_header(
             access_key=database.server_access_key,
             secret_key=database.server_secret_key,
@@ -0,0 +1,99 @@
+"""
+A server which serves the target manager, VWS and VWQ applications from one
+process.
+
+The VWS and VWQ applications use the target manager's databases directly,
+rather than over HTTP.
+"""
+
+import os
+from typing import Any, Callable, Dict, Iterable
+
+from flask import Flask
+
+from mock_vws._flask_server.target_manager import TARGET_MANAGER_FLASK_APP
+from mock_vws._flask_server.target_manager_backends import (
+    InProcessTargetManagerBackend,
+)
+from mock_vws._flask_server.vwq import CLOUDRECO_FLASK_APP
+from mock_vws._flask_server.vws import VWS_FLASK_APP
+from mock_vws._flask_server.wsgi_server import GunicornServer, bind_address
+
+
+def use_in_process_target_manager() -> None:
+    """
+    Make the VWS and VWQ applications use the target manager's databases in
+    this process.
+    """
+    backend = InProcessTargetManagerBackend()
+    VWS_FLASK_APP.config['TARGET_MANAGER_BACKEND'] = backend
+    CLOUDRECO_FLASK_APP.config['TARGET_MANAGER_BACKEND'] = backend
+
+
+def dispatch_by_port(
+    apps_by_port: Dict[int, Flask],
+) -> Callable[..., Iterable[bytes]]:
+    """
+    Get a WSGI application which sends each request to the application for
+    the port which the request was made to.
+
+    Args:
+        apps_by_port: The application to use for requests to each port.
+
+    Returns:
+        The WSGI application.
+    """
+
+    def app(
+        environ: Dict[str, Any],
+        start_response: Callable[..., Any],
+    ) -> Iterable[bytes]:
+        """
+        Handle a request with the application for its port.
+        """
+        port_app = apps_by_port[int(environ['SERVER_PORT'])]
+        response: Iterable[bytes] = port_app(environ, start_response)
+        return response
+
+    return app
+
+
+def main() -> None:  # pragma: no cover
+    """
+    Serve the target manager, VWS and VWQ applications until this process is
+    sent ``SIGTERM`` or ``SIGINT``.
+    """
+    host = os.environ.get('SERVER_HOST', '0.0.0.0')
+    apps_by_port = {
+        int(os.environ.get('TARGET_MANAGER_PORT', '5000')): (
+            TARGET_MANAGER_FLASK_APP
+        ),
+        int(os.environ.get('VWS_PORT', '5001')): VWS_FLASK_APP,
+        int(os.environ.get('VWQ_PORT', '5002')): CLOUDRECO_FLASK_APP,
+    }
+
+    def load_app() -> Callable[..., Iterable[bytes]]:
+        """
+        Give the application which serves all of the applications, in the
+        worker process.
+        """
+        use_in_process_target_manager()
+        return dispatch_by_port(apps_by_port=apps_by_port)
+
+    # The applications share the target manager's databases, so they are
+    # served by one worker process.
+    server = GunicornServer(
+        load_app=load_app,
+        bind=[bind_address(host=host, port=port) for port in apps_by_port],
+        workers=1,
+        threads=int(os.environ.get('THREADS', '8')),
+        keep_alive_seconds=int(os.environ.get('KEEP_ALIVE_SECONDS', '5')),
+        graceful_timeout_seconds=int(
+            os.environ.get('GRACEFUL_TIMEOUT_SECONDS', '30'),
+        ),
+    )
+    server.run()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
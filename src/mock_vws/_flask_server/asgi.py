@@ -0,0 +1,82 @@
+"""
+ASGI applications which serve the VWS and VWQ Flask applications.
+
+Run these with any ASGI server, for example::
+
+    uvicorn mock_vws._flask_server.asgi:VWS_ASGI_APP
+
+Each request is handled by the Flask application in its own thread, so that
+the event loop is never blocked by a request to the target manager or by
+image processing.
+This lets one process have many requests in flight, with the same routes and
+validators as the Flask applications.
+"""
+
+import asyncio
+import weakref
+from typing import Any, Callable, Dict
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from flask import Flask
+
+from mock_vws._flask_server.vwq import CLOUDRECO_FLASK_APP
+from mock_vws._flask_server.vws import VWS_FLASK_APP
+
+# The most requests to handle at once. Other requests wait without blocking
+# the event loop.
+_MAX_THREADS = 200
+
+
+class _ThreadPerRequestWsgiToAsgi:
+    """
+    An ASGI application which handles each HTTP request with a WSGI
+    application, in a thread for that request.
+
+    ``asgiref`` handles every request in one shared thread by default, so
+    requests would wait for each other.
+    A ``ThreadSensitiveContext`` for each request gives it its own thread.
+    """
+
+    def __init__(self, wsgi_application: Flask) -> None:
+        """
+        Args:
+            wsgi_application: The WSGI application to handle requests with.
+        """
+        # ``asgiref`` does not give types for its adapters.
+        self._asgi_application = WsgiToAsgi(  # type: ignore[no-untyped-call]
+            wsgi_application=wsgi_application,
+        )
+        # An ``asyncio.Semaphore`` can only be used in the event loop it was
+        # first used in, so there is one for each event loop.
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop,
+            asyncio.Semaphore,
+        ] = weakref.WeakKeyDictionary()
+
+    async def __call__(
+        self,
+        scope: Dict[str, Any],
+        receive: Callable[..., Any],
+        send: Callable[..., Any],
+    ) -> None:
+        """
+        Handle an ASGI connection.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(_MAX_THREADS)
+            self._semaphores[loop] = semaphore
+
+        async with semaphore:
+            # ``asgiref`` does not give types for this.
+            context = ThreadSensitiveContext()  # type: ignore[no-untyped-call]
+            async with context:
+                await self._asgi_application(scope, receive, send)
+
+
+VWS_ASGI_APP = _ThreadPerRequestWsgiToAsgi(wsgi_application=VWS_FLASK_APP)
+CLOUDRECO_ASGI_APP = _ThreadPerRequestWsgiToAsgi(
+    wsgi_application=CLOUDRECO_FLASK_APP,
+)
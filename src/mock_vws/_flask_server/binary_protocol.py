@@ -0,0 +1,84 @@
+"""
+A compact binary encoding for requests and responses between the VWS and
+VWQ applications and the target manager.
+
+JSON bodies carry images base64 encoded, which makes them about a third
+larger and costs time to encode and decode on both sides.
+A binary body is a JSON object of the details other than the image, followed
+by the raw image bytes.
+
+The target manager also accepts and gives JSON, and a client asks for the
+binary encoding with the ``Content-Type`` and ``Accept`` headers.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+from mock_vws.target import Target
+
+BINARY_CONTENT_TYPE = 'application/vnd.mock-vws.binary'
+
+# Whether there is an image, and the length of the JSON details.
+_HEADER = struct.Struct('>?I')
+
+
+def encode_binary(metadata: Dict[str, Any], image: Optional[bytes]) -> bytes:
+    """
+    Encode details and an image as a binary body.
+
+    Args:
+        metadata: Details which can be encoded as JSON.
+        image: An image, or ``None`` if there is no image.
+
+    Returns:
+        The binary body.
+    """
+    metadata_bytes = json.dumps(metadata).encode()
+    header = _HEADER.pack(image is not None, len(metadata_bytes))
+    return header + metadata_bytes + (image or b'')
+
+
+def decode_binary(body: bytes) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    """
+    Decode a binary body.
+
+    Args:
+        body: A body given by ``encode_binary``.
+
+    Returns:
+        The details and the image, or ``None`` in place of the image if there
+        is no image.
+
+    Raises:
+        ValueError: The body is not a valid binary body.
+    """
+    if len(body) < _HEADER.size:
+        raise ValueError('The body is too short to have a header.')
+    has_image, metadata_length = _HEADER.unpack_from(body)
+    metadata_start = _HEADER.size
+    metadata_end = metadata_start + metadata_length
+    if metadata_end > len(body):
+        raise ValueError('The body is too short for the given details.')
+    metadata = json.loads(body[metadata_start:metadata_end])
+    if not isinstance(metadata, dict):
+        raise ValueError('The details must be a JSON object.')
+    image = body[metadata_end:] if has_image else None
+    return metadata, image
+
+
+def encode_target(target: Target) -> bytes:
+    """
+    Encode a target as a binary body.
+
+    The details are those given by ``Target.to_dict``, without the image.
+    """
+    # We dump a copy of the target with no image so that the image is not
+    # base64 encoded only to be thrown away.
+    imageless_target = dataclasses.replace(target, image_value=b'')
+    metadata: Dict[str, Any] = dict(imageless_target.to_dict())
+    del metadata['image_base64']
+    return encode_binary(metadata=metadata, image=target.image_bytes)
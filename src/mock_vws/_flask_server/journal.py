@@ -0,0 +1,636 @@
+"""
+An append-only journal of changes made to the target manager's databases.
+
+The journal lets the target manager keep its databases when it restarts,
+without rewriting every database on every change.
+The journal is compacted into a snapshot from time to time, so that it does
+not grow without limit.
+
+Compacting the journal starts a new generation.
+A journal directory holds, for the latest generations:
+
+* ``snapshot-<generation>``: A snapshot of the databases with every change
+  made in earlier generations, as written by
+  :meth:`mock_vws.target_manager.TargetManager.save`.
+  There is no snapshot for generation 0.
+* ``journal-<generation>``: The changes made in the generation.
+
+Each journal file starts with a header with a magic value and the
+generation of the journal.
+Each record in the journal is:
+
+* A header with the length of the event and the length of the image.
+* The event, as JSON.
+* The raw bytes of the image of the target in the event, if there is one.
+  Events for targets whose images have not changed, such as when a target
+  is deleted, do not include the image.
+
+Records are only ever appended, and a journal file is not changed once the
+journal of the next generation has been started.
+Other processes can follow the changes by reading records from the
+generation and position at which they last stopped, with
+:func:`follow_journal`.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from mock_vws._snapshot import (
+    database_from_metadata,
+    database_metadata,
+    target_from_metadata,
+    target_metadata,
+)
+from mock_vws.database import VuforiaDatabase
+from mock_vws.target import Target
+from mock_vws.target_manager import TargetManager
+
+_JOURNAL_MAGIC = b'MVWSJRNL'
+# The magic value and the generation of the journal.
+_JOURNAL_HEADER = struct.Struct('<8sQ')
+# The length of the event and the length of the image.
+_RECORD_HEADER = struct.Struct('<II')
+
+
+def _journal_path(directory: Path, generation: int) -> Path:
+    """
+    Return the path to the journal of the given generation.
+    """
+    return directory / f'journal-{generation}'
+
+
+def _snapshot_path(directory: Path, generation: int) -> Path:
+    """
+    Return the path to the snapshot for the given generation.
+    """
+    return directory / f'snapshot-{generation}'
+
+
+def _generations(directory: Path, prefix: str) -> Iterator[int]:
+    """
+    Return the generations of the files in a journal directory whose names
+    start with the given prefix.
+    """
+    for path in directory.glob(prefix + '-*'):
+        generation = path.name.split('-', 1)[1]
+        if generation.isdigit():
+            yield int(generation)
+
+
+def read_generation(journal_file: IO[bytes]) -> int:
+    """
+    Read the generation of a journal from the header of its file.
+
+    Raises:
+        ValueError: The file does not start with a complete journal header.
+    """
+    journal_file.seek(0)
+    header = journal_file.read(_JOURNAL_HEADER.size)
+    if len(header) < _JOURNAL_HEADER.size:
+        raise ValueError('The journal header is not complete.')
+    magic, generation = _JOURNAL_HEADER.unpack(header)
+    if magic != _JOURNAL_MAGIC:
+        raise ValueError('The file is not a journal.')
+    assert isinstance(generation, int)
+    return generation
+
+
+def read_records(
+    journal_file: IO[bytes],
+    start: int = 0,
+) -> Iterator[Tuple[Dict[str, Any], bytes, int]]:
+    """
+    Read records from a journal file.
+
+    A record which is only partly written, for example because the writer
+    stopped while writing it, is not read.
+
+    Args:
+        journal_file: A journal file opened for reading.
+        start: The position in the file to read from. This must be the start
+            of a record, or 0 to read from the first record.
+
+    Yields:
+        Each event, the image in the event and the position after the record.
+    """
+    position = max(start, _JOURNAL_HEADER.size)
+    journal_file.seek(position)
+    while True:
+        header = journal_file.read(_RECORD_HEADER.size)
+        if len(header) < _RECORD_HEADER.size:
+            return
+        event_length, image_length = _RECORD_HEADER.unpack(header)
+        event_bytes = journal_file.read(event_length)
+        image_value = journal_file.read(image_length)
+        if len(event_bytes) < event_length or len(image_value) < image_length:
+            return
+        position += _RECORD_HEADER.size + event_length + image_length
+        yield json.loads(event_bytes), image_value, position
+
+
+def follow_journal(
+    directory: Path,
+    generation: int,
+    start: int = 0,
+) -> Iterator[Tuple[Dict[str, Any], bytes, int, int]]:
+    """
+    Read records from the journal of the given generation in a journal
+    directory, and then from the journals of any later generations.
+
+    Args:
+        directory: The journal directory.
+        generation: The generation of the journal to read from.
+        start: The position in that journal to read from. This must be the
+            start of a record, or 0 to read from the first record.
+
+    Yields:
+        Each event, the image in the event, and the generation and position
+        to read from to read the records after it.
+
+    Raises:
+        FileNotFoundError: The journal of the given generation has been
+            removed, as a snapshot for a later generation has been written.
+            Readers must load that snapshot and follow its journal instead.
+    """
+    while True:
+        # No records are appended to a journal once the journal of the next
+        # generation has been started, so if that journal exists before we
+        # read, we read every record of this journal.
+        next_generation_started = _journal_path(
+            directory=directory,
+            generation=generation + 1,
+        ).exists()
+        path = _journal_path(directory=directory, generation=generation)
+        with path.open('rb') as journal_file:
+            for event, image_value, position in read_records(
+                journal_file=journal_file,
+                start=start,
+            ):
+                start = position
+                yield event, image_value, generation, position
+        if not next_generation_started:
+            return
+        generation += 1
+        start = 0
+
+
+def _apply_event(
+    target_manager: TargetManager,
+    databases_by_name: Dict[str, VuforiaDatabase],
+    event: Dict[str, Any],
+    image_value: bytes,
+) -> None:
+    """
+    Apply an event from the journal to a target manager.
+
+    Events are applied so that applying events which are already included in
+    the target manager gives the same databases as applying them once.
+    This means that the journal can be replayed on a snapshot which was
+    written after some of the events, for example if the target manager
+    stopped during compaction.
+
+    Args:
+        target_manager: The target manager to apply the event to.
+        databases_by_name: The databases in the target manager, keyed by
+            name. This is kept up to date.
+        event: The event to apply.
+        image_value: The image in the event.
+    """
+    kind = event['kind']
+    database_name = event['database_name']
+    existing_database = databases_by_name.pop(database_name, None)
+
+    if kind == 'remove_database':
+        if existing_database is not None:
+            target_manager.remove_database(database=existing_database)
+        return
+
+    if kind == 'add_database':
+        if existing_database is not None:
+            target_manager.remove_database(database=existing_database)
+        existing_database = database_from_metadata(
+            metadata=event['database'],
+            targets=(),
+        )
+        target_manager.add_database(database=existing_database)
+
+    if existing_database is None:
+        # The database was removed by a later event which is included in
+        # the snapshot.
+        return
+
+    databases_by_name[database_name] = existing_database
+    if kind == 'save_target':
+        target = target_from_metadata(
+            metadata=event['target'],
+            image_value=image_value,
+        )
+        try:
+            replaced_target = existing_database.get_target(
+                target_id=target.target_id,
+            )
+        except ValueError:
+            if event.get('image_unchanged'):
+                # The target was purged by a later event which is included in
+                # the snapshot.
+                return
+        else:
+            existing_database.targets.remove(replaced_target)
+            if event.get('image_unchanged'):
+                target = dataclasses.replace(
+                    target,
+                    image_value=replaced_target.image_value,
+                )
+        existing_database.targets.add(target)
+
+    if kind == 'purge_targets':
+        target_ids = set(event['target_ids'])
+        for target in list(existing_database.targets):
+            if target.target_id in target_ids:
+                existing_database.targets.remove(target)
+
+
+class Journal:
+    """
+    An append-only journal of changes to databases, kept in a directory.
+
+    Records are flushed as they are written, so that other processes can read
+    them at once.
+    They are synced to disk in batches, as syncing each record would make
+    every change slow.
+    A timer syncs records which are left written when no more records are
+    appended, and records are synced when the journal is closed.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        sync_interval_seconds: float = 1,
+        sync_batch_size: int = 100,
+        compaction_size: int = 10000,
+    ) -> None:
+        """
+        Use a journal directory, creating it if it does not exist.
+
+        Args:
+            directory: The directory to keep the journal and snapshot in.
+            sync_interval_seconds: The longest time to leave written records
+                before syncing them to disk.
+            sync_batch_size: The most records to leave written before syncing
+                them to disk.
+            compaction_size: The number of records after which the journal
+                should be compacted into a snapshot.
+        """
+        self._directory = directory
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._sync_interval_seconds = sync_interval_seconds
+        self._sync_batch_size = sync_batch_size
+        self._compaction_size = compaction_size
+        self._lock = threading.Lock()
+        # This is held while the journal is compacted, which is done without
+        # ``_lock`` so that records can be appended meanwhile.
+        self._compaction_lock = threading.Lock()
+        self._journal_file: Optional[IO[bytes]] = None
+        self._generation = 0
+        self._unsynced_record_count = 0
+        self._last_synced = time.monotonic()
+        self._sync_timer: Optional[threading.Timer] = None
+        self._record_count = 0
+
+    @property
+    def directory(self) -> Path:
+        """
+        The directory which holds the journal and snapshot.
+        """
+        return self._directory
+
+    @property
+    def generation(self) -> int:
+        """
+        The generation of the journal which records are appended to.
+        """
+        return self._generation
+
+    @property
+    def needs_compaction(self) -> bool:
+        """
+        Whether the journal has grown enough that it should be compacted.
+        """
+        return self._record_count >= self._compaction_size
+
+    def load(self) -> TargetManager:
+        """
+        Load the databases from the latest snapshot and replay the journals
+        of its generation and any later generations.
+
+        A record at the end of the latest journal which is only partly
+        written is removed, so that records appended after it can be read.
+        Files of earlier generations, and temporary files, left by compaction
+        which did not finish, are removed.
+
+        Returns:
+            A target manager with the databases as they were after the last
+            complete record.
+        """
+        with self._compaction_lock, self._lock:
+            self._close()
+            snapshot_generation = max(
+                _generations(directory=self._directory, prefix='snapshot'),
+                default=0,
+            )
+            if snapshot_generation:
+                target_manager = TargetManager.load(
+                    path=_snapshot_path(
+                        directory=self._directory,
+                        generation=snapshot_generation,
+                    ),
+                )
+            else:
+                target_manager = TargetManager()
+
+            journal_generations = sorted(
+                generation
+                for generation in _generations(
+                    directory=self._directory,
+                    prefix='journal',
+                )
+                if generation >= snapshot_generation
+            )
+            databases_by_name = {
+                database.database_name: database
+                for database in target_manager.databases
+            }
+            self._record_count = 0
+            for generation in journal_generations:
+                end = 0
+                path = _journal_path(
+                    directory=self._directory,
+                    generation=generation,
+                )
+                with path.open('rb') as journal_file:
+                    for event, image_value, end in read_records(
+                        journal_file=journal_file,
+                    ):
+                        _apply_event(
+                            target_manager=target_manager,
+                            databases_by_name=databases_by_name,
+                            event=event,
+                            image_value=image_value,
+                        )
+                        self._record_count += 1
+
+            self._remove_generations_before(generation=snapshot_generation)
+            for temporary_path in self._directory.glob('*.tmp'):
+                temporary_path.unlink()
+            if journal_generations:
+                self._generation = journal_generations[-1]
+                self._open_journal(end=end)
+            else:
+                self._start_generation(generation=snapshot_generation)
+            return target_manager
+
+    def _open_journal(self, end: int) -> None:
+        """
+        Open the journal of the current generation to append records after
+        the given position, removing anything after it.
+
+        A journal whose header is not complete is started again.
+        """
+        path = _journal_path(
+            directory=self._directory,
+            generation=self._generation,
+        )
+        self._journal_file = path.open('r+b')
+        try:
+            read_generation(journal_file=self._journal_file)
+        except ValueError:
+            self._journal_file.close()
+            self._journal_file = None
+            self._start_generation(generation=self._generation)
+            return
+        self._journal_file.truncate(max(end, _JOURNAL_HEADER.size))
+        self._journal_file.seek(0, os.SEEK_END)
+
+    def _start_generation(self, generation: int) -> None:
+        """
+        Close the current journal, and append records to a new journal of the
+        given generation.
+        """
+        self._close()
+        self._generation = generation
+        path = _journal_path(directory=self._directory, generation=generation)
+        self._journal_file = path.open('wb')
+        self._journal_file.write(
+            _JOURNAL_HEADER.pack(_JOURNAL_MAGIC, generation),
+        )
+        self._journal_file.flush()
+        self._sync()
+        self._record_count = 0
+
+    def _remove_generations_before(self, generation: int) -> None:
+        """
+        Remove the journals and snapshots of generations before the given
+        generation.
+        """
+        for prefix, path_for_generation in (
+            ('journal', _journal_path),
+            ('snapshot', _snapshot_path),
+        ):
+            for earlier_generation in _generations(
+                directory=self._directory,
+                prefix=prefix,
+            ):
+                if earlier_generation < generation:
+                    path_for_generation(
+                        directory=self._directory,
+                        generation=earlier_generation,
+                    ).unlink()
+
+    def _append(self, event: Dict[str, Any], image_value: bytes = b'') -> None:
+        """
+        Append a record to the journal.
+        """
+        event_bytes = json.dumps(event, separators=(',', ':')).encode()
+        header = _RECORD_HEADER.pack(len(event_bytes), len(image_value))
+        with self._lock:
+            if self._journal_file is None:
+                self._start_generation(generation=self._generation)
+            assert self._journal_file is not None
+            self._journal_file.write(header + event_bytes + image_value)
+            self._journal_file.flush()
+            self._record_count += 1
+            self._unsynced_record_count += 1
+            since_sync = time.monotonic() - self._last_synced
+            if (
+                self._unsynced_record_count >= self._sync_batch_size
+                or since_sync >= self._sync_interval_seconds
+            ):
+                self._sync()
+            elif self._sync_timer is None:
+                # Records are synced within the interval even if no more
+                # records are appended.
+                self._sync_timer = threading.Timer(
+                    interval=self._sync_interval_seconds - since_sync,
+                    function=self._sync_after_interval,
+                )
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def _sync_after_interval(self) -> None:
+        """
+        Sync records which were left written when the sync timer was started.
+        """
+        with self._lock:
+            self._sync_timer = None
+            if self._unsynced_record_count:
+                self._sync()
+
+    def _sync(self) -> None:
+        """
+        Sync written records to disk.
+        """
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+        if self._journal_file is not None:
+            os.fsync(self._journal_file.fileno())
+        self._unsynced_record_count = 0
+        self._last_synced = time.monotonic()
+
+    def _close(self) -> None:
+        """
+        Sync and close the journal file, if it is open.
+        """
+        if self._journal_file is not None:
+            self._sync()
+            self._journal_file.close()
+            self._journal_file = None
+
+    def add_database(self, database: VuforiaDatabase) -> None:
+        """
+        Record that a database has been added, with its targets.
+        """
+        self._append(
+            event={
+                'kind': 'add_database',
+                'database_name': database.database_name,
+                'database': database_metadata(database=database),
+            },
+        )
+        for target in database.targets:
+            self.save_target(
+                database_name=database.database_name,
+                target=target,
+            )
+
+    def remove_database(self, database_name: str) -> None:
+        """
+        Record that a database has been removed.
+        """
+        self._append(
+            event={
+                'kind': 'remove_database',
+                'database_name': database_name,
+            },
+        )
+
+    def save_target(
+        self,
+        database_name: str,
+        target: Target,
+        replaced_target: Optional[Target] = None,
+    ) -> None:
+        """
+        Record that a target has been added to a database, or has replaced
+        the target with the same ID.
+
+        Args:
+            database_name: The name of the database which has the target.
+            target: The target.
+            replaced_target: The target which the target replaces, if there
+                is one. The image is not recorded if it is the image of this
+                target, for example when a target is deleted or only its
+                details are updated.
+        """
+        event: Dict[str, Any] = {
+            'kind': 'save_target',
+            'database_name': database_name,
+            'target': target_metadata(target=target),
+        }
+        if (
+            replaced_target is not None
+            and replaced_target.image_value is target.image_value
+        ):
+            event['image_unchanged'] = True
+            self._append(event=event)
+            return
+        self._append(event=event, image_value=target.image_bytes)
+
+    def purge_targets(
+        self,
+        database_name: str,
+        target_ids: Iterable[str],
+    ) -> None:
+        """
+        Record that deleted targets have been purged from a database.
+        """
+        self._append(
+            event={
+                'kind': 'purge_targets',
+                'database_name': database_name,
+                'target_ids': list(target_ids),
+            },
+        )
+
+    def compact(self, target_manager: TargetManager) -> None:
+        """
+        Start a new generation of the journal, write a snapshot of the given
+        databases for it, and then remove the files of earlier generations.
+
+        Records can be appended while the snapshot is written, as they are
+        appended to the journal of the new generation.
+        The databases may change while the snapshot is written, as replaying
+        the new journal on a snapshot which includes some of its changes
+        gives the same databases.
+
+        Args:
+            target_manager: A target manager with the databases as they are
+                after every record in the journal, and after any records
+                appended since.
+        """
+        with self._compaction_lock:
+            with self._lock:
+                self._start_generation(generation=self._generation + 1)
+                generation = self._generation
+
+            snapshot_path = _snapshot_path(
+                directory=self._directory,
+                generation=generation,
+            )
+            temporary_path = snapshot_path.with_name(
+                snapshot_path.name + '.tmp',
+            )
+            target_manager.save(path=temporary_path)
+            with temporary_path.open('rb') as temporary_file:
+                os.fsync(temporary_file.fileno())
+            os.replace(temporary_path, snapshot_path)
+            # If we stop before the files of earlier generations are removed,
+            # they are removed when the journal is next loaded.
+            with self._lock:
+                self._remove_generations_before(generation=generation)
+
+    def close(self) -> None:
+        """
+        Wait for any compaction to finish, sync any records which have not
+        been synced, and close the journal.
+        """
+        with self._compaction_lock, self._lock:
+            self._close()
@@ -0,0 +1,614 @@
+"""
+A SQLite store for the databases held by the target manager.
+
+The store lets the target manager keep its databases when it restarts, and
+lets several target manager processes share the same databases.
+
+The store is not read for each request.
+Each target manager process keeps a copy of the databases in memory, and
+brings it up to date by reading only what has changed in the store since it
+last read it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import datetime
+import sqlite3
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from mock_vws.database import VuforiaDatabase
+from mock_vws.image_store import image_digest
+from mock_vws.states import States
+from mock_vws.target import Target, TargetDict
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS store (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    store_id TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS databases (
+    database_name TEXT PRIMARY KEY,
+    server_access_key TEXT NOT NULL UNIQUE,
+    server_secret_key TEXT NOT NULL UNIQUE,
+    client_access_key TEXT NOT NULL UNIQUE,
+    client_secret_key TEXT NOT NULL UNIQUE,
+    state_name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    created_version INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS databases_by_version ON databases (version);
+
+CREATE TABLE IF NOT EXISTS deleted_databases (
+    database_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+-- The latest version at which a deleted database was forgotten, as only the
+-- latest deletions are kept.
+CREATE TABLE IF NOT EXISTS forgotten_deleted_databases (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS purged_databases (
+    database_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS targets (
+    database_name TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    width REAL NOT NULL,
+    image_sha256 TEXT NOT NULL,
+    image BLOB NOT NULL,
+    active_flag INTEGER NOT NULL,
+    processing_time_seconds REAL NOT NULL,
+    processed_tracking_rating INTEGER NOT NULL,
+    application_metadata TEXT,
+    last_modified_date TEXT NOT NULL,
+    delete_date TEXT,
+    upload_date TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (database_name, target_id)
+);
+
+CREATE INDEX IF NOT EXISTS targets_by_id ON targets (target_id);
+CREATE INDEX IF NOT EXISTS targets_by_name ON targets (database_name, name);
+CREATE INDEX IF NOT EXISTS targets_by_image
+    ON targets (database_name, image_sha256);
+CREATE INDEX IF NOT EXISTS targets_by_version
+    ON targets (database_name, version);
+"""
+
+_TARGET_COLUMNS = (
+    'target_id',
+    'name',
+    'width',
+    'image',
+    'active_flag',
+    'processing_time_seconds',
+    'processed_tracking_rating',
+    'application_metadata',
+    'last_modified_date',
+    'delete_date',
+    'upload_date',
+    'version',
+)
+
+
+@dataclass(frozen=True)
+class StoredDatabase:
+    """
+    A database in the store, with the targets which have changed since a given
+    version.
+
+    Args:
+        database: The database, with only the changed targets.
+        version: The version at which the database last changed.
+        created_version: The version at which the database was created.
+        target_versions: The version at which each changed target last
+            changed, keyed by target ID.
+        purged_version: The version at which deleted targets were last purged
+            from the database, or 0 if they never have been.
+        target_ids: The IDs of all targets in the database, if deleted targets
+            have been purged from it since the given version, so that copies
+            of the database can remove the purged targets.
+    """
+
+    database: VuforiaDatabase
+    version: int
+    created_version: int
+    target_versions: Dict[str, int]
+    purged_version: int = 0
+    target_ids: Optional[Set[str]] = None
+
+
+@dataclass(frozen=True)
+class StoreChanges:
+    """
+    The changes made to a store since a given version.
+
+    Args:
+        store_id: An identifier for the store. This does not change when the
+            target manager restarts, as the store is kept.
+        version: The current version of the store.
+        deleted_database_versions: The version at which each database deleted
+            since the given version was deleted, keyed by database name.
+        databases: The databases which have changed since the given version.
+        database_names: The names of all databases in the store, if
+            databases which were deleted since the given version may have
+            been forgotten, so that copies of the store can remove the
+            deleted databases.
+    """
+
+    store_id: str
+    version: int
+    deleted_database_versions: Dict[str, int] = field(default_factory=dict)
+    databases: List[StoredDatabase] = field(default_factory=list)
+    database_names: Optional[Set[str]] = None
+
+
+def _target_from_row(row: sqlite3.Row) -> Target:
+    """
+    Load a target from a row of the targets table.
+    """
+    target_dict: TargetDict = {
+        'name': row['name'],
+        'width': row['width'],
+        'image_base64': '',
+        'active_flag': bool(row['active_flag']),
+        'processing_time_seconds': row['processing_time_seconds'],
+        'processed_tracking_rating': row['processed_tracking_rating'],
+        'application_metadata': row['application_metadata'],
+        'target_id': row['target_id'],
+        'last_modified_date': row['last_modified_date'],
+        'delete_date_optional': row['delete_date'],
+        'upload_date': row['upload_date'],
+    }
+    target = Target.from_dict(target_dict=target_dict)
+    # We set the image after loading so that it is not base64 encoded only
+    # to be decoded again.
+    return dataclasses.replace(target, image_value=bytes(row['image']))
+
+
+class SQLiteStore:
+    """
+    Databases and their targets, kept in a SQLite database file.
+
+    Every change increments the version of the store, and each database and
+    target records the version at which it last changed.
+    This lets processes which keep a copy of the store fetch only what has
+    changed.
+
+    The database file is used in write-ahead logging mode, so that readers do
+    not block each other or the writer.
+    """
+
+    def __init__(self, path: str, deleted_databases_kept: int = 1000) -> None:
+        """
+        Open a store, creating it if it does not exist.
+
+        Args:
+            path: The path to the SQLite database file.
+            deleted_databases_kept: The number of deleted databases to keep a
+                record of. Processes which have not read the store since an
+                older deletion read the names of all databases instead.
+        """
+        self._path = path
+        self._deleted_databases_kept = deleted_databases_kept
+        self._local = threading.local()
+        connection = self._connection()
+        connection.executescript(_SCHEMA)
+        connection.execute(
+            'INSERT OR IGNORE INTO store (id, store_id, version) '
+            'VALUES (0, ?, 0)',
+            (uuid.uuid4().hex,),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return a connection to the database file for the current thread.
+
+        SQLite connections cannot be shared between threads.
+        """
+        connection: sqlite3.Connection | None = getattr(
+            self._local,
+            'connection',
+            None,
+        )
+        if connection is None:
+            # We manage transactions ourselves, so that each change is one
+            # transaction.
+            connection = sqlite3.connect(
+                self._path,
+                isolation_level=None,
+                timeout=30,
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @contextlib.contextmanager
+    def _change(self) -> Iterator[Tuple[sqlite3.Connection, int]]:
+        """
+        Make a change to the store in one transaction.
+
+        Yields:
+            A connection in a write transaction, and the version of the store
+            after the change.
+        """
+        connection = self._connection()
+        # ``IMMEDIATE`` takes the write lock at the start, so that two
+        # processes cannot give two changes the same version.
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('UPDATE store SET version = version + 1')
+            (version,) = connection.execute(
+                'SELECT version FROM store',
+            ).fetchone()
+            yield connection, version
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    @property
+    def path(self) -> str:
+        """
+        The path to the SQLite database file.
+        """
+        return self._path
+
+    @property
+    def version(self) -> int:
+        """
+        The current version of the store.
+        """
+        (version,) = (
+            self._connection()
+            .execute(
+                'SELECT version FROM store',
+            )
+            .fetchone()
+        )
+        assert isinstance(version, int)
+        return version
+
+    def add_database(self, database: VuforiaDatabase) -> None:
+        """
+        Add a database, with its targets.
+
+        Args:
+            database: The database to add.
+
+        Raises:
+            ValueError: One of the given database keys matches a key for an
+                existing database.
+        """
+        message_fmt = (
+            'All {key_name}s must be unique. '
+            'There is already a database with the {key_name} "{value}".'
+        )
+        with self._change() as (connection, version):
+            for column, key_name in (
+                ('server_access_key', 'server access key'),
+                ('server_secret_key', 'server secret key'),
+                ('client_access_key', 'client access key'),
+                ('client_secret_key', 'client secret key'),
+                ('database_name', 'name'),
+            ):
+                value = getattr(database, column)
+                existing = connection.execute(
+                    f'SELECT 1 FROM databases WHERE {column} = ?',
+                    (value,),
+                ).fetchone()
+                if existing is not None:
+                    message = message_fmt.format(
+                        key_name=key_name,
+                        value=value,
+                    )
+                    raise ValueError(message)
+
+            connection.execute(
+                'INSERT INTO databases VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    database.database_name,
+                    database.server_access_key,
+                    database.server_secret_key,
+                    database.client_access_key,
+                    database.client_secret_key,
+                    database.state.name,
+                    version,
+                    version,
+                ),
+            )
+            for target in database.targets:
+                self._save_target(
+                    connection=connection,
+                    database_name=database.database_name,
+                    target=target,
+                    version=version,
+                )
+
+    def remove_database(self, database_name: str) -> None:
+        """
+        Remove a database and its targets.
+
+        Args:
+            database_name: The name of the database to remove.
+        """
+        with self._change() as (connection, version):
+            connection.execute(
+                'DELETE FROM targets WHERE database_name = ?',
+                (database_name,),
+            )
+            connection.execute(
+                'DELETE FROM databases WHERE database_name = ?',
+                (database_name,),
+            )
+            connection.execute(
+                'INSERT OR REPLACE INTO deleted_databases VALUES (?, ?)',
+                (database_name, version),
+            )
+            forgotten_row = connection.execute(
+                'SELECT version FROM deleted_databases '
+                'ORDER BY version DESC LIMIT 1 OFFSET ?',
+                (self._deleted_databases_kept,),
+            ).fetchone()
+            if forgotten_row is not None:
+                connection.execute(
+                    'DELETE FROM deleted_databases WHERE version <= ?',
+                    (forgotten_row['version'],),
+                )
+                connection.execute(
+                    'INSERT OR REPLACE INTO forgotten_deleted_databases '
+                    'VALUES (0, ?)',
+                    (forgotten_row['version'],),
+                )
+            connection.execute(
+                'DELETE FROM purged_databases WHERE database_name = ?',
+                (database_name,),
+            )
+
+    @staticmethod
+    def _save_target(
+        connection: sqlite3.Connection,
+        database_name: str,
+        target: Target,
+        version: int,
+    ) -> None:
+        """
+        Add a target, or replace the target with the same ID, in a
+        transaction.
+        """
+        delete_date = None
+        if target.delete_date is not None:
+            delete_date = target.delete_date.isoformat()
+
+        connection.execute(
+            'INSERT OR REPLACE INTO targets VALUES '
+            '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                database_name,
+                target.target_id,
+                target.name,
+                target.width,
+                image_digest(image_value=target.image_value),
+                target.image_bytes,
+                target.active_flag,
+                target.processing_time_seconds,
+                target.processed_tracking_rating,
+                target.application_metadata,
+                target.last_modified_date.isoformat(),
+                delete_date,
+                target.upload_date.isoformat(),
+                version,
+            ),
+        )
+        connection.execute(
+            'UPDATE databases SET version = ? WHERE database_name = ?',
+            (version, database_name),
+        )
+
+    def save_target(self, database_name: str, target: Target) -> None:
+        """
+        Add a target to a database, or replace the target with the same ID.
+
+        Only this target is written, however many targets the database has.
+
+        Args:
+            database_name: The name of the database which has the target.
+            target: The target to save.
+        """
+        with self._change() as (connection, version):
+            self._save_target(
+                connection=connection,
+                database_name=database_name,
+                target=target,
+                version=version,
+            )
+
+    def add_target(self, database_name: str, target: Target) -> None:
+        """
+        Add a target to a database, unless the database has a target which is
+        not deleted with the same name.
+
+        The name is checked in the same transaction as the target is added,
+        so two processes cannot add targets with the same name at once.
+
+        Args:
+            database_name: The name of the database to add the target to.
+            target: The target to add.
+
+        Raises:
+            ValueError: The database has a target which is not deleted with
+                the same name as the given target.
+        """
+        with self._change() as (connection, version):
+            existing_target = connection.execute(
+                'SELECT 1 FROM targets WHERE database_name = ? AND name = ? '
+                'AND delete_date IS NULL',
+                (database_name, target.name),
+            ).fetchone()
+            if existing_target is not None:
+                raise ValueError(
+                    f'There is already a target named "{target.name}".',
+                )
+            self._save_target(
+                connection=connection,
+                database_name=database_name,
+                target=target,
+                version=version,
+            )
+
+    def purge_deleted_targets(
+        self,
+        database_name: str,
+        deleted_before: datetime.datetime,
+    ) -> None:
+        """
+        Remove targets which were deleted before the given time from a
+        database.
+
+        Args:
+            database_name: The name of the database to remove targets from.
+            deleted_before: Targets deleted before this time are removed.
+        """
+        with self._change() as (connection, version):
+            deleted_rows = connection.execute(
+                'SELECT target_id, delete_date FROM targets '
+                'WHERE database_name = ? AND delete_date IS NOT NULL',
+                (database_name,),
+            ).fetchall()
+            purged_target_ids = [
+                (database_name, row['target_id'])
+                for row in deleted_rows
+                if datetime.datetime.fromisoformat(row['delete_date'])
+                < deleted_before
+            ]
+            connection.executemany(
+                'DELETE FROM targets '
+                'WHERE database_name = ? AND target_id = ?',
+                purged_target_ids,
+            )
+            connection.execute(
+                'UPDATE databases SET version = ? WHERE database_name = ?',
+                (version, database_name),
+            )
+            connection.execute(
+                'INSERT OR REPLACE INTO purged_databases VALUES (?, ?)',
+                (database_name, version),
+            )
+
+    def get_changes(self, since: int) -> StoreChanges:
+        """
+        Get the changes made to the store since a given version.
+
+        Args:
+            since: The version to get changes since. Use 0 to get everything
+                in the store.
+
+        Returns:
+            The changes, read from one consistent snapshot of the store.
+        """
+        connection = self._connection()
+        connection.execute('BEGIN')
+        try:
+            store_row = connection.execute(
+                'SELECT store_id, version FROM store',
+            ).fetchone()
+            deleted_database_versions = dict(
+                connection.execute(
+                    'SELECT database_name, version FROM deleted_databases '
+                    'WHERE version > ?',
+                    (since,),
+                ).fetchall(),
+            )
+            database_rows = connection.execute(
+                'SELECT * FROM databases WHERE version > ?',
+                (since,),
+            ).fetchall()
+            forgotten_row = connection.execute(
+                'SELECT version FROM forgotten_deleted_databases',
+            ).fetchone()
+            database_names = None
+            if forgotten_row is not None and forgotten_row['version'] > since:
+                database_names = {
+                    database_name
+                    for (database_name,) in connection.execute(
+                        'SELECT database_name FROM databases',
+                    ).fetchall()
+                }
+
+            purged_versions = dict(
+                connection.execute(
+                    'SELECT database_name, version FROM purged_databases',
+                ).fetchall(),
+            )
+
+            databases = []
+            for database_row in database_rows:
+                database_name = database_row['database_name']
+                purged_version = purged_versions.get(database_name, 0)
+                target_ids = None
+                if purged_version > since:
+                    target_ids = {
+                        target_id
+                        for (target_id,) in connection.execute(
+                            'SELECT target_id FROM targets '
+                            'WHERE database_name = ?',
+                            (database_name,),
+                        ).fetchall()
+                    }
+                target_rows = connection.execute(
+                    'SELECT {columns} FROM targets '
+                    'WHERE database_name = ? AND version > ?'.format(
+                        columns=', '.join(_TARGET_COLUMNS),
+                    ),
+                    (database_row['database_name'], since),
+                ).fetchall()
+                database = VuforiaDatabase(
+                    database_name=database_row['database_name'],
+                    server_access_key=database_row['server_access_key'],
+                    server_secret_key=database_row['server_secret_key'],
+                    client_access_key=database_row['client_access_key'],
+                    client_secret_key=database_row['client_secret_key'],
+                    state=States[database_row['state_name']],
+                    targets={
+                        _target_from_row(row=target_row)
+                        for target_row in target_rows
+                    },
+                )
+                stored_database = StoredDatabase(
+                    database=database,
+                    version=database_row['version'],
+                    created_version=database_row['created_version'],
+                    target_versions={
+                        target_row['target_id']: target_row['version']
+                        for target_row in target_rows
+                    },
+                    purged_version=purged_version,
+                    target_ids=target_ids,
+                )
+                databases.append(stored_database)
+        finally:
+            connection.execute('COMMIT')
+
+        return StoreChanges(
+            store_id=store_row['store_id'],
+            version=store_row['version'],
+            deleted_database_versions=deleted_database_versions,
+            databases=databases,
+            database_names=database_names,
+        )
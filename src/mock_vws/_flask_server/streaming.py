@@ -0,0 +1,107 @@
+"""
+Helpers for streaming large JSON responses from the Flask applications.
+
+Responses are built chunk by chunk, so that the whole response is never held
+in memory and the first chunk is sent before the rest is built.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from collections.abc import Iterator as IteratorABC
+from typing import Any, Iterable, Iterator
+
+from flask import Response
+
+# We send chunks of about this many characters, rather than one chunk for
+# each JSON value, as sending many tiny chunks is slow.
+_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json(value: Any) -> Iterator[str]:
+    """
+    Encode a value as JSON, in parts.
+
+    Iterators are encoded as JSON arrays, and are consumed only as the parts
+    are needed.
+    This means that a large array can be given as a generator, so that its
+    items are built only as they are encoded.
+
+    Args:
+        value: The value to encode.
+
+    Yields:
+        Parts of the JSON encoded value.
+    """
+    if isinstance(value, dict):
+        yield '{'
+        for index, (key, item) in enumerate(value.items()):
+            if index:
+                yield ','
+            yield json.dumps(key) + ':'
+            yield from iter_json(value=item)
+        yield '}'
+    elif isinstance(value, (list, tuple, IteratorABC)):
+        yield '['
+        for index, item in enumerate(value):
+            if index:
+                yield ','
+            yield from iter_json(value=item)
+        yield ']'
+    else:
+        yield json.dumps(value)
+
+
+def _chunks(parts: Iterable[str]) -> Iterator[bytes]:
+    """
+    Join small parts into chunks to send.
+    """
+    buffer = []
+    buffer_size = 0
+    for part in parts:
+        buffer.append(part)
+        buffer_size += len(part)
+        if buffer_size >= _CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer = []
+            buffer_size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Compress chunks with gzip, as one gzip stream.
+    """
+    # Adding 16 to the window bits gives a gzip header and trailer.
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def streamed_json_response(value: Any, gzip: bool) -> Response:
+    """
+    Return a response which streams a value encoded as JSON.
+
+    Args:
+        value: The value to encode. See :func:`iter_json`.
+        gzip: Whether to compress the response with gzip.
+
+    Returns:
+        A response with a JSON body which is built as it is sent.
+    """
+    chunks = _chunks(parts=iter_json(value=value))
+    headers = {'Vary': 'Accept-Encoding'}
+    if gzip:
+        chunks = _gzip_chunks(chunks=chunks)
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(
+        chunks,
+        mimetype='application/json',
+        headers=headers,
+    )
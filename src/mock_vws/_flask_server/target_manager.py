@@ -2,17 +2,36 @@
 Storage layer for the mock Vuforia Flask application.
 """
 
+import atexit
 import base64
+import contextlib
 import dataclasses
 import datetime
+import functools
+import math
+import os
 import random
+import threading
+import uuid
+from dataclasses import dataclass, field
 from http import HTTPStatus
-from typing import Tuple
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
 
-from backports.zoneinfo import ZoneInfo
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 
+from mock_vws._clock import time_now, use_clock
+from mock_vws._flask_server.binary_protocol import (
+    BINARY_CONTENT_TYPE,
+    decode_binary,
+    encode_target,
+)
+from mock_vws._flask_server.journal import Journal
+from mock_vws._flask_server.sqlite_store import SQLiteStore
+from mock_vws._flask_server.streaming import streamed_json_response
+from mock_vws._snapshot import database_metadata
 from mock_vws.database import VuforiaDatabase
+from mock_vws.image_store import ImageStore, compress_image, image_digest
 from mock_vws.states import States
 from mock_vws.target import Target
 from mock_vws.target_manager import TargetManager
@@ -22,6 +41,688 @@ TARGET_MANAGER_FLASK_APP = Flask(__name__)
 TARGET_MANAGER = TargetManager()
 
 
+@dataclass
+class _ChangeTracker:
+    """
+    A record of when each database and target last changed.
+
+    Each change increments ``version``.
+    Clients which keep a copy of a database can ask for only the targets which
+    have changed since the last version of the database they saw.
+
+    Args:
+        store_id: An identifier for this store. This changes when the target
+            manager restarts, so that clients know to discard their copy.
+        version: The number of changes made to the store.
+        database_versions: The version at which each database last changed.
+        database_created_versions: The version at which each database was
+            created.
+        target_versions: The version at which each target last changed, keyed
+            by database name and then by target ID.
+        database_purged_versions: The version at which deleted targets were
+            last purged from each database which has had targets purged.
+    """
+
+    store_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    version: int = 0
+    database_versions: Dict[str, int] = field(default_factory=dict)
+    database_created_versions: Dict[str, int] = field(default_factory=dict)
+    target_versions: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    database_purged_versions: Dict[str, int] = field(default_factory=dict)
+
+    def record_database_creation(self, database_name: str) -> None:
+        """
+        Record that a database has been created.
+        """
+        self.version += 1
+        self.database_versions[database_name] = self.version
+        self.database_created_versions[database_name] = self.version
+        self.target_versions[database_name] = {}
+
+    def record_database_deletion(self, database_name: str) -> None:
+        """
+        Record that a database has been deleted.
+        """
+        self.version += 1
+        del self.database_versions[database_name]
+        del self.database_created_versions[database_name]
+        del self.target_versions[database_name]
+        self.database_purged_versions.pop(database_name, None)
+
+    def record_target_change(self, database_name: str, target_id: str) -> None:
+        """
+        Record that a target has been created, updated or deleted.
+        """
+        self.version += 1
+        self.database_versions[database_name] = self.version
+        self.target_versions[database_name][target_id] = self.version
+
+    def record_purge(
+        self,
+        database_name: str,
+        target_ids: Iterable[str],
+    ) -> None:
+        """
+        Record that deleted targets have been purged from a database.
+        """
+        self.version += 1
+        self.database_versions[database_name] = self.version
+        self.database_purged_versions[database_name] = self.version
+        for target_id in target_ids:
+            del self.target_versions[database_name][target_id]
+
+
+_CHANGES = _ChangeTracker()
+
+_STORE: Optional[SQLiteStore] = None
+_JOURNAL: Optional[Journal] = None
+# The thread which last compacted the journal, if it has been compacted.
+_COMPACTION_THREAD: Optional[threading.Thread] = None
+# This is held while changing the databases, so changes are made one at a
+# time. When it is held with a database's lock, it is taken first.
+_STORE_LOCK = threading.Lock()
+
+
+@TARGET_MANAGER_FLASK_APP.before_request
+def use_configured_clock() -> None:
+    """
+    Use the clock given as ``CLOCK`` in the application config, if there is
+    one, for the time while handling the request.
+
+    Otherwise the system time is used.
+    """
+    g.clock_context = contextlib.ExitStack()
+    clock = TARGET_MANAGER_FLASK_APP.config.get('CLOCK')
+    if clock is not None:
+        g.clock_context.enter_context(use_clock(clock=clock))
+
+
+@TARGET_MANAGER_FLASK_APP.teardown_request
+def stop_using_configured_clock(_: Optional[BaseException]) -> None:
+    """
+    Stop using the clock which was used while handling the request.
+    """
+    clock_context = g.pop('clock_context', None)
+    if clock_context is not None:
+        clock_context.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _image_store(directory: str) -> ImageStore:
+    """
+    Return the image store in the given directory.
+
+    One store is used for each directory, rather than one for each image.
+    """
+    return ImageStore(directory=Path(directory))
+
+
+def _with_kept_image(target: Target) -> Target:
+    """
+    Return the given target, with its image kept in the image store in the
+    directory given in the ``TARGET_MANAGER_IMAGE_DIRECTORY`` environment
+    variable, if there is one.
+
+    Otherwise the image is held in memory, compressed if the
+    ``TARGET_MANAGER_COMPRESS_IMAGES`` environment variable is ``true``.
+    """
+    if not isinstance(target.image_value, bytes):
+        return target
+
+    directory = os.environ.get('TARGET_MANAGER_IMAGE_DIRECTORY')
+    if directory is not None:
+        image_store = _image_store(directory=directory)
+        stored_image = image_store.add(image_value=target.image_value)
+        return dataclasses.replace(target, image_value=stored_image)
+
+    compress_images = os.environ.get('TARGET_MANAGER_COMPRESS_IMAGES', '')
+    if compress_images.lower() == 'true':
+        compressed_image = compress_image(image_value=target.image_value)
+        return dataclasses.replace(target, image_value=compressed_image)
+
+    return target
+
+
+def _forget_database(database: VuforiaDatabase) -> None:
+    """
+    Remove a database which has been deleted from the store from the
+    databases held in memory.
+    """
+    database_name = database.database_name
+    TARGET_MANAGER.remove_database(database=database)
+    del _CHANGES.database_versions[database_name]
+    del _CHANGES.database_created_versions[database_name]
+    del _CHANGES.target_versions[database_name]
+    _CHANGES.database_purged_versions.pop(database_name, None)
+
+
+def _sync_from_store(store: SQLiteStore) -> None:
+    """
+    Bring the databases held in memory up to date with the given store.
+
+    Other processes may have changed the store, so this is done for every
+    request.
+    """
+    global TARGET_MANAGER, _CHANGES  # pylint: disable=global-statement
+
+    changes = store.get_changes(since=_CHANGES.version)
+    if changes.store_id != _CHANGES.store_id:
+        # The databases held in memory are not from this store.
+        TARGET_MANAGER = TargetManager()
+        _CHANGES = _ChangeTracker(store_id=changes.store_id)
+        changes = store.get_changes(since=0)
+
+    for database_name, version in changes.deleted_database_versions.items():
+        database = TARGET_MANAGER.get_database_by_name(
+            database_name=database_name,
+        )
+        if database is None:
+            continue
+        # The database may have been created again since it was deleted, in
+        # which case we hold the new database.
+        if _CHANGES.database_created_versions[database_name] > version:
+            continue
+        _forget_database(database=database)
+
+    if changes.database_names is not None:
+        # The store has forgotten databases which were deleted since we last
+        # read it, so we remove every database which is not in the store.
+        for database in TARGET_MANAGER.databases:
+            if database.database_name not in changes.database_names:
+                _forget_database(database=database)
+
+    for stored_database in changes.databases:
+        database_name = stored_database.database.database_name
+        existing_database = TARGET_MANAGER.get_database_by_name(
+            database_name=database_name,
+        )
+        if existing_database is not None and (
+            _CHANGES.database_created_versions[database_name]
+            != stored_database.created_version
+        ):
+            # The database has been deleted and created again, and the store
+            # may have forgotten the deletion.
+            _forget_database(database=existing_database)
+            existing_database = None
+        if existing_database is None:
+            existing_database = dataclasses.replace(
+                stored_database.database,
+                targets=set(),
+            )
+            TARGET_MANAGER.add_database(database=existing_database)
+            _CHANGES.database_created_versions[
+                database_name
+            ] = stored_database.created_version
+            _CHANGES.target_versions[database_name] = {}
+
+        target_versions = _CHANGES.target_versions[database_name]
+        if stored_database.target_ids is not None:
+            # Deleted targets have been purged from the store.
+            for target in list(existing_database.targets):
+                if target.target_id not in stored_database.target_ids:
+                    existing_database.targets.remove(target)
+                    del target_versions[target.target_id]
+            _CHANGES.database_purged_versions[
+                database_name
+            ] = stored_database.purged_version
+
+        for target in stored_database.database.targets:
+            try:
+                existing_target = existing_database.get_target(
+                    target_id=target.target_id,
+                )
+            except ValueError:
+                pass
+            else:
+                existing_database.targets.remove(existing_target)
+            existing_database.targets.add(_with_kept_image(target=target))
+
+        _CHANGES.database_versions[database_name] = stored_database.version
+        target_versions.update(stored_database.target_versions)
+
+    _CHANGES.version = changes.version
+
+
+def _sync_with_store() -> None:
+    """
+    Bring the databases held in memory up to date with the store, if there is
+    one.
+    """
+    with _STORE_LOCK:
+        if _STORE is not None:
+            _sync_from_store(store=_STORE)
+
+
+def _load_journal(journal: Journal) -> None:
+    """
+    Hold the databases from the given journal in memory.
+    """
+    global TARGET_MANAGER  # pylint: disable=global-statement
+
+    TARGET_MANAGER = journal.load()
+    for database in TARGET_MANAGER.databases:
+        _CHANGES.record_database_creation(
+            database_name=database.database_name,
+        )
+        for target in list(database.targets):
+            kept_target = _with_kept_image(target=target)
+            if kept_target is not target:
+                database.targets.remove(target)
+                database.targets.add(kept_target)
+            _CHANGES.record_target_change(
+                database_name=database.database_name,
+                target_id=target.target_id,
+            )
+
+
+@TARGET_MANAGER_FLASK_APP.before_request
+def use_configured_store() -> None:
+    """
+    Use the SQLite store at the path given in the
+    ``TARGET_MANAGER_SQLITE_PATH`` environment variable, if there is one.
+
+    Otherwise databases are held in memory, with changes recorded in the
+    journal in the directory given in the
+    ``TARGET_MANAGER_JOURNAL_DIRECTORY`` environment variable, if there is
+    one.
+    """
+    global TARGET_MANAGER, _CHANGES  # pylint: disable=global-statement
+    global _STORE, _JOURNAL  # pylint: disable=global-statement
+
+    path = os.environ.get('TARGET_MANAGER_SQLITE_PATH')
+    journal_directory = None
+    if path is None:
+        journal_directory = os.environ.get('TARGET_MANAGER_JOURNAL_DIRECTORY')
+
+    with _STORE_LOCK:
+        store_path = None if _STORE is None else _STORE.path
+        used_journal_directory = None
+        if _JOURNAL is not None:
+            used_journal_directory = str(_JOURNAL.directory)
+
+        if (path, journal_directory) != (store_path, used_journal_directory):
+            # Forget the databases held for any other store.
+            TARGET_MANAGER = TargetManager()
+            _CHANGES = _ChangeTracker()
+            _STORE = None if path is None else SQLiteStore(path=path)
+            if _JOURNAL is not None:
+                _JOURNAL.close()
+            _JOURNAL = None
+            if journal_directory is not None:
+                _JOURNAL = Journal(directory=Path(journal_directory))
+                _load_journal(journal=_JOURNAL)
+
+    _sync_with_store()
+    _purge_deleted_targets()
+
+
+def _deleted_target_retention_seconds() -> float:
+    """
+    Return the number of seconds to keep deleted targets for.
+
+    This is given by the ``DELETED_TARGET_RETENTION_SECONDS`` environment
+    variable, but it is never less than the time for which deleted targets
+    affect queries, which is given by the ``DELETION_RECOGNITION_SECONDS`` and
+    ``DELETION_PROCESSING_SECONDS`` environment variables as it is for the
+    query service.
+    """
+    query_deletion_seconds = (
+        float(
+            os.environ.get('DELETION_RECOGNITION_SECONDS', '0.2'),
+        )
+        + float(os.environ.get('DELETION_PROCESSING_SECONDS', '3.0'))
+    )
+    retention_seconds = float(
+        os.environ.get(
+            'DELETED_TARGET_RETENTION_SECONDS',
+            str(query_deletion_seconds),
+        ),
+    )
+    return max(retention_seconds, query_deletion_seconds)
+
+
+def _purge_deleted_targets() -> None:
+    """
+    Remove targets which were deleted longer ago than the retention period,
+    from the store if there is one, or otherwise from memory and in the
+    journal if there is one.
+
+    Clients are told which targets remain in a database which has had
+    targets purged since the version of it which they last saw.
+    """
+    retention_seconds = _deleted_target_retention_seconds()
+    if math.isinf(retention_seconds):
+        return
+
+    retention = datetime.timedelta(seconds=retention_seconds)
+    deleted_before = time_now() - retention
+    with _STORE_LOCK:
+        # We check the start of each database's queue of deleted targets, so
+        # that this is quick when there is nothing to purge.
+        databases = [
+            database
+            for database in TARGET_MANAGER.databases
+            if database.has_targets_deleted_before(
+                deleted_before=deleted_before,
+            )
+        ]
+        if _STORE is not None:
+            for database in databases:
+                _STORE.purge_deleted_targets(
+                    database_name=database.database_name,
+                    deleted_before=deleted_before,
+                )
+            if databases:
+                _sync_from_store(store=_STORE)
+            return
+
+        for database in databases:
+            purged_targets = database.purge_deleted_targets(
+                deleted_before=deleted_before,
+            )
+            target_ids = [target.target_id for target in purged_targets]
+            _CHANGES.record_purge(
+                database_name=database.database_name,
+                target_ids=target_ids,
+            )
+            if _JOURNAL is not None:
+                _JOURNAL.purge_targets(
+                    database_name=database.database_name,
+                    target_ids=target_ids,
+                )
+                _compact_journal_if_needed()
+
+
+@atexit.register
+def _close_journal() -> None:
+    """
+    Sync and close the journal, if there is one, when the process exits.
+
+    This waits for any compaction of the journal to finish.
+    """
+    with _STORE_LOCK:
+        if _JOURNAL is not None:
+            _JOURNAL.close()
+
+
+def _compact_journal_if_needed() -> None:
+    """
+    Compact the journal into a snapshot in a thread if it has grown enough
+    and it is not already being compacted.
+
+    This is called while handling requests, with ``_STORE_LOCK`` held, so the
+    snapshot is not written here.
+    """
+    global _COMPACTION_THREAD  # pylint: disable=global-statement
+
+    if _JOURNAL is None or not _JOURNAL.needs_compaction:
+        return
+    if _COMPACTION_THREAD is not None and _COMPACTION_THREAD.is_alive():
+        return
+    _COMPACTION_THREAD = threading.Thread(
+        target=_JOURNAL.compact,
+        kwargs={'target_manager': TARGET_MANAGER},
+        daemon=True,
+    )
+    _COMPACTION_THREAD.start()
+
+
+def _add_database(database: VuforiaDatabase) -> None:
+    """
+    Add a database, to the store if there is one, or otherwise in memory and
+    to the journal if there is one.
+
+    Raises:
+        ValueError: One of the given database keys matches a key for an
+            existing database.
+    """
+    with _STORE_LOCK:
+        if _STORE is not None:
+            _STORE.add_database(database=database)
+            _sync_from_store(store=_STORE)
+            return
+
+        TARGET_MANAGER.add_database(database=database)
+        _CHANGES.record_database_creation(
+            database_name=database.database_name,
+        )
+        if _JOURNAL is not None:
+            _JOURNAL.add_database(database=database)
+            _compact_journal_if_needed()
+
+
+def _remove_database(database: VuforiaDatabase) -> None:
+    """
+    Remove a database, from the store if there is one, or otherwise from
+    memory and in the journal if there is one.
+    """
+    with _STORE_LOCK:
+        if _STORE is not None:
+            _STORE.remove_database(database_name=database.database_name)
+            _sync_from_store(store=_STORE)
+            return
+
+        TARGET_MANAGER.remove_database(database=database)
+        _CHANGES.record_database_deletion(
+            database_name=database.database_name,
+        )
+        if _JOURNAL is not None:
+            _JOURNAL.remove_database(database_name=database.database_name)
+            _compact_journal_if_needed()
+
+
+def _save_target(
+    database: VuforiaDatabase,
+    target: Target,
+    replaced_target: Optional[Target] = None,
+) -> None:
+    """
+    Add a target to a database, in the store if there is one, or otherwise in
+    memory and in the journal if there is one.
+
+    This must be called with ``_STORE_LOCK`` held, and without the database's
+    lock held.
+
+    Args:
+        database: The database to add the target to.
+        target: The target to add.
+        replaced_target: A target with the same ID to replace, if there is
+            one.
+    """
+    if _STORE is not None:
+        _STORE.save_target(database_name=database.database_name, target=target)
+        _sync_from_store(store=_STORE)
+        return
+
+    # The version is recorded before the target is added, so that readers
+    # which do not hold ``_STORE_LOCK`` never see a target without a version.
+    _CHANGES.record_target_change(
+        database_name=database.database_name,
+        target_id=target.target_id,
+    )
+    # Other threads do not see the database without either target.
+    with database.lock:
+        if replaced_target is not None:
+            database.targets.remove(replaced_target)
+        database.targets.add(_with_kept_image(target=target))
+    if _JOURNAL is not None:
+        _JOURNAL.save_target(
+            database_name=database.database_name,
+            target=target,
+            replaced_target=replaced_target,
+        )
+        _compact_journal_if_needed()
+
+
+def _target_metadata(target: Target) -> Dict[str, Any]:
+    """
+    Return the details of a target with a digest of its image in place of the
+    image itself, which can be large.
+    """
+    # We dump a copy of the target with no image so that the image is not
+    # base64 encoded only to be thrown away.
+    imageless_target = dataclasses.replace(target, image_value=b'')
+    metadata: Dict[str, Any] = dict(imageless_target.to_dict())
+    del metadata['image_base64']
+    metadata['image_sha256'] = image_digest(image_value=target.image_value)
+    return metadata
+
+
+def _database_with_target_metadata(
+    database: Optional[VuforiaDatabase],
+) -> Tuple[str, int]:
+    """
+    Return the given database, with details of only the targets which have
+    changed since the version given in the ``since`` query parameter.
+
+    A 404 error is given if there is no database.
+    """
+    if database is None:
+        return '', HTTPStatus.NOT_FOUND
+
+    since = request.args.get('since', default=0, type=int)
+    database_name = database.database_name
+    # Targets are added to databases and their versions are recorded while
+    # ``_STORE_LOCK`` is held, so we hold it to see a target and its version
+    # together.
+    with _STORE_LOCK:
+        target_versions = _CHANGES.target_versions.get(database_name)
+        if target_versions is None:
+            # The database has been deleted since it was found.
+            return '', HTTPStatus.NOT_FOUND
+        changed_targets = [
+            target
+            for target in database.targets
+            if target_versions[target.target_id] > since
+        ]
+        purged_version = _CHANGES.database_purged_versions.get(
+            database_name,
+            0,
+        )
+        # Clients need every target ID to remove targets which have been
+        # purged since the version they last saw.
+        target_ids = None
+        if purged_version > since:
+            target_ids = list(target_versions)
+        version = _CHANGES.database_versions[database_name]
+        created_version = _CHANGES.database_created_versions[database_name]
+        store_id = _CHANGES.store_id
+
+    # Images are hashed for the metadata, so we do this without the lock.
+    targets = [_target_metadata(target=target) for target in changed_targets]
+
+    # We do not use ``database.to_dict`` as that includes every target image.
+    body = {
+        'database_name': database_name,
+        'server_access_key': database.server_access_key,
+        'server_secret_key': database.server_secret_key,
+        'client_access_key': database.client_access_key,
+        'client_secret_key': database.client_secret_key,
+        'state_name': database.state.name,
+        'targets': targets,
+        'store_id': store_id,
+        'version': version,
+        'created_version': created_version,
+        'purged_version': purged_version,
+        'target_ids': target_ids,
+    }
+    return jsonify(body), HTTPStatus.OK
+
+
+@TARGET_MANAGER_FLASK_APP.route(
+    '/databases/by-server-access-key/<path:server_access_key>',
+    methods=['GET'],
+)
+def get_database_by_server_access_key(
+    server_access_key: str,
+) -> Tuple[str, int]:
+    """
+    Return the database with the given server access key.
+
+    Targets are given without their images.
+    Use the target image endpoint to get a target's image.
+
+    :query since: (Optional) A version of the database. Only targets which
+      have changed since this version are given. Defaults to 0, which gives
+      all targets.
+
+    :resheader Content-Type: application/json
+
+    :resjson string store_id: An identifier for the store. This changes when
+      the target manager restarts.
+    :resjson integer version: The version at which the database last changed.
+    :resjson integer created_version: The version at which the database was
+      created.
+    :resjson integer purged_version: The version at which deleted targets
+      were last purged from the database, or 0 if they never have been.
+    :resjson target_ids: The IDs of all targets in the database if deleted
+      targets have been purged since the given version, and otherwise null.
+    :resjsonarr targets: The targets which have changed since the given
+      version, each with an ``image_sha256`` digest in place of the image.
+
+    :status 200: The database has been returned.
+    :status 404: There is no database with the given server access key.
+    """
+    database = TARGET_MANAGER.get_database_by_server_access_key(
+        server_access_key=server_access_key,
+    )
+    return _database_with_target_metadata(database=database)
+
+
+@TARGET_MANAGER_FLASK_APP.route(
+    '/databases/by-client-access-key/<path:client_access_key>',
+    methods=['GET'],
+)
+def get_database_by_client_access_key(
+    client_access_key: str,
+) -> Tuple[str, int]:
+    """
+    Return the database with the given client access key.
+
+    This gives the same details as the endpoint to get a database by server
+    access key.
+
+    :status 200: The database has been returned.
+    :status 404: There is no database with the given client access key.
+    """
+    database = TARGET_MANAGER.get_database_by_client_access_key(
+        client_access_key=client_access_key,
+    )
+    return _database_with_target_metadata(database=database)
+
+
+@TARGET_MANAGER_FLASK_APP.route(
+    '/databases/<string:database_name>/targets/<string:target_id>/image',
+    methods=['GET'],
+)
+def get_target_image(
+    database_name: str,
+    target_id: str,
+) -> Tuple[Any, int]:
+    """
+    Return the image of a target, base64 encoded.
+
+    :reqheader Accept: (Optional) ``application/octet-stream`` to be given the
+      raw image rather than the image base64 encoded.
+
+    :status 200: The image has been returned.
+    :status 404: There is no database with the given name, or no target with
+      the given ID in the database.
+    """
+    try:
+        database = _get_database(database_name=database_name)
+        target = database.get_target(target_id=target_id)
+    except ValueError:
+        return '', HTTPStatus.NOT_FOUND
+    if _binary_accepted(binary_content_type='application/octet-stream'):
+        return (
+            Response(target.image_bytes, mimetype='application/octet-stream'),
+            HTTPStatus.OK,
+        )
+    image_base64 = base64.b64encode(target.image_bytes).decode()
+    return image_base64, HTTPStatus.OK
+
+
 @TARGET_MANAGER_FLASK_APP.route(
     '/databases/<string:database_name>',
     methods=['DELETE'],
@@ -31,27 +732,68 @@ def delete_database(database_name: str) -> Tuple[str, int]:
     Delete a database.
 
     :status 200: The database has been deleted.
+    :status 404: There is no database with the given name.
     """
-    try:
-        (matching_database,) = {
-            database
-            for database in TARGET_MANAGER.databases
-            if database_name == database.database_name
-        }
-    except ValueError:
+    database = TARGET_MANAGER.get_database_by_name(
+        database_name=database_name,
+    )
+    if database is None:
         return '', HTTPStatus.NOT_FOUND
 
-    TARGET_MANAGER.remove_database(database=matching_database)
+    _remove_database(database=database)
     return '', HTTPStatus.OK
 
 
+def _streamed_database(
+    database: VuforiaDatabase,
+    targets: Iterable[Target],
+) -> Dict[str, Any]:
+    """
+    Return a database in the form given by ``VuforiaDatabase.to_dict``, but
+    with the given targets each dumped only as they are streamed.
+    """
+    return {
+        **database_metadata(database=database),
+        'targets': (target.to_dict() for target in targets),
+    }
+
+
+def _gzip_requested() -> bool:
+    """
+    Return whether the client asked for the response to be compressed with
+    gzip.
+
+    We do not use the ``Accept-Encoding`` header for this as ``requests``
+    sends it by default, and not all clients of this application can decode
+    compressed responses.
+    """
+    gzip_requested = request.args.get('gzip', default='false')
+    gzip_accepted = request.accept_encodings.quality('gzip') > 0
+    return gzip_accepted and gzip_requested == 'true'
+
+
 @TARGET_MANAGER_FLASK_APP.route('/databases', methods=['GET'])
-def get_databases() -> Tuple[str, int]:
+def get_databases() -> Response:
     """
     Return a list of all databases.
+
+    The list is streamed as it is built, so that it is not held in memory all
+    at once.
+
+    :query gzip: (Optional) Set to ``true`` to compress the response with
+      gzip, if the client accepts gzip encoding.
+
+    :resheader Content-Type: application/json
+
+    :status 200: The databases have been returned.
     """
-    databases = [database.to_dict() for database in TARGET_MANAGER.databases]
-    return jsonify(databases), HTTPStatus.OK
+    # We take copies of the sets as they may change while the response is
+    # streamed.
+    databases = [
+        _streamed_database(database=database, targets=list(database.targets))
+        for database in TARGET_MANAGER.databases
+    ]
+    return streamed_json_response(value=databases, gzip=_gzip_requested())
 
 
 @TARGET_MANAGER_FLASK_APP.route('/databases', methods=['POST'])
@@ -122,114 +864,327 @@ def create_database() -> Tuple[str, int]:
         state=state,
     )
     try:
-        TARGET_MANAGER.add_database(database=database)
+        _add_database(database=database)
     except ValueError as exc:
         return str(exc), HTTPStatus.CONFLICT
 
     return jsonify(database.to_dict()), HTTPStatus.CREATED
 
 
+def _binary_accepted(binary_content_type: str = BINARY_CONTENT_TYPE) -> bool:
+    """
+    Return whether the client asked for a response in the given binary
+    content type rather than in the default text form.
+    """
+    best_match = request.accept_mimetypes.best_match(
+        ['application/json', binary_content_type],
+    )
+    return bool(best_match == binary_content_type)
+
+
+def _target_response(target: Target, status_code: int) -> Tuple[Any, int]:
+    """
+    Return a response which gives a target, in the binary encoding if the
+    client asked for it and otherwise as JSON.
+
+    The response is empty if the client gave the ``Prefer: return=minimal``
+    header, as a client which does not use the target need not wait for it to
+    be encoded.
+    """
+    if request.headers.get('Prefer') == 'return=minimal':
+        return '', status_code
+    if _binary_accepted():
+        body = encode_target(target=target)
+        return Response(body, mimetype=BINARY_CONTENT_TYPE), status_code
+    return jsonify(target.to_dict()), status_code
+
+
+def _get_database(database_name: str) -> VuforiaDatabase:
+    """
+    Return the database with the given name.
+
+    Raises:
+        ValueError: There is no database with the given name.
+    """
+    database = TARGET_MANAGER.get_database_by_name(
+        database_name=database_name,
+    )
+    if database is None:
+        raise ValueError(f'There is no database named "{database_name}".')
+    return database
+
+
+def _has_target(database_name: str, target_id: str) -> bool:
+    """
+    Return whether the database with the given name has a target with the
+    given ID.
+    """
+    try:
+        _get_database(database_name=database_name).get_target(
+            target_id=target_id,
+        )
+    except ValueError:
+        return False
+    return True
+
+
+def get_database_by_access_key(
+    key_name: str,
+    access_key: str,
+) -> Optional[VuforiaDatabase]:
+    """
+    Return the database with the given access key.
+
+    This and the other functions which are not routes let services in the
+    same process use the databases without making HTTP requests.
+
+    Args:
+        key_name: Either "server" or "client".
+        access_key: An access key of the given kind.
+
+    Returns:
+        The database with the given access key, or ``None`` if there is no
+        such database.
+    """
+    get_database = getattr(
+        TARGET_MANAGER,
+        f'get_database_by_{key_name}_access_key',
+    )
+    database: Optional[VuforiaDatabase] = get_database(access_key)
+    return database
+
+
+def add_target(database_name: str, target: Target) -> None:
+    """
+    Add a target to the database with the given name.
+
+    The name is checked and the target is added while no other change can be
+    made, so two targets with the same name cannot be added at once.
+
+    Raises:
+        ValueError: There is no database with the given name, or it has a
+            target which is not deleted with the same name as the given
+            target.
+    """
+    with _STORE_LOCK:
+        database = _get_database(database_name=database_name)
+        if _STORE is not None:
+            # Other processes may change the store, so the store checks the
+            # name in the same transaction as it adds the target.
+            _STORE.add_target(database_name=database_name, target=target)
+            _sync_from_store(store=_STORE)
+            return
+
+        if any(
+            not existing_target.delete_date
+            for existing_target in database.get_targets_with_name(
+                name=target.name,
+            )
+        ):
+            raise ValueError(
+                f'There is already a target named "{target.name}".',
+            )
+        _save_target(database=database, target=target)
+
+
+def delete_target_by_id(database_name: str, target_id: str) -> Target:
+    """
+    Mark a target in the database with the given name as deleted.
+
+    Returns:
+        The deleted target.
+
+    Raises:
+        ValueError: There is no such database, or no such target in it.
+    """
+    # We hold the lock so that the target is not changed by another request
+    # between reading it and replacing it.
+    with _STORE_LOCK:
+        database = _get_database(database_name=database_name)
+        target = database.get_target(target_id=target_id)
+        now = time_now()
+        new_target = dataclasses.replace(target, delete_date=now)
+        _save_target(
+            database=database,
+            target=new_target,
+            replaced_target=target,
+        )
+    return new_target
+
+
+def update_target_by_id(
+    database_name: str,
+    target_id: str,
+    update_values: Dict[str, Any],
+) -> Target:
+    """
+    Update a target in the database with the given name.
+
+    Args:
+        database_name: The name of the database which has the target.
+        target_id: The ID of the target to update.
+        update_values: The values to change, as given to the VWS endpoint to
+            update a target. The image is either raw or base64 encoded.
+
+    Returns:
+        The updated target.
+
+    Raises:
+        ValueError: There is no such database, or no such target in it.
+    """
+    # We hold the lock so that the target is not changed by another request
+    # between reading it and replacing it.
+    with _STORE_LOCK:
+        database = _get_database(database_name=database_name)
+        target = database.get_target(target_id=target_id)
+
+        width = update_values.get('width', target.width)
+        name = update_values.get('name', target.name)
+        active_flag = update_values.get('active_flag', target.active_flag)
+        application_metadata = update_values.get(
+            'application_metadata',
+            target.application_metadata,
+        )
+
+        image_value = target.image_value
+        if 'image' in update_values:
+            image = update_values['image']
+            image_value = (
+                image if isinstance(image, bytes) else base64.b64decode(image)
+            )
+
+        # In the real implementation, the tracking rating can stay the same.
+        # However, for demonstration purposes, the tracking rating changes but
+        # when the target is updated.
+        available_values = list(set(range(6)) - {target.tracking_rating})
+        processed_tracking_rating = random.choice(available_values)
+
+        last_modified_date = time_now()
+
+        new_target = dataclasses.replace(
+            target,
+            name=name,
+            width=width,
+            active_flag=active_flag,
+            application_metadata=application_metadata,
+            image_value=image_value,
+            processed_tracking_rating=processed_tracking_rating,
+            last_modified_date=last_modified_date,
+        )
+
+        _save_target(
+            database=database,
+            target=new_target,
+            replaced_target=target,
+        )
+
+    return new_target
+
+
 @TARGET_MANAGER_FLASK_APP.route(
     '/databases/<string:database_name>/targets',
     methods=['POST'],
 )
-def create_target(database_name: str) -> Tuple[str, int]:
+def create_target(database_name: str) -> Tuple[Any, int]:
     """
     Create a new target in a given database.
+
+    The target is given either as JSON with the image base64 encoded, or in
+    the binary encoding with the ``application/vnd.mock-vws.binary`` content
+    type.
+    The target is returned in the binary encoding if that is the content type
+    given in the ``Accept`` header, and otherwise as JSON.
+
+    :status 201: The target has been created.
+    :status 400: The target is given in the binary encoding, but the body is
+      not valid or has no image.
+    :status 404: There is no database with the given name.
+    :status 409: The database has a target which is not deleted with the same
+      name.
     """
-    [database] = [
-        database
-        for database in TARGET_MANAGER.databases
-        if database.database_name == database_name
-    ]
-    image_base64 = request.json['image_base64']
-    image_bytes = base64.b64decode(image_base64)
+    if request.mimetype == BINARY_CONTENT_TYPE:
+        try:
+            target_details, image = decode_binary(body=request.get_data())
+        except ValueError as exc:
+            return str(exc), HTTPStatus.BAD_REQUEST
+        if image is None:
+            return 'A target must have an image.', HTTPStatus.BAD_REQUEST
+        image_bytes = image
+    else:
+        target_details = request.json
+        image_bytes = base64.b64decode(target_details['image_base64'])
     target = Target(
-        name=request.json['name'],
-        width=request.json['width'],
+        name=target_details['name'],
+        width=target_details['width'],
         image_value=image_bytes,
-        active_flag=request.json['active_flag'],
-        processing_time_seconds=request.json['processing_time_seconds'],
-        application_metadata=request.json['application_metadata'],
-        target_id=request.json['target_id'],
+        active_flag=target_details['active_flag'],
+        processing_time_seconds=target_details['processing_time_seconds'],
+        application_metadata=target_details['application_metadata'],
+        target_id=target_details['target_id'],
+    )
+    database = TARGET_MANAGER.get_database_by_name(
+        database_name=database_name,
     )
-    database.targets.add(target)
+    if database is None:
+        return '', HTTPStatus.NOT_FOUND
+    try:
+        add_target(database_name=database_name, target=target)
+    except ValueError as exc:
+        return str(exc), HTTPStatus.CONFLICT
 
-    return jsonify(target.to_dict()), HTTPStatus.CREATED
+    return _target_response(target=target, status_code=HTTPStatus.CREATED)
 
 
 @TARGET_MANAGER_FLASK_APP.route(
     '/databases/<string:database_name>/targets/<string:target_id>',
     methods=['DELETE'],
 )
-def delete_target(database_name: str, target_id: str) -> Tuple[str, int]:
+def delete_target(database_name: str, target_id: str) -> Tuple[Any, int]:
     """
     Delete a target.
     """
-    [database] = [
-        database
-        for database in TARGET_MANAGER.databases
-        if database.database_name == database_name
-    ]
-    target = database.get_target(target_id=target_id)
-    now = datetime.datetime.now(tz=target.upload_date.tzinfo)
-    new_target = dataclasses.replace(target, delete_date=now)
-    database.targets.remove(target)
-    database.targets.add(new_target)
-    return jsonify(new_target.to_dict()), HTTPStatus.OK
+    if not _has_target(database_name=database_name, target_id=target_id):
+        return '', HTTPStatus.NOT_FOUND
+    new_target = delete_target_by_id(
+        database_name=database_name,
+        target_id=target_id,
+    )
+    return _target_response(target=new_target, status_code=HTTPStatus.OK)
 
 
 @TARGET_MANAGER_FLASK_APP.route(
     '/databases/<string:database_name>/targets/<string:target_id>',
     methods=['PUT'],
 )
-def update_target(database_name: str, target_id: str) -> Tuple[str, int]:
+def update_target(database_name: str, target_id: str) -> Tuple[Any, int]:
     """
     Update a target.
-    """
-    [database] = [
-        database
-        for database in TARGET_MANAGER.databases
-        if database.database_name == database_name
-    ]
-    target = database.get_target(target_id=target_id)
 
-    width = request.json.get('width', target.width)
-    name = request.json.get('name', target.name)
-    active_flag = request.json.get('active_flag', target.active_flag)
-    application_metadata = request.json.get(
-        'application_metadata',
-        target.application_metadata,
-    )
+    The values to change are given either as JSON with any image base64
+    encoded, or in the binary encoding.
 
-    image_value = target.image_value
-    if 'image' in request.json:
-        image_value = base64.b64decode(request.json['image'])
-
-    # In the real implementation, the tracking rating can stay the same.
-    # However, for demonstration purposes, the tracking rating changes but
-    # when the target is updated.
-    available_values = list(set(range(6)) - {target.tracking_rating})
-    processed_tracking_rating = random.choice(available_values)
-
-    gmt = ZoneInfo('GMT')
-    last_modified_date = datetime.datetime.now(tz=gmt)
-
-    new_target = dataclasses.replace(
-        target,
-        name=name,
-        width=width,
-        active_flag=active_flag,
-        application_metadata=application_metadata,
-        image_value=image_value,
-        processed_tracking_rating=processed_tracking_rating,
-        last_modified_date=last_modified_date,
+    :status 200: The target has been updated.
+    :status 400: The values are given in the binary encoding, but the body is
+      not valid.
+    :status 404: There is no target with the given ID in the given database.
+    """
+    if request.mimetype == BINARY_CONTENT_TYPE:
+        try:
+            update_values, image = decode_binary(body=request.get_data())
+        except ValueError as exc:
+            return str(exc), HTTPStatus.BAD_REQUEST
+        if image is not None:
+            update_values['image'] = image
+    else:
+        update_values = request.json
+    if not _has_target(database_name=database_name, target_id=target_id):
+        return '', HTTPStatus.NOT_FOUND
+    new_target = update_target_by_id(
+        database_name=database_name,
+        target_id=target_id,
+        update_values=update_values,
     )
-
-    database.targets.remove(target)
-    database.targets.add(new_target)
-
-    return jsonify(new_target.to_dict()), HTTPStatus.OK
+    return _target_response(target=new_target, status_code=HTTPStatus.OK)
 
 
 if __name__ == '__main__':  # pragma: no cover
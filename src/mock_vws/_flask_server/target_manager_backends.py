@@ -0,0 +1,235 @@
+"""
+Ways for the VWS and VWQ applications to use the target manager's databases.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Union
+
+import requests
+
+from mock_vws._flask_server import target_manager
+from mock_vws._flask_server.binary_protocol import (
+    BINARY_CONTENT_TYPE,
+    encode_binary,
+    encode_target,
+)
+from mock_vws._flask_server.target_manager_cache import TargetManagerCache
+from mock_vws._flask_server.target_manager_session import TargetManagerSession
+from mock_vws._services_validators.exceptions import TargetNameExist
+from mock_vws.database import VuforiaDatabase
+from mock_vws.target import Target
+
+
+class HTTPTargetManagerBackend:
+    """
+    Use the target manager at the base URL given in the
+    ``TARGET_MANAGER_BASE_URL`` environment variable, over HTTP.
+
+    Databases are kept in a local copy, which is brought up to date for each
+    request.
+    Requests are made with a pooled session, so that connections to the
+    target manager are not opened for each request.
+    Targets are sent in the binary encoding, so that images are not base64
+    encoded.
+    """
+
+    # We do not use the targets which the target manager returns.
+    _BINARY_HEADERS = {
+        'Content-Type': BINARY_CONTENT_TYPE,
+        'Prefer': 'return=minimal',
+    }
+
+    def __init__(self) -> None:
+        """
+        Create a backend with no databases copied.
+        """
+        self._session = TargetManagerSession()
+        self._cache = TargetManagerCache(session=self._session)
+
+    @staticmethod
+    def _databases_url() -> str:
+        """
+        Return the URL of the target manager's databases.
+        """
+        target_manager_base_url = os.environ['TARGET_MANAGER_BASE_URL']
+        return f'{target_manager_base_url}/databases'
+
+    def get_database_by_access_key(
+        self,
+        key_name: str,
+        access_key: str,
+    ) -> VuforiaDatabase | None:
+        """
+        Return the database with the given access key.
+
+        Args:
+            key_name: Either "server" or "client".
+            access_key: An access key of the given kind.
+
+        Returns:
+            The database with the given access key, or ``None`` if there is no
+            such database.
+        """
+        target_manager_base_url = os.environ['TARGET_MANAGER_BASE_URL']
+        if key_name == 'server':
+            return self._cache.get_database_by_server_access_key(
+                target_manager_base_url=target_manager_base_url,
+                server_access_key=access_key,
+            )
+        return self._cache.get_database_by_client_access_key(
+            target_manager_base_url=target_manager_base_url,
+            client_access_key=access_key,
+        )
+
+    def add_target(self, database_name: str, target: Target) -> None:
+        """
+        Add a target to the database with the given name.
+
+        Raises:
+            TargetNameExist: The database has a target which is not deleted
+                with the same name.
+            requests.HTTPError: The target manager gave another error.
+        """
+        response = self._session.request(
+            method='POST',
+            url=f'{self._databases_url()}/{database_name}/targets',
+            data=encode_target(target=target),
+            headers=self._BINARY_HEADERS,
+        )
+        if response.status_code == requests.codes.conflict:
+            raise TargetNameExist
+        response.raise_for_status()
+
+    def delete_target(self, database_name: str, target_id: str) -> None:
+        """
+        Mark a target in the database with the given name as deleted.
+
+        Raises:
+            requests.HTTPError: The target manager gave an error, for example
+                because there is no such target.
+        """
+        response = self._session.request(
+            method='DELETE',
+            url=f'{self._databases_url()}/{database_name}/targets/{target_id}',
+            headers={'Prefer': 'return=minimal'},
+        )
+        response.raise_for_status()
+
+    def update_target(
+        self,
+        database_name: str,
+        target_id: str,
+        update_values: Dict[str, Any],
+    ) -> None:
+        """
+        Update a target in the database with the given name.
+
+        Args:
+            database_name: The name of the database which has the target.
+            target_id: The ID of the target to update.
+            update_values: The values to change, as given to the VWS endpoint
+                to update a target, with any image as raw bytes.
+
+        Raises:
+            requests.HTTPError: The target manager gave an error, for example
+                because there is no such target.
+        """
+        metadata = dict(update_values)
+        image = None
+        if 'image' in metadata:
+            image = metadata.pop('image')
+        response = self._session.request(
+            method='PUT',
+            url=f'{self._databases_url()}/{database_name}/targets/{target_id}',
+            data=encode_binary(metadata=metadata, image=image),
+            headers=self._BINARY_HEADERS,
+        )
+        response.raise_for_status()
+
+
+class InProcessTargetManagerBackend:
+    """
+    Use the databases of the target manager application in this process.
+
+    Databases and targets are shared with the target manager, so nothing is
+    sent over HTTP or encoded as JSON.
+    """
+
+    def get_database_by_access_key(
+        self,
+        key_name: str,
+        access_key: str,
+    ) -> VuforiaDatabase | None:
+        """
+        Return the database with the given access key.
+
+        Args:
+            key_name: Either "server" or "client".
+            access_key: An access key of the given kind.
+
+        Returns:
+            The database with the given access key, or ``None`` if there is no
+            such database.
+        """
+        target_manager.use_configured_store()
+        return target_manager.get_database_by_access_key(
+            key_name=key_name,
+            access_key=access_key,
+        )
+
+    def add_target(self, database_name: str, target: Target) -> None:
+        """
+        Add a target to the database with the given name.
+
+        Raises:
+            TargetNameExist: The database has a target which is not deleted
+                with the same name.
+        """
+        target_manager.use_configured_store()
+        try:
+            target_manager.add_target(
+                database_name=database_name,
+                target=target,
+            )
+        except ValueError as exc:
+            raise TargetNameExist from exc
+
+    def delete_target(self, database_name: str, target_id: str) -> None:
+        """
+        Mark a target in the database with the given name as deleted.
+        """
+        target_manager.use_configured_store()
+        target_manager.delete_target_by_id(
+            database_name=database_name,
+            target_id=target_id,
+        )
+
+    def update_target(
+        self,
+        database_name: str,
+        target_id: str,
+        update_values: Dict[str, Any],
+    ) -> None:
+        """
+        Update a target in the database with the given name.
+
+        Args:
+            database_name: The name of the database which has the target.
+            target_id: The ID of the target to update.
+            update_values: The values to change, as given to the VWS endpoint
+                to update a target, with any image as raw bytes.
+        """
+        target_manager.use_configured_store()
+        target_manager.update_target_by_id(
+            database_name=database_name,
+            target_id=target_id,
+            update_values=update_values,
+        )
+
+
+TargetManagerBackend = Union[
+    HTTPTargetManagerBackend,
+    InProcessTargetManagerBackend,
+]
@@ -0,0 +1,419 @@
+"""
+A local copy of the databases held by the target manager back-end.
+"""
+
+from __future__ import annotations
+
+import base64
+import dataclasses
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict
+from urllib.parse import quote
+
+import requests
+
+from mock_vws._flask_server.target_manager_session import TargetManagerSession
+from mock_vws._snapshot import database_from_metadata
+from mock_vws.database import VuforiaDatabase
+from mock_vws.target import Target
+from mock_vws.target_manager import TargetManager
+
+
+@dataclass(frozen=True)
+class _CachedDatabase:
+    """
+    A copy of a database, with what is needed to bring it up to date.
+
+    A cached database is replaced rather than changed, so that it can be read
+    without holding the cache's lock.
+
+    Args:
+        database: The copy of the database.
+        created_version: The version at which the database was created.
+        version: The version at which the database last changed.
+        image_digests: The SHA-256 digest of the image of each target, keyed
+            by target ID.
+    """
+
+    database: VuforiaDatabase
+    created_version: int
+    version: int
+    image_digests: Dict[str, str]
+
+
+class TargetManagerCache:
+    """
+    A copy of databases held by the target manager back-end.
+
+    Each database is fetched only when a request needs it, and then only the
+    targets which have changed since it was last fetched are fetched.
+    Target images are fetched only when they have changed.
+    They are fetched as raw bytes unless the ``TARGET_MANAGER_RAW_IMAGES``
+    environment variable is set to ``false``, in which case they are fetched
+    base64 encoded.
+
+    Requests to the target manager are made without holding the cache's lock,
+    so that requests which need the cache do not wait for each other.
+    """
+
+    def __init__(self, session: TargetManagerSession) -> None:
+        """
+        Create a cache with no databases.
+
+        Args:
+            session: The session to make requests to the target manager with.
+        """
+        self._session = session
+        self._lock = threading.Lock()
+        self._target_manager_base_url = ''
+        self._store_id = ''
+        self._target_manager = TargetManager()
+        # Each cached database, keyed by database name.
+        self._cached_databases: Dict[str, _CachedDatabase] = {}
+
+    def _reset(self, target_manager_base_url: str, store_id: str) -> None:
+        """
+        Forget all cached databases.
+
+        Args:
+            target_manager_base_url: The base URL of the target manager which
+                the cache now copies.
+            store_id: The identifier of the store which the cache now copies.
+        """
+        self._target_manager_base_url = target_manager_base_url
+        self._store_id = store_id
+        self._target_manager = TargetManager()
+        self._cached_databases = {}
+
+    def _remove_database(self, database: VuforiaDatabase) -> None:
+        """
+        Remove a database from the cache.
+
+        Args:
+            database: The cached database to remove.
+        """
+        self._target_manager.remove_database(database=database)
+        del self._cached_databases[database.database_name]
+
+    def _fetch_image(
+        self,
+        target_manager_base_url: str,
+        database_name: str,
+        target_id: str,
+    ) -> bytes:
+        """
+        Fetch the image of a target from the target manager.
+
+        Args:
+            target_manager_base_url: The base URL of the target manager.
+            database_name: The name of the database which contains the target.
+            target_id: The ID of the target.
+
+        Returns:
+            The target's image.
+        """
+        databases_url = f'{target_manager_base_url}/databases'
+        raw_images = os.environ.get('TARGET_MANAGER_RAW_IMAGES', 'true')
+        headers = {}
+        if raw_images.lower() == 'true':
+            headers['Accept'] = 'application/octet-stream'
+        response = self._session.request(
+            method='GET',
+            url=f'{databases_url}/{database_name}/targets/{target_id}/image',
+            headers=headers,
+        )
+        # A target manager which does not give raw images gives them base64
+        # encoded.
+        if response.headers['Content-Type'] == 'application/octet-stream':
+            return response.content
+        return base64.b64decode(response.text)
+
+    def _updated_database(
+        self,
+        target_manager_base_url: str,
+        database_dict: Dict[str, Any],
+        cached_database: _CachedDatabase | None,
+    ) -> _CachedDatabase:
+        """
+        Return a copy of a database with the changes given by the target
+        manager, fetching the images which have changed.
+
+        Args:
+            target_manager_base_url: The base URL of the target manager.
+            database_dict: The database as given by the target manager, with
+                the targets which have changed since the cached copy, and the
+                IDs of all of its targets if targets have been purged since
+                the cached copy.
+            cached_database: The cached copy of the database, if there is one.
+
+        Returns:
+            The up to date copy of the database.
+        """
+        database_name = database_dict['database_name']
+        cached_targets: Dict[str, Target] = {}
+        image_digests: Dict[str, str] = {}
+        if cached_database is not None:
+            cached_targets = {
+                target.target_id: target
+                for target in cached_database.database.targets
+            }
+            image_digests = dict(cached_database.image_digests)
+
+        target_ids = database_dict.get('target_ids')
+        if target_ids is not None:
+            # Deleted targets have been purged from the target manager.
+            remaining_target_ids = set(target_ids)
+            for target_id in set(cached_targets) - remaining_target_ids:
+                del cached_targets[target_id]
+                del image_digests[target_id]
+
+        for target_metadata in database_dict['targets']:
+            target_id = target_metadata['target_id']
+            image_digest = target_metadata.pop('image_sha256')
+            cached_target = cached_targets.get(target_id)
+            if (
+                cached_target is not None
+                and image_digests[target_id] == image_digest
+            ):
+                image_value = cached_target.image_value
+            else:
+                image_value = self._fetch_image(
+                    target_manager_base_url=target_manager_base_url,
+                    database_name=database_name,
+                    target_id=target_id,
+                )
+
+            target_metadata['image_base64'] = ''
+            target = Target.from_dict(target_dict=target_metadata)
+            cached_targets[target_id] = dataclasses.replace(
+                target,
+                image_value=image_value,
+            )
+            image_digests[target_id] = image_digest
+
+        # We make a new database rather than changing the cached database's
+        # targets so that requests which are using the old copy are not
+        # affected.
+        # The digests of the images are known, so the images are not hashed
+        # again to index the new database.
+        database = database_from_metadata(
+            metadata=database_dict,
+            targets=cached_targets.values(),
+            image_digests=image_digests,
+        )
+        return _CachedDatabase(
+            database=database,
+            created_version=database_dict['created_version'],
+            version=database_dict['version'],
+            image_digests=image_digests,
+        )
+
+    def _cache_database(
+        self,
+        target_manager_base_url: str,
+        store_id: str,
+        cached_database: _CachedDatabase,
+    ) -> VuforiaDatabase:
+        """
+        Cache a copy of a database, unless a copy at least as new has been
+        cached since it was fetched.
+
+        This must be called with the cache's lock held.
+
+        Args:
+            target_manager_base_url: The base URL of the target manager which
+                the database was fetched from.
+            store_id: The identifier of the store which the database was
+                fetched from.
+            cached_database: The copy of the database to cache.
+
+        Returns:
+            The newest copy of the database.
+        """
+        database = cached_database.database
+        if (self._target_manager_base_url, self._store_id) != (
+            target_manager_base_url,
+            store_id,
+        ):
+            # The cache has been reset since the database was fetched.
+            return database
+
+        current = self._cached_databases.get(database.database_name)
+        if current is not None and current.version >= cached_database.version:
+            # Another request has cached a copy which is at least as new.
+            if current.created_version == cached_database.created_version:
+                return current.database
+            return database
+
+        # A cached database which has since been deleted may share a name or
+        # key with the database.
+        unique_attributes = (
+            'database_name',
+            'server_access_key',
+            'server_secret_key',
+            'client_access_key',
+            'client_secret_key',
+        )
+        for other_database in set(self._target_manager.databases):
+            if any(
+                getattr(other_database, attribute)
+                == getattr(database, attribute)
+                for attribute in unique_attributes
+            ):
+                self._remove_database(database=other_database)
+
+        self._target_manager.add_database(database=database)
+        self._cached_databases[database.database_name] = cached_database
+        return database
+
+    def _get_database(
+        self,
+        target_manager_base_url: str,
+        key_name: str,
+        access_key: str,
+    ) -> VuforiaDatabase | None:
+        """
+        Bring the cached copy of the database with the given access key up to
+        date and return it.
+
+        Args:
+            target_manager_base_url: The base URL of the target manager.
+            key_name: Either "server" or "client".
+            access_key: An access key of the given kind.
+
+        Returns:
+            The database with the given access key, or ``None`` if there is no
+            such database.
+        """
+        with self._lock:
+            if target_manager_base_url != self._target_manager_base_url:
+                self._reset(
+                    target_manager_base_url=target_manager_base_url,
+                    store_id='',
+                )
+            store_id = self._store_id
+            get_cached_database = getattr(
+                self._target_manager,
+                f'get_database_by_{key_name}_access_key',
+            )
+            database = get_cached_database(access_key)
+            cached_database = None
+            if database is not None:
+                cached_database = self._cached_databases[
+                    database.database_name
+                ]
+
+        since = 0 if cached_database is None else cached_database.version
+        quoted_access_key = quote(access_key, safe='')
+        lookup_path = (
+            f'/databases/by-{key_name}-access-key/{quoted_access_key}'
+        )
+        response = self._session.request(
+            method='GET',
+            url=target_manager_base_url + lookup_path,
+            params={'since': since},
+        )
+
+        if response.status_code == requests.codes.not_found:
+            with self._lock:
+                if (
+                    cached_database is not None
+                    and self._cached_databases.get(database.database_name)
+                    is cached_database
+                ):
+                    self._remove_database(database=database)
+            return None
+
+        database_dict = response.json()
+        if database_dict['store_id'] != store_id:
+            with self._lock:
+                if (self._target_manager_base_url, self._store_id) == (
+                    target_manager_base_url,
+                    store_id,
+                ):
+                    self._reset(
+                        target_manager_base_url=target_manager_base_url,
+                        store_id=database_dict['store_id'],
+                    )
+            if cached_database is not None:
+                # The target manager has restarted, so the changes we have
+                # been given are not relative to our copy.
+                return self._get_database(
+                    target_manager_base_url=target_manager_base_url,
+                    key_name=key_name,
+                    access_key=access_key,
+                )
+            store_id = database_dict['store_id']
+
+        if cached_database is not None:
+            if cached_database.version == database_dict['version']:
+                return cached_database.database
+
+            # The cached database may have been deleted and a new database
+            # created with the same keys. In that case we have been given all
+            # of the new database's targets.
+            if (
+                cached_database.created_version
+                != database_dict['created_version']
+            ):
+                cached_database = None
+
+        updated_database = self._updated_database(
+            target_manager_base_url=target_manager_base_url,
+            database_dict=database_dict,
+            cached_database=cached_database,
+        )
+        with self._lock:
+            return self._cache_database(
+                target_manager_base_url=target_manager_base_url,
+                store_id=store_id,
+                cached_database=updated_database,
+            )
+
+    def get_database_by_server_access_key(
+        self,
+        target_manager_base_url: str,
+        server_access_key: str,
+    ) -> VuforiaDatabase | None:
+        """
+        Bring the cached copy of the database with the given server access key
+        up to date and return it.
+
+        Args:
+            target_manager_base_url: The base URL of the target manager.
+            server_access_key: A server access key.
+
+        Returns:
+            The database with the given server access key, or ``None`` if there
+            is no such database.
+        """
+        return self._get_database(
+            target_manager_base_url=target_manager_base_url,
+            key_name='server',
+            access_key=server_access_key,
+        )
+
+    def get_database_by_client_access_key(
+        self,
+        target_manager_base_url: str,
+        client_access_key: str,
+    ) -> VuforiaDatabase | None:
+        """
+        Bring the cached copy of the database with the given client access key
+        up to date and return it.
+
+        Args:
+            target_manager_base_url: The base URL of the target manager.
+            client_access_key: A client access key.
+
+        Returns:
+            The database with the given client access key, or ``None`` if there
+            is no such database.
+        """
+        return self._get_database(
+            target_manager_base_url=target_manager_base_url,
+            key_name='client',
+            access_key=client_access_key,
+        )
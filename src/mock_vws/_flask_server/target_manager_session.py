@@ -0,0 +1,81 @@
+"""
+A pooled HTTP session for requests to the target manager.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TargetManagerSession:
+    """
+    A session for requests to the target manager, which keeps connections
+    open so that they are used for many requests.
+
+    The session is shared by every thread in a process.
+    Each process has its own session, as connections cannot be shared
+    between processes, for example between workers forked from one process.
+
+    The number of connections to keep open is given in the
+    ``TARGET_MANAGER_POOL_SIZE`` environment variable, and the number of
+    seconds to wait for the target manager to respond is given in the
+    ``TARGET_MANAGER_TIMEOUT_SECONDS`` environment variable.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a session which connects only when a request is made.
+        """
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+        self._session_pid: int | None = None
+
+    def _get_session(self) -> requests.Session:
+        """
+        Return the session for this process, creating it if there is none.
+        """
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                pool_size = int(
+                    os.environ.get('TARGET_MANAGER_POOL_SIZE', '10'),
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=pool_size,
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._session_pid = os.getpid()
+            return self._session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Make a request to the target manager.
+
+        Args:
+            method: The HTTP method to use.
+            url: The URL to request.
+            kwargs: Other arguments to give to ``requests.Session.request``.
+
+        Returns:
+            The target manager's response.
+        """
+        timeout = float(os.environ.get('TARGET_MANAGER_TIMEOUT_SECONDS', '30'))
+        return self._get_session().request(
+            method=method,
+            url=url,
+            timeout=timeout,
+            **kwargs,
+        )
@@ -5,14 +5,20 @@ See
 https://library.vuforia.com/articles/Solution/How-To-Perform-an-Image-Recognition-Query
 """
 
+import contextlib
 import email.utils
 import os
 from http import HTTPStatus
-from typing import Set
+from typing import Optional, Set
 
-import requests
-from flask import Flask, Response, request
+from flask import Flask, Response, g, request
 
+from mock_vws._clock import use_clock
+from mock_vws._database_matchers import get_access_key
+from mock_vws._flask_server.target_manager_backends import (
+    HTTPTargetManagerBackend,
+    TargetManagerBackend,
+)
 from mock_vws._query_tools import (
     ActiveMatchingTargetsDeleteProcessing,
     get_query_match_response_text,
@@ -22,22 +28,74 @@ from mock_vws._query_validators.exceptions import (
     MatchProcessing,
     ValidatorException,
 )
+from mock_vws._query_validators.request_data import QueryRequestData
 from mock_vws.database import VuforiaDatabase
 
 CLOUDRECO_FLASK_APP = Flask(import_name=__name__)
 CLOUDRECO_FLASK_APP.config['PROPAGATE_EXCEPTIONS'] = True
 
+_HTTP_TARGET_MANAGER_BACKEND = HTTPTargetManagerBackend()
+
 
-def get_all_databases() -> Set[VuforiaDatabase]:
+@CLOUDRECO_FLASK_APP.before_request
+def use_configured_clock() -> None:
     """
-    Get all database objects from the target manager back-end.
+    Use the clock given as ``CLOCK`` in the application config, if there is
+    one, for the time while handling the request.
+
+    Otherwise the system time is used.
     """
-    target_manager_base_url = os.environ['TARGET_MANAGER_BASE_URL']
-    response = requests.get(url=f'{target_manager_base_url}/databases')
-    return {
-        VuforiaDatabase.from_dict(database_dict=database_dict)
-        for database_dict in response.json()
-    }
+    g.clock_context = contextlib.ExitStack()
+    clock = CLOUDRECO_FLASK_APP.config.get('CLOCK')
+    if clock is not None:
+        g.clock_context.enter_context(use_clock(clock=clock))
+
+
+@CLOUDRECO_FLASK_APP.teardown_request
+def stop_using_configured_clock(_: Optional[BaseException]) -> None:
+    """
+    Stop using the clock which was used while handling the request.
+    """
+    clock_context = g.pop('clock_context', None)
+    if clock_context is not None:
+        clock_context.close()
+
+
+def get_target_manager_backend() -> TargetManagerBackend:
+    """
+    Return the backend given as ``TARGET_MANAGER_BACKEND`` in the application
+    config, if there is one, to use the target manager's databases.
+
+    Otherwise the target manager at the base URL given in the
+    ``TARGET_MANAGER_BASE_URL`` environment variable is used over HTTP.
+    """
+    backend: TargetManagerBackend = CLOUDRECO_FLASK_APP.config.get(
+        'TARGET_MANAGER_BACKEND',
+        _HTTP_TARGET_MANAGER_BACKEND,
+    )
+    return backend
+
+
+def get_request_databases() -> Set[VuforiaDatabase]:
+    """
+    Get the database with the client access key given in the request, from the
+    target manager back-end.
+
+    The database is fetched at most once per request.
+
+    Returns:
+        A set of the database with the given client access key, or an empty set
+        if there is no such database.
+    """
+    if 'databases' not in g:
+        access_key = get_access_key(request_headers=dict(request.headers))
+        database = get_target_manager_backend().get_database_by_access_key(
+            key_name='client',
+            access_key=access_key,
+        )
+        g.databases = set() if database is None else {database}
+    databases: Set[VuforiaDatabase] = g.databases
+    return databases
 
 
 @CLOUDRECO_FLASK_APP.before_request
@@ -47,9 +105,11 @@ def set_terminate_wsgi_input() -> None:
     ``requests``, so that requests have the given ``Content-Length`` headers
     and the given data in ``request.headers`` and ``request.data``.
 
-    We set this to ``False`` when running an application as standalone.
+    We do not set this when running an application as standalone.
     This is because when running the Flask application, if this is set,
     reading ``request.data`` hangs.
+    Werkzeug treats the input as terminated if this is set at all, even to
+    ``False``.
 
     Therefore, when running the real Flask application, the behavior is not the
     same as the real Vuforia.
@@ -59,7 +119,8 @@ def set_terminate_wsgi_input() -> None:
         'TERMINATE_WSGI_INPUT',
         False,
     )
-    request.environ['wsgi.input_terminated'] = terminate_wsgi_input
+    if terminate_wsgi_input:
+        request.environ['wsgi.input_terminated'] = True
 
 
 class ResponseNoContentTypeAdded(Response):
@@ -100,14 +161,19 @@ def query() -> Response:
         os.environ.get('DELETION_RECOGNITION_SECONDS', '0.2'),
     )
 
-    databases = get_all_databases()
+    databases = get_request_databases()
     request_body = request.stream.read()
+    request_data = QueryRequestData(
+        content_type=request.headers.get('Content-Type', ''),
+        request_body=request_body,
+    )
     run_query_validators(
         request_headers=dict(request.headers),
         request_body=request_body,
         request_method=request.method,
         request_path=request.path,
         databases=databases,
+        request_data=request_data,
     )
     date = email.utils.formatdate(None, localtime=False, usegmt=True)
 
@@ -118,6 +184,7 @@ def query() -> Response:
             request_method=request.method,
             request_path=request.path,
             databases=databases,
+            request_data=request_data,
             query_processes_deletion_seconds=query_processes_deletion_seconds,
             query_recognizes_deletion_seconds=(
                 query_recognizes_deletion_seconds
@@ -5,19 +5,25 @@ See
 https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API
 """
 
-import base64
+import contextlib
 import email.utils
-import json
 import os
 import uuid
 from http import HTTPStatus
-from typing import Set
+from typing import Optional, Set
 
-import requests
-from flask import Flask, Response, request
+from flask import Flask, Response, g, request
 
+from mock_vws._clock import use_clock
 from mock_vws._constants import ResultCodes, TargetStatuses
-from mock_vws._database_matchers import get_database_matching_server_keys
+from mock_vws._database_matchers import (
+    get_access_key,
+    get_database_matching_server_keys,
+)
+from mock_vws._flask_server.target_manager_backends import (
+    HTTPTargetManagerBackend,
+    TargetManagerBackend,
+)
 from mock_vws._mock_common import json_dump
 from mock_vws._services_validators import run_services_validators
 from mock_vws._services_validators.exceptions import (
@@ -26,23 +32,75 @@ from mock_vws._services_validators.exceptions import (
     TargetStatusProcessing,
     ValidatorException,
 )
+from mock_vws._services_validators.request_data import ServicesRequestData
 from mock_vws.database import VuforiaDatabase
 from mock_vws.target import Target
 
 VWS_FLASK_APP = Flask(import_name=__name__)
 VWS_FLASK_APP.config['PROPAGATE_EXCEPTIONS'] = True
 
+_HTTP_TARGET_MANAGER_BACKEND = HTTPTargetManagerBackend()
 
-def get_all_databases() -> Set[VuforiaDatabase]:
+
+@VWS_FLASK_APP.before_request
+def use_configured_clock() -> None:
     """
-    Get all database objects from the task manager back-end.
+    Use the clock given as ``CLOCK`` in the application config, if there is
+    one, for the time while handling the request.
+
+    Otherwise the system time is used.
     """
-    target_manager_base_url = os.environ['TARGET_MANAGER_BASE_URL']
-    response = requests.get(url=f'{target_manager_base_url}/databases')
-    return {
-        VuforiaDatabase.from_dict(database_dict=database_dict)
-        for database_dict in response.json()
-    }
+    g.clock_context = contextlib.ExitStack()
+    clock = VWS_FLASK_APP.config.get('CLOCK')
+    if clock is not None:
+        g.clock_context.enter_context(use_clock(clock=clock))
+
+
+@VWS_FLASK_APP.teardown_request
+def stop_using_configured_clock(_: Optional[BaseException]) -> None:
+    """
+    Stop using the clock which was used while handling the request.
+    """
+    clock_context = g.pop('clock_context', None)
+    if clock_context is not None:
+        clock_context.close()
+
+
+def get_target_manager_backend() -> TargetManagerBackend:
+    """
+    Return the backend given as ``TARGET_MANAGER_BACKEND`` in the application
+    config, if there is one, to use the target manager's databases.
+
+    Otherwise the target manager at the base URL given in the
+    ``TARGET_MANAGER_BASE_URL`` environment variable is used over HTTP.
+    """
+    backend: TargetManagerBackend = VWS_FLASK_APP.config.get(
+        'TARGET_MANAGER_BACKEND',
+        _HTTP_TARGET_MANAGER_BACKEND,
+    )
+    return backend
+
+
+def get_request_databases() -> Set[VuforiaDatabase]:
+    """
+    Get the database with the server access key given in the request, from the
+    target manager back-end.
+
+    The database is fetched at most once per request.
+
+    Returns:
+        A set of the database with the given server access key, or an empty set
+        if there is no such database.
+    """
+    if 'databases' not in g:
+        access_key = get_access_key(request_headers=dict(request.headers))
+        database = get_target_manager_backend().get_database_by_access_key(
+            key_name='server',
+            access_key=access_key,
+        )
+        g.databases = set() if database is None else {database}
+    databases: Set[VuforiaDatabase] = g.databases
+    return databases
 
 
 class ResponseNoContentTypeAdded(Response):
@@ -66,9 +124,11 @@ def set_terminate_wsgi_input() -> None:
     ``requests``, so that requests have the given ``Content-Length`` headers
     and the given data in ``request.headers`` and ``request.data``.
 
-    We set this to ``False`` when running an application as standalone.
+    We do not set this when running an application as standalone.
     This is because when running the Flask application, if this is set,
     reading ``request.data`` hangs.
+    Werkzeug treats the input as terminated if this is set at all, even to
+    ``False``.
 
     Therefore, when running the real Flask application, the behavior is not the
     same as the real Vuforia.
@@ -78,16 +138,20 @@ def set_terminate_wsgi_input() -> None:
         'TERMINATE_WSGI_INPUT',
         False,
     )
-    request.environ['wsgi.input_terminated'] = terminate_wsgi_input
+    if terminate_wsgi_input:
+        request.environ['wsgi.input_terminated'] = True
 
 
 @VWS_FLASK_APP.before_request
 def validate_request() -> None:
     """
     Run validators on the request.
+
+    The parsed body of the request is kept so that endpoints do not parse it
+    again.
     """
-    databases = get_all_databases()
-    run_services_validators(
+    databases = get_request_databases()
+    g.request_data = run_services_validators(
         request_headers=dict(request.headers),
         request_body=request.data,
         request_method=request.method,
@@ -119,7 +183,7 @@ def add_target() -> Response:
     processing_time_seconds = float(
         os.environ.get('PROCESSING_TIME_SECONDS', '0.5'),
     )
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -130,9 +194,8 @@ def add_target() -> Response:
 
     assert isinstance(database, VuforiaDatabase)
 
-    # We do not use ``request.get_json(force=True)`` because this only works
-    # when the content type is given as ``application/json``.
-    request_json = json.loads(request.data)
+    request_data: ServicesRequestData = g.request_data
+    request_json = request_data.request_json
     name = request_json['name']
     active_flag = request_json.get('active_flag')
     if active_flag is None:
@@ -141,17 +204,15 @@ def add_target() -> Response:
     new_target = Target(
         name=name,
         width=request_json['width'],
-        image_value=base64.b64decode(request_json['image']),
+        image_value=request_data.image_value,
         active_flag=active_flag,
         processing_time_seconds=processing_time_seconds,
         application_metadata=request_json.get('application_metadata'),
     )
 
-    target_manager_base_url = os.environ['TARGET_MANAGER_BASE_URL']
-    databases_url = f'{target_manager_base_url}/databases'
-    requests.post(
-        url=f'{databases_url}/{database.database_name}/targets',
-        json=new_target.to_dict(),
+    get_target_manager_backend().add_target(
+        database_name=database.database_name,
+        target=new_target,
     )
 
     date = email.utils.formatdate(None, localtime=False, usegmt=True)
@@ -182,7 +243,7 @@ def get_target(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Retrieve-a-Target-Record
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -192,9 +253,7 @@ def get_target(target_id: str) -> Response:
     )
 
     assert isinstance(database, VuforiaDatabase)
-    [target] = [
-        target for target in database.targets if target.target_id == target_id
-    ]
+    target = database.get_target(target_id=target_id)
 
     target_record = {
         'target_id': target.target_id,
@@ -233,7 +292,7 @@ def delete_target(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Delete-a-Target
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -243,17 +302,14 @@ def delete_target(target_id: str) -> Response:
     )
 
     assert isinstance(database, VuforiaDatabase)
-    [target] = [
-        target for target in database.targets if target.target_id == target_id
-    ]
+    target = database.get_target(target_id=target_id)
 
     if target.status == TargetStatuses.PROCESSING.value:
         raise TargetStatusProcessing
 
-    target_manager_base_url = os.environ['TARGET_MANAGER_BASE_URL']
-    databases_url = f'{target_manager_base_url}/databases'
-    requests.delete(
-        url=f'{databases_url}/{database.database_name}/targets/{target_id}',
+    get_target_manager_backend().delete_target(
+        database_name=database.database_name,
+        target_id=target_id,
     )
 
     body = {
@@ -282,7 +338,7 @@ def database_summary() -> Response:
     Fake implementation of
     https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Get-a-Database-Summary-Report
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -296,14 +352,14 @@ def database_summary() -> Response:
         'result_code': ResultCodes.SUCCESS.value,
         'transaction_id': uuid.uuid4().hex,
         'name': database.database_name,
-        'active_images': len(database.active_targets),
-        'inactive_images': len(database.inactive_targets),
-        'failed_images': len(database.failed_targets),
+        'active_images': database.active_target_count,
+        'inactive_images': database.inactive_target_count,
+        'failed_images': database.failed_target_count,
         'target_quota': database.target_quota,
         'total_recos': database.total_recos,
         'current_month_recos': database.current_month_recos,
         'previous_month_recos': database.previous_month_recos,
-        'processing_images': len(database.processing_targets),
+        'processing_images': database.processing_target_count,
         'reco_threshold': database.reco_threshold,
         'request_quota': database.request_quota,
         # We have ``self.request_count`` but Vuforia always shows 0.
@@ -332,7 +388,7 @@ def target_summary(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Retrieve-a-Target-Summary-Report
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -342,9 +398,7 @@ def target_summary(target_id: str) -> Response:
     )
 
     assert isinstance(database, VuforiaDatabase)
-    [target] = [
-        target for target in database.targets if target.target_id == target_id
-    ]
+    target = database.get_target(target_id=target_id)
     body = {
         'status': target.status,
         'transaction_id': uuid.uuid4().hex,
@@ -380,7 +434,7 @@ def get_duplicates(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Check-for-Duplicate-Targets
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -390,16 +444,18 @@ def get_duplicates(target_id: str) -> Response:
     )
 
     assert isinstance(database, VuforiaDatabase)
-    [target] = [
-        target for target in database.targets if target.target_id == target_id
-    ]
-    other_targets = set(database.targets) - {target}
+    target = database.get_target(target_id=target_id)
+    other_targets = (
+        database.get_targets_with_image(
+            image_value=target.image_bytes,
+        )
+        - {target}
+    )
 
     similar_targets: list[str] = [
         other.target_id
         for other in other_targets
-        if other.image_value == target.image_value
-        and TargetStatuses.FAILED.value not in (target.status, other.status)
+        if TargetStatuses.FAILED.value not in (target.status, other.status)
         and TargetStatuses.PROCESSING.value != other.status
         and other.active_flag
     ]
@@ -432,7 +488,7 @@ def target_list() -> Response:
     Fake implementation of
     https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Get-a-Target-List-for-a-Cloud-Database
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -470,10 +526,9 @@ def update_target(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Update-a-Target
     """
-    # We do not use ``request.get_json(force=True)`` because this only works
-    # when the content type is given as ``application/json``.
-    request_json = json.loads(request.data)
-    databases = get_all_databases()
+    request_data: ServicesRequestData = g.request_data
+    request_json = request_data.request_json
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -483,9 +538,7 @@ def update_target(target_id: str) -> Response:
     )
 
     assert isinstance(database, VuforiaDatabase)
-    [target] = [
-        target for target in database.targets if target.target_id == target_id
-    ]
+    target = database.get_target(target_id=target_id)
 
     if target.status != TargetStatuses.SUCCESS.value:
         raise TargetStatusNotSuccess
@@ -511,15 +564,13 @@ def update_target(target_id: str) -> Response:
         update_values['name'] = name
 
     if 'image' in request_json:
-        image = request_json['image']
-        update_values['image'] = image
+        update_values['image'] = request_data.image_value
 
-    target_manager_base_url = os.environ['TARGET_MANAGER_BASE_URL']
-    put_url = (
-        f'{target_manager_base_url}/databases/{database.database_name}/'
-        f'targets/{target_id}'
+    get_target_manager_backend().update_target(
+        database_name=database.database_name,
+        target_id=target_id,
+        update_values=update_values,
     )
-    requests.put(url=put_url, json=update_values)
 
     date = email.utils.formatdate(None, localtime=False, usegmt=True)
     headers = {
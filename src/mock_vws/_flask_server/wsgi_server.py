@@ -0,0 +1,138 @@
+"""
+A server which runs one of the Flask applications with ``gunicorn``, in
+several worker processes, each handling requests in a pool of threads.
+
+This is used rather than the Flask development server, which runs a debugger
+and a reloader and is not made for serving many clients.
+
+Run an application with, for example::
+
+    python src/mock_vws/_flask_server/wsgi_server.py vws
+"""
+
+import argparse
+import os
+from typing import Any, Callable, Dict, Iterable, List
+
+from flask import Flask
+from gunicorn.app.base import BaseApplication
+
+from mock_vws._flask_server.target_manager import TARGET_MANAGER_FLASK_APP
+from mock_vws._flask_server.vwq import CLOUDRECO_FLASK_APP
+from mock_vws._flask_server.vws import VWS_FLASK_APP
+
+_APPS = {
+    'target-manager': TARGET_MANAGER_FLASK_APP,
+    'vws': VWS_FLASK_APP,
+    'vwq': CLOUDRECO_FLASK_APP,
+}
+
+
+# ``gunicorn`` does not give types.
+class GunicornServer(BaseApplication):  # type: ignore[misc]
+    """
+    A ``gunicorn`` server for an application.
+
+    Workers are forked before they load the application, so no thread or
+    connection made by handling requests is shared between workers.
+    Each worker handles requests in a pool of threads, and idle keep-alive
+    connections wait for more requests without holding a thread.
+    """
+
+    def __init__(
+        self,
+        load_app: Callable[[], Callable[..., Iterable[bytes]]],
+        bind: List[str],
+        workers: int,
+        threads: int,
+        keep_alive_seconds: int,
+        graceful_timeout_seconds: int,
+    ) -> None:
+        """
+        Args:
+            load_app: A function which gives the WSGI application to serve,
+                which is called in each worker process.
+            bind: The addresses to serve on, each as ``HOST:PORT``.
+            workers: The number of worker processes.
+            threads: The number of requests each worker handles at once.
+            keep_alive_seconds: The longest time to keep an idle connection
+                open.
+            graceful_timeout_seconds: The longest time to wait for workers
+                to finish handling requests when stopping, after which they
+                are killed.
+        """
+        self._load_app = load_app
+        self._options: Dict[str, Any] = {
+            'bind': bind,
+            'workers': workers,
+            'worker_class': 'gthread',
+            'threads': threads,
+            'keepalive': keep_alive_seconds,
+            'graceful_timeout': graceful_timeout_seconds,
+        }
+        super().__init__()
+
+    def load_config(self) -> None:
+        """
+        Use the options given to this server.
+        """
+        for key, value in self._options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Callable[..., Iterable[bytes]]:
+        """
+        Give the application to serve.
+        """
+        return self._load_app()
+
+
+def bind_address(host: str, port: int) -> str:
+    """
+    Return a ``gunicorn`` address to serve on the given host and port.
+    """
+    if ':' in host:
+        return f'[{host}]:{port}'
+    return f'{host}:{port}'
+
+
+def main() -> None:
+    """
+    Serve the application named on the command line, with options given in
+    environment variables.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('app', choices=sorted(_APPS))
+    args = parser.parse_args()
+    workers = int(os.environ.get('WORKERS', '1'))
+    if (
+        args.app == 'target-manager'
+        and workers > 1
+        and 'TARGET_MANAGER_SQLITE_PATH' not in os.environ
+    ):
+        parser.error(
+            'The target manager can only have more than one worker when '
+            'TARGET_MANAGER_SQLITE_PATH is set, as otherwise each worker '
+            'has its own databases.',
+        )
+
+    app: Flask = _APPS[args.app]
+    server = GunicornServer(
+        load_app=lambda: app,
+        bind=[
+            bind_address(
+                host=os.environ.get('SERVER_HOST', '0.0.0.0'),
+                port=int(os.environ.get('PORT', '5000')),
+            ),
+        ],
+        workers=workers,
+        threads=int(os.environ.get('THREADS', '8')),
+        keep_alive_seconds=int(os.environ.get('KEEP_ALIVE_SECONDS', '5')),
+        graceful_timeout_seconds=int(
+            os.environ.get('GRACEFUL_TIMEOUT_SECONDS', '30'),
+        ),
+    )
+    server.run()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,198 @@
+"""
+Helpers for parsing ``multipart/form-data`` request bodies.
+
+These behave like the equivalent helpers in the standard library ``cgi``
+module, which is deprecated.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Tuple, Union
+
+
+def _split_params(line: str) -> Iterator[str]:
+    """
+    Split a header value on semicolons which are not inside quotes.
+
+    Args:
+        line: A header value.
+
+    Yields:
+        Each part of the header value.
+    """
+    remaining = ';' + line
+    while remaining[:1] == ';':
+        remaining = remaining[1:]
+        end = remaining.find(';')
+        while (
+            end > 0
+            and (remaining.count('"', 0, end) - remaining.count('\\"', 0, end))
+            % 2
+        ):
+            end = remaining.find(';', end + 1)
+        if end < 0:
+            end = len(remaining)
+        yield remaining[:end].strip()
+        remaining = remaining[end:]
+
+
+def parse_header(line: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Parse a header value such as a ``Content-Type`` header value.
+
+    Args:
+        line: A header value.
+
+    Returns:
+        The main value, and a mapping of lower case parameter names to
+        parameter values.
+    """
+    parts = _split_params(line=line)
+    main_value = next(parts)
+    params = {}
+    for part in parts:
+        name, separator, value = part.partition('=')
+        if not separator:
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+            value = value.replace('\\\\', '\\').replace('\\"', '"')
+        params[name.strip().lower()] = value
+    return main_value, params
+
+
+def _find_delimiter(
+    body: bytes,
+    delimiter: bytes,
+    start: int,
+) -> Tuple[int, int, bool]:
+    """
+    Find the next delimiter line in a multipart body.
+
+    Args:
+        body: The multipart body.
+        delimiter: ``--`` followed by the boundary.
+        start: The position to start searching from.
+
+    Returns:
+        The position at which the content before the delimiter line ends,
+        the position after the delimiter line and whether the delimiter is
+        the closing delimiter. If there is no delimiter, the content is taken
+        to run to the end of the body.
+    """
+    search_from = start
+    while True:
+        position = body.find(delimiter, search_from)
+        if position < 0:
+            # The content runs to the end of the body, without its final line
+            # ending.
+            content_end = len(body)
+            last_bytes_start = max(start, content_end - 2)
+            last_bytes = body[last_bytes_start:]
+            if last_bytes == b'\r\n':
+                content_end -= 2
+            elif last_bytes[-1:] in (b'\r', b'\n'):
+                content_end -= 1
+            return content_end, len(body), True
+
+        search_from = position + 1
+        if position == start:
+            content_end = position
+        elif body[position - 1] == ord('\n'):
+            content_end = position - 1
+            if content_end > start and body[content_end - 1] == ord('\r'):
+                content_end -= 1
+        else:
+            continue
+
+        delimiter_end = position + len(delimiter)
+        line_end = body.find(b'\n', delimiter_end)
+        if line_end < 0:
+            line_end = len(body)
+        rest_of_line = body[delimiter_end:line_end].strip()
+        if rest_of_line == b'--':
+            return content_end, line_end + 1, True
+        if not rest_of_line:
+            # A delimiter line which is not followed by a new line cannot be
+            # followed by a part.
+            is_last = line_end == len(body)
+            return content_end, line_end + 1, is_last
+
+
+def _parse_part_headers(body: bytes, start: int) -> Tuple[Dict[str, str], int]:
+    """
+    Parse the headers of one part of a multipart body.
+
+    Args:
+        body: The multipart body.
+        start: The position at which the part starts.
+
+    Returns:
+        A mapping of lower case header names to header values, and the
+        position at which the content of the part starts.
+    """
+    headers = {}
+    line_start = start
+    while line_start < len(body):
+        line_end = body.find(b'\n', line_start)
+        if line_end < 0:
+            line_end = len(body)
+        line = body[line_start:line_end].decode(errors='replace').rstrip('\r')
+        line_start = line_end + 1
+        if not line:
+            break
+        name, separator, value = line.partition(':')
+        if separator:
+            headers[name.strip().lower()] = value.strip()
+    return headers, min(line_start, len(body))
+
+
+def parse_multipart(
+    body: bytes,
+    boundary: str,
+) -> Dict[str, List[Union[str, bytes]]]:
+    """
+    Parse a ``multipart/form-data`` body in one pass.
+
+    The body is not copied. Only the values of fields are copied out of it.
+
+    Args:
+        body: The multipart body.
+        boundary: The boundary given in the ``Content-Type`` header.
+
+    Returns:
+        A mapping of field names to the values given for each field. The
+        values of file fields, which have a filename, are bytes. The values of
+        other fields are strings.
+    """
+    view = memoryview(body)
+    delimiter = b'--' + boundary.encode()
+    fields: Dict[str, List[Union[str, bytes]]] = {}
+
+    _, position, is_last = _find_delimiter(
+        body=body,
+        delimiter=delimiter,
+        start=0,
+    )
+    while not is_last and position < len(body):
+        headers, content_start = _parse_part_headers(
+            body=body,
+            start=position,
+        )
+        content_end, position, is_last = _find_delimiter(
+            body=body,
+            delimiter=delimiter,
+            start=content_start,
+        )
+
+        _, params = parse_header(
+            line=headers.get('content-disposition', ''),
+        )
+        content = bytes(view[content_start:content_end])
+        value: Union[str, bytes] = content
+        if 'filename' not in params:
+            value = content.decode('utf-8', errors='replace')
+        fields.setdefault(params.get('name', ''), []).append(value)
+
+    return fields
@@ -5,18 +5,16 @@ Tools for making Vuforia queries.
 from __future__ import annotations
 
 import base64
-import cgi
 import datetime
-import io
 import uuid
 from typing import Any, Dict, Set
 
-from backports.zoneinfo import ZoneInfo
-
 from mock_vws._base64_decoding import decode_base64
+from mock_vws._clock import time_now
 from mock_vws._constants import ResultCodes, TargetStatuses
 from mock_vws._database_matchers import get_database_matching_client_keys
 from mock_vws._mock_common import json_dump
+from mock_vws._query_validators.request_data import QueryRequestData
 from mock_vws.database import VuforiaDatabase
 
 
@@ -32,6 +30,7 @@ def get_query_match_response_text(
     request_method: str,
     request_path: str,
     databases: Set[VuforiaDatabase],
+    request_data: QueryRequestData,
     query_processes_deletion_seconds: int | float,
     query_recognizes_deletion_seconds: int | float,
 ) -> str:
@@ -42,6 +41,7 @@ def get_query_match_response_text(
         request_body: The body of the request.
         request_method: The HTTP method of the request.
         databases: All Vuforia databases.
+        request_data: The parsed body of the request.
         query_recognizes_deletion_seconds: The number of seconds after a target
             has been deleted that the query endpoint will still recognize the
             target for.
@@ -56,25 +56,15 @@ def get_query_match_response_text(
         ActiveMatchingTargetsDeleteProcessing: There is at least one active
             target which matches and was recently deleted.
     """
-    body_file = io.BytesIO(request_body)
-
-    _, pdict = cgi.parse_header(request_headers['Content-Type'])
-    parsed = cgi.parse_multipart(
-        fp=body_file,
-        pdict={
-            'boundary': pdict['boundary'].encode(),
-        },
-    )
-
-    [max_num_results] = parsed.get('max_num_results', ['1'])
+    fields = request_data.fields
+    [max_num_results] = fields.get('max_num_results', ['1'])
 
-    [include_target_data] = parsed.get('include_target_data', ['top'])
+    [include_target_data] = fields.get('include_target_data', ['top'])
+    assert isinstance(include_target_data, str)
     include_target_data = include_target_data.lower()
 
-    [image_value] = parsed['image']
-    assert isinstance(image_value, bytes)
-    gmt = ZoneInfo('GMT')
-    now = datetime.datetime.now(tz=gmt)
+    image_value = request_data.image_value
+    now = time_now()
 
     processing_timedelta = datetime.timedelta(
         seconds=query_processes_deletion_seconds,
@@ -94,11 +84,9 @@ def get_query_match_response_text(
 
     assert isinstance(database, VuforiaDatabase)
 
-    matching_targets = [
-        target
-        for target in database.targets
-        if target.image_value == image_value
-    ]
+    matching_targets = database.get_targets_with_image(
+        image_value=image_value,
+    )
 
     not_deleted_matches = [
         target
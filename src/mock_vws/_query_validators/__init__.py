@@ -36,6 +36,7 @@ from .image_validators import (
 from .include_target_data_validators import validate_include_target_data
 from .num_results_validators import validate_max_num_results
 from .project_state_validators import validate_project_state
+from .request_data import QueryRequestData
 
 
 def run_query_validators(
@@ -44,6 +45,7 @@ def run_query_validators(
     request_body: bytes,
     request_method: str,
     databases: Set[VuforiaDatabase],
+    request_data: QueryRequestData,
 ) -> None:
     """
     Run all validators.
@@ -54,6 +56,7 @@ def run_query_validators(
         request_body: The body of the request.
         request_method: The HTTP method of the request.
         databases: All Vuforia databases.
+        request_data: The parsed body of the request.
     """
     validate_content_length_header_is_int(request_headers=request_headers)
     validate_content_length_header_not_too_large(
@@ -90,38 +93,14 @@ def run_query_validators(
         request_headers=request_headers,
         request_body=request_body,
     )
-    validate_extra_fields(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_field_given(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_is_image(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_format(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_dimensions(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_file_size(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_max_num_results(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_include_target_data(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
+    validate_extra_fields(request_data=request_data)
+    validate_image_field_given(request_data=request_data)
+    validate_image_is_image(request_data=request_data)
+    validate_image_format(request_data=request_data)
+    validate_image_dimensions(request_data=request_data)
+    validate_image_file_size(request_data=request_data)
+    validate_max_num_results(request_data=request_data)
+    validate_include_target_data(request_data=request_data)
     validate_date_header_given(request_headers=request_headers)
     validate_date_format(request_headers=request_headers)
     validate_date_in_range(request_headers=request_headers)
@@ -2,9 +2,9 @@
 Validators for the ``Content-Type`` header.
 """
 
-import cgi
 from typing import Dict
 
+from mock_vws._multipart import parse_header
 from mock_vws._query_validators.exceptions import (
     ImageNotGiven,
     NoBoundaryFound,
@@ -33,7 +33,7 @@ def validate_content_type_header(
         NoContentType: The content type header is either empty or not given.
     """
     content_type_header = request_headers.get('Content-Type', '')
-    main_value, pdict = cgi.parse_header(content_type_header)
+    main_value, pdict = parse_header(line=content_type_header)
     if content_type_header == '':
         raise NoContentType
 
@@ -95,6 +95,9 @@ def validate_date_in_range(request_headers: Dict[str, str]) -> None:
             pass
 
     gmt = ZoneInfo('GMT')
+    # Clients sign requests with the system time, so we compare the date with
+    # the system time rather than with the time of the mock's clock, which may
+    # have been moved.
     now = datetime.datetime.now(tz=gmt)
     date_from_header = date.replace(tzinfo=gmt)
     time_difference = now - date_from_header
@@ -2,43 +2,29 @@
 Validators for the ``max_num_results`` fields.
 """
 
-import cgi
-import io
-from typing import Dict
-
 from mock_vws._query_validators.exceptions import (
     InvalidMaxNumResults,
     MaxNumResultsOutOfRange,
 )
+from mock_vws._query_validators.request_data import QueryRequestData
 
 
 def validate_max_num_results(
-    request_headers: Dict[str, str],
-    request_body: bytes,
+    request_data: QueryRequestData,
 ) -> None:
     """
     Validate the ``max_num_results`` field is either an integer within range or
     not given.
 
     Args:
-        request_headers: The headers sent with the request.
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
 
     Raises:
         InvalidMaxNumResults: The ``max_num_results`` given is not an integer
             less than or equal to the max integer in Java.
         MaxNumResultsOutOfRange: The ``max_num_results`` given is not in range.
     """
-    body_file = io.BytesIO(request_body)
-
-    _, pdict = cgi.parse_header(request_headers['Content-Type'])
-    parsed = cgi.parse_multipart(
-        fp=body_file,
-        pdict={
-            'boundary': pdict['boundary'].encode(),
-        },
-    )
-    [max_num_results] = parsed.get('max_num_results', ['1'])
+    [max_num_results] = request_data.fields.get('max_num_results', ['1'])
     assert isinstance(max_num_results, str)
 
     try:
@@ -0,0 +1,59 @@
+"""
+Data from a request to the query endpoint, parsed at most once.
+"""
+
+import io
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Union
+
+from PIL import Image
+
+from mock_vws._multipart import parse_header, parse_multipart
+
+
+@dataclass(frozen=True)
+class QueryRequestData:
+    """
+    The ``multipart/form-data`` body of a request to the query endpoint.
+
+    The body is parsed only when it is first needed, and then only once, so
+    that validators and the query matcher can share the parsed data.
+
+    Args:
+        content_type: The ``Content-Type`` header sent with the request.
+        request_body: The body of the request.
+    """
+
+    content_type: str
+    request_body: bytes
+
+    @cached_property
+    def fields(self) -> Dict[str, List[Union[str, bytes]]]:
+        """
+        The values given for each field in the body.
+        """
+        _, params = parse_header(line=self.content_type)
+        return parse_multipart(
+            body=self.request_body,
+            boundary=params['boundary'],
+        )
+
+    @cached_property
+    def image_value(self) -> bytes:
+        """
+        The given image.
+        """
+        [image] = self.fields['image']
+        assert isinstance(image, bytes)
+        return image
+
+    @cached_property
+    def pil_image(self) -> Image.Image:
+        """
+        The given image, opened with Pillow.
+
+        Raises:
+            OSError: The image is not an image file.
+        """
+        return Image.open(io.BytesIO(self.image_value))
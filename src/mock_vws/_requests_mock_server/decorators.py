@@ -6,18 +6,118 @@ from __future__ import annotations
 
 import re
 from contextlib import ContextDecorator
-from typing import Literal, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Literal, Pattern, Set, Tuple
 from urllib.parse import urljoin, urlparse
 
 import requests
 from requests_mock.mocker import Mocker
 
+from mock_vws._clock import use_clock
+from mock_vws._mock_common import Route
+from mock_vws.clock import Clock
 from mock_vws.database import VuforiaDatabase
+from mock_vws.image_store import ImageStore
 from mock_vws.target_manager import TargetManager
 
 from .mock_web_query_api import MockVuforiaWebQueryAPI
 from .mock_web_services_api import MockVuforiaWebServicesAPI
 
+if TYPE_CHECKING:
+    # These are public names in the type stubs of ``requests_mock``, for
+    # classes which it only has under private names.
+    from requests_mock.request import Request
+    from requests_mock.response import Context
+
+
+def _register_routes(
+    mock: Mocker,
+    base_url: str,
+    routes: Set[Route],
+    api: MockVuforiaWebServicesAPI | MockVuforiaWebQueryAPI,
+    clock: Clock,
+) -> None:
+    """
+    Register the given routes with a ``requests_mock`` mocker.
+
+    The URL patterns of the routes for each HTTP method are combined into one
+    regular expression, so ``requests_mock`` tries one matcher for each HTTP
+    method rather than one for each route.
+
+    Args:
+        mock: The mocker to register the routes with.
+        base_url: The base URL of the routes.
+        routes: The routes to send requests to.
+        api: The mock API which has a method for each route.
+        clock: The clock which gives the time while handling requests.
+    """
+    # The URL pattern of each route, by HTTP method and then by route name.
+    patterns_by_method: Dict[str, Dict[str, Pattern[str]]] = {}
+    for route in routes:
+        url_pattern = urljoin(base=base_url, url=route.path_pattern + '$')
+        for http_method in route.http_methods:
+            patterns = patterns_by_method.setdefault(http_method.upper(), {})
+            patterns[route.route_name] = re.compile(url_pattern)
+
+    for http_method, patterns in patterns_by_method.items():
+        combined_pattern = re.compile(
+            '|'.join(
+                f'(?:{pattern.pattern})' for pattern in patterns.values()
+            ),
+        )
+        mock.register_uri(
+            method=http_method,
+            url=combined_pattern,
+            text=_get_route_callback(patterns=patterns, api=api, clock=clock),
+        )
+
+
+def _get_route_callback(
+    patterns: Dict[str, Pattern[str]],
+    api: MockVuforiaWebServicesAPI | MockVuforiaWebQueryAPI,
+    clock: Clock,
+) -> Callable[[Request, Context], str]:
+    """
+    Get a ``requests_mock`` callback which gives the response text from the
+    route matching a request.
+
+    Args:
+        patterns: The URL pattern of each route which the callback is for, by
+            route name.
+        api: The mock API which has a method for each route.
+        clock: The clock which gives the time while handling requests.
+
+    Returns:
+        A callback which gives the response text from the matching route's
+        method.
+    """
+
+    def callback(request: Request, context: Context) -> str:
+        """
+        Give the response text from the route matching the given request.
+
+        Raises:
+            ValueError: The patterns of more than one route match the request.
+        """
+        route_names = [
+            route_name
+            for route_name, pattern in patterns.items()
+            if pattern.search(request.url)
+        ]
+        if len(route_names) > 1:
+            matching_routes = ', '.join(sorted(route_names))
+            message = (
+                f'More than one route matches {request.method} '
+                f'{request.url}: {matching_routes}.'
+            )
+            raise ValueError(message)
+
+        (route_name,) = route_names
+        with use_clock(clock=clock):
+            text: str = getattr(api, route_name)(request, context)
+        return text
+
+    return callback
+
 
 class MockVWS(ContextDecorator):
     """
@@ -32,6 +132,10 @@ class MockVWS(ContextDecorator):
         processing_time_seconds: int | float = 0.5,
         query_recognizes_deletion_seconds: int | float = 0.2,
         query_processes_deletion_seconds: int | float = 3,
+        clock: Clock | None = None,
+        image_store: ImageStore | None = None,
+        deleted_target_retention_seconds: int | float | None = None,
+        compress_images: bool = False,
     ) -> None:
         """
         Route requests to Vuforia's Web Service APIs to fakes of those APIs.
@@ -52,6 +156,24 @@ class MockVWS(ContextDecorator):
             query_processes_deletion_seconds: The number of seconds after a
                 target deletion is recognized that the query endpoint will
                 return a 500 response on a match.
+            clock: The clock which gives the time for the mock, for example
+                to decide whether a target is still processing.
+                By default a clock which follows the system time is used.
+            image_store: A store to keep the images of targets added through
+                the mock in, rather than in memory.
+            deleted_target_retention_seconds: The number of seconds to keep
+                deleted targets for, after which they are removed from their
+                database when its targets are next looked up, for example by
+                any request to the mock.
+                This cannot be less than the time for which deleted targets
+                affect queries, which is the default.
+                Use ``math.inf`` to keep deleted targets forever.
+            compress_images: Whether to keep the images of targets added
+                through the mock compressed in memory.
+                Images are decompressed only when they are needed, for
+                example to process or match a target, and recently used
+                images are kept decompressed.
+                This is not used if an image store is given.
 
         Raises:
             requests.exceptions.MissingSchema: There is no schema in a given
@@ -59,6 +181,7 @@ class MockVWS(ContextDecorator):
         """
         super().__init__()
         self._real_http = real_http
+        self._clock = clock or Clock()
         self._mock: Mocker
         self._target_manager = TargetManager()
 
@@ -74,9 +197,24 @@ class MockVWS(ContextDecorator):
                 error = missing_scheme_error.format(url=url)
                 raise requests.exceptions.MissingSchema(error)
 
+        # Deleted targets affect queries for this long, so we keep them for
+        # at least this long.
+        query_deletion_seconds = (
+            query_recognizes_deletion_seconds
+            + query_processes_deletion_seconds
+        )
+        if deleted_target_retention_seconds is None:
+            deleted_target_retention_seconds = query_deletion_seconds
+        self._deleted_target_retention_seconds = max(
+            deleted_target_retention_seconds,
+            query_deletion_seconds,
+        )
+
         self._mock_vws_api = MockVuforiaWebServicesAPI(
             target_manager=self._target_manager,
             processing_time_seconds=processing_time_seconds,
+            image_store=image_store,
+            compress_images=compress_images,
         )
 
         self._mock_vwq_api = MockVuforiaWebQueryAPI(
@@ -93,6 +231,10 @@ class MockVWS(ContextDecorator):
         """
         Add a cloud database.
 
+        The database uses the mock's clock, also outside of requests, and
+        targets deleted from the database are purged from it after the
+        retention period given when the mock was created.
+
         Args:
             database: The database to add.
 
@@ -100,6 +242,10 @@ class MockVWS(ContextDecorator):
             ValueError: One of the given database keys matches a key for an
                 existing database.
         """
+        database.use_clock(clock=self._clock)
+        database.keep_deleted_targets_for(
+            seconds=self._deleted_target_retention_seconds,
+        )
         self._target_manager.add_database(database=database)
 
     def __enter__(self) -> 'MockVWS':
@@ -111,31 +257,20 @@ class MockVWS(ContextDecorator):
         """
 
         with Mocker(real_http=self._real_http) as mock:
-            for route in self._mock_vws_api.routes:
-                url_pattern = urljoin(
-                    base=self._base_vws_url,
-                    url=route.path_pattern + '$',
-                )
-
-                for http_method in route.http_methods:
-                    mock.register_uri(
-                        method=http_method,
-                        url=re.compile(url_pattern),
-                        text=getattr(self._mock_vws_api, route.route_name),
-                    )
-
-            for route in self._mock_vwq_api.routes:
-                url_pattern = urljoin(
-                    base=self._base_vwq_url,
-                    url=route.path_pattern + '$',
-                )
-
-                for http_method in route.http_methods:
-                    mock.register_uri(
-                        method=http_method,
-                        url=re.compile(url_pattern),
-                        text=getattr(self._mock_vwq_api, route.route_name),
-                    )
+            _register_routes(
+                mock=mock,
+                base_url=self._base_vws_url,
+                routes=self._mock_vws_api.routes,
+                api=self._mock_vws_api,
+                clock=self._clock,
+            )
+            _register_routes(
+                mock=mock,
+                base_url=self._base_vwq_url,
+                routes=self._mock_vwq_api.routes,
+                api=self._mock_vwq_api,
+                clock=self._clock,
+            )
 
         self._mock = mock
         self._mock.start()
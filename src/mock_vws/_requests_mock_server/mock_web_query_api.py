@@ -14,6 +14,7 @@ from requests_mock import POST
 from requests_mock.request import _RequestObjectProxy
 from requests_mock.response import _Context
 
+from mock_vws._database_matchers import get_access_key
 from mock_vws._mock_common import Route
 from mock_vws._query_tools import (
     ActiveMatchingTargetsDeleteProcessing,
@@ -24,6 +25,8 @@ from mock_vws._query_validators.exceptions import (
     MatchProcessing,
     ValidatorException,
 )
+from mock_vws._query_validators.request_data import QueryRequestData
+from mock_vws.database import VuforiaDatabase
 from mock_vws.target_manager import TargetManager
 
 ROUTES = set()
@@ -101,6 +104,26 @@ class MockVuforiaWebQueryAPI:
             query_recognizes_deletion_seconds
         )
 
+    def _get_request_databases(
+        self,
+        request: _RequestObjectProxy,
+    ) -> Set[VuforiaDatabase]:
+        """
+        Get the database with the client access key given in a request.
+
+        Args:
+            request: The request.
+
+        Returns:
+            A set of the database with the client access key given in the
+            request, or an empty set if there is no such database.
+        """
+        access_key = get_access_key(request_headers=request.headers)
+        database = self._target_manager.get_database_by_client_access_key(
+            client_access_key=access_key,
+        )
+        return set() if database is None else {database}
+
     @route(path_pattern='/v1/query', http_methods={POST})
     def query(
         self,
@@ -110,13 +133,19 @@ class MockVuforiaWebQueryAPI:
         """
         Perform an image recognition query.
         """
+        databases = self._get_request_databases(request=request)
+        request_data = QueryRequestData(
+            content_type=request.headers.get('Content-Type', ''),
+            request_body=request.body,
+        )
         try:
             run_query_validators(
                 request_path=request.path,
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
-                databases=self._target_manager.databases,
+                databases=databases,
+                request_data=request_data,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -129,7 +158,8 @@ class MockVuforiaWebQueryAPI:
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
+                request_data=request_data,
                 query_processes_deletion_seconds=(
                     self._query_processes_deletion_seconds
                 ),
@@ -7,22 +7,25 @@ https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Service
 
 from __future__ import annotations
 
-import base64
+import contextlib
 import dataclasses
-import datetime
 import email.utils
+import functools
 import random
 import uuid
 from http import HTTPStatus
 from typing import Callable, Dict, Set
 
-from backports.zoneinfo import ZoneInfo
 from requests_mock import DELETE, GET, POST, PUT
 from requests_mock.request import _RequestObjectProxy
 from requests_mock.response import _Context
 
+from mock_vws._clock import time_now
 from mock_vws._constants import ResultCodes, TargetStatuses
-from mock_vws._database_matchers import get_database_matching_server_keys
+from mock_vws._database_matchers import (
+    get_access_key,
+    get_database_matching_server_keys,
+)
 from mock_vws._mock_common import Route, json_dump
 from mock_vws._services_validators import run_services_validators
 from mock_vws._services_validators.exceptions import (
@@ -32,6 +35,12 @@ from mock_vws._services_validators.exceptions import (
     ValidatorException,
 )
 from mock_vws.database import VuforiaDatabase
+from mock_vws.image_store import (
+    CompressedImage,
+    ImageStore,
+    StoredImage,
+    compress_image,
+)
 from mock_vws.target import Target
 from mock_vws.target_manager import TargetManager
 
@@ -78,17 +87,56 @@ def route(
     return decorator
 
 
+def _holding_database_lock(
+    method: Callable[..., str],
+) -> Callable[..., str]:
+    """
+    Make a route hold the lock of the database given in the request while it
+    runs.
+
+    This is for routes which check the database and then change it, so that
+    another thread cannot change the database between the check and the
+    change.
+    Requests for different databases do not wait for each other.
+    """
+
+    @functools.wraps(method)
+    def locked_method(
+        self: MockVuforiaWebServicesAPI,
+        request: _RequestObjectProxy,
+        context: _Context,
+    ) -> str:
+        """
+        Run the route while holding the database lock.
+        """
+        # pylint: disable=protected-access
+        databases = self._get_request_databases(request=request)
+        with contextlib.ExitStack() as stack:
+            for database in databases:
+                stack.enter_context(database.lock)
+            response_text = method(self, request, context)
+        return response_text
+
+    return locked_method
+
+
 class MockVuforiaWebServicesAPI:
     """
     A fake implementation of the Vuforia Web Services API.
 
     This implementation is tied to the implementation of `requests_mock`.
+
+    Requests can be made from several threads.
+    Requests which change a database hold that database's lock, so that they
+    are not interleaved with other changes to the same database.
     """
 
     def __init__(
         self,
         target_manager: TargetManager,
         processing_time_seconds: int | float,
+        image_store: ImageStore | None = None,
+        compress_images: bool = False,
     ) -> None:
         """
         Args:
@@ -96,6 +144,10 @@ class MockVuforiaWebServicesAPI:
             processing_time_seconds: The number of seconds to process each
                 image for. In the real Vuforia Web Services, this is not
                 deterministic.
+            image_store: A store to keep target images in, rather than in
+                memory. If this is not given, images are kept in memory.
+            compress_images: Whether to keep target images compressed in
+                memory. This is not used if an image store is given.
 
         Attributes:
             routes: The `Route`s to be used in the mock.
@@ -103,11 +155,48 @@ class MockVuforiaWebServicesAPI:
         self._target_manager = target_manager
         self.routes: Set[Route] = ROUTES
         self._processing_time_seconds = processing_time_seconds
+        self._image_store = image_store
+        self._compress_images = compress_images
+
+    def _keep_image(
+        self,
+        image_value: bytes,
+    ) -> bytes | StoredImage | CompressedImage:
+        """
+        Return the given image, a reference to it in the image store if there
+        is one, or the image compressed if images are kept compressed.
+        """
+        if self._image_store is not None:
+            return self._image_store.add(image_value=image_value)
+        if self._compress_images:
+            return compress_image(image_value=image_value)
+        return image_value
+
+    def _get_request_databases(
+        self,
+        request: _RequestObjectProxy,
+    ) -> Set[VuforiaDatabase]:
+        """
+        Get the database with the server access key given in a request.
+
+        Args:
+            request: The request.
+
+        Returns:
+            A set of the database with the server access key given in the
+            request, or an empty set if there is no such database.
+        """
+        access_key = get_access_key(request_headers=request.headers)
+        database = self._target_manager.get_database_by_server_access_key(
+            server_access_key=access_key,
+        )
+        return set() if database is None else {database}
 
     @route(
         path_pattern='/targets',
         http_methods={POST},
     )
+    @_holding_database_lock
     def add_target(
         self,
         request: _RequestObjectProxy,
@@ -119,13 +208,14 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Add-a-Target
         """
+        databases = self._get_request_databases(request=request)
         try:
-            run_services_validators(
+            request_data = run_services_validators(
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -137,24 +227,25 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
         assert isinstance(database, VuforiaDatabase)
 
-        given_active_flag = request.json().get('active_flag')
+        request_json = request_data.request_json
+        given_active_flag = request_json.get('active_flag')
         active_flag = {
             None: True,
             True: True,
             False: False,
         }[given_active_flag]
 
-        application_metadata = request.json().get('application_metadata')
+        application_metadata = request_json.get('application_metadata')
 
         new_target = Target(
-            name=request.json()['name'],
-            width=request.json()['width'],
-            image_value=base64.b64decode(request.json()['image']),
+            name=request_json['name'],
+            width=request_json['width'],
+            image_value=self._keep_image(image_value=request_data.image_value),
             active_flag=active_flag,
             processing_time_seconds=self._processing_time_seconds,
             application_metadata=application_metadata,
@@ -182,6 +273,7 @@ class MockVuforiaWebServicesAPI:
         path_pattern=f'/targets/{_TARGET_ID_PATTERN}',
         http_methods={DELETE},
     )
+    @_holding_database_lock
     def delete_target(
         self,
         request: _RequestObjectProxy,
@@ -193,13 +285,14 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Delete-a-Target
         """
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -212,7 +305,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
         assert isinstance(database, VuforiaDatabase)
@@ -225,7 +318,7 @@ class MockVuforiaWebServicesAPI:
             context.status_code = target_processing_exception.status_code
             return target_processing_exception.response_text
 
-        now = datetime.datetime.now(tz=target.upload_date.tzinfo)
+        now = time_now()
         new_target = dataclasses.replace(target, delete_date=now)
         database.targets.remove(target)
         database.targets.add(new_target)
@@ -257,13 +350,14 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Get-a-Database-Summary-Report
         """
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -277,7 +371,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
         assert isinstance(database, VuforiaDatabase)
@@ -286,14 +380,14 @@ class MockVuforiaWebServicesAPI:
             'result_code': ResultCodes.SUCCESS.value,
             'transaction_id': uuid.uuid4().hex,
             'name': database.database_name,
-            'active_images': len(database.active_targets),
-            'inactive_images': len(database.inactive_targets),
-            'failed_images': len(database.failed_targets),
+            'active_images': database.active_target_count,
+            'inactive_images': database.inactive_target_count,
+            'failed_images': database.failed_target_count,
             'target_quota': database.target_quota,
             'total_recos': database.total_recos,
             'current_month_recos': database.current_month_recos,
             'previous_month_recos': database.previous_month_recos,
-            'processing_images': len(database.processing_targets),
+            'processing_images': database.processing_target_count,
             'reco_threshold': database.reco_threshold,
             'request_quota': database.request_quota,
             'request_usage': 0,
@@ -320,13 +414,14 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Get-a-Target-List-for-a-Cloud-Database
         """
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -338,7 +433,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
         assert isinstance(database, VuforiaDatabase)
@@ -372,13 +467,14 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Retrieve-a-Target-Record
         """
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -390,7 +486,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
         assert isinstance(database, VuforiaDatabase)
         target_id = request.path.split('/')[-1]
@@ -437,13 +533,14 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Check-for-Duplicate-Targets
         """
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -455,20 +552,23 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
         assert isinstance(database, VuforiaDatabase)
         target_id = request.path.split('/')[-1]
         target = database.get_target(target_id=target_id)
 
-        other_targets = set(database.targets) - {target}
+        other_targets = (
+            database.get_targets_with_image(
+                image_value=target.image_bytes,
+            )
+            - {target}
+        )
 
         similar_targets: list[str] = [
             other.target_id
             for other in other_targets
-            if other.image_value == target.image_value
-            and TargetStatuses.FAILED.value
-            not in (target.status, other.status)
+            if TargetStatuses.FAILED.value not in (target.status, other.status)
             and TargetStatuses.PROCESSING.value != other.status
             and other.active_flag
         ]
@@ -494,6 +594,7 @@ class MockVuforiaWebServicesAPI:
         path_pattern=f'/targets/{_TARGET_ID_PATTERN}',
         http_methods={PUT},
     )
+    @_holding_database_lock
     def update_target(
         self,
         request: _RequestObjectProxy,
@@ -505,13 +606,14 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Update-a-Target
         """
+        databases = self._get_request_databases(request=request)
         try:
-            run_services_validators(
+            request_data = run_services_validators(
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -523,7 +625,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
         assert isinstance(database, VuforiaDatabase)
@@ -540,26 +642,29 @@ class MockVuforiaWebServicesAPI:
             context.status_code = exception.status_code
             return exception.response_text
 
-        width = request.json().get('width', target.width)
-        name = request.json().get('name', target.name)
-        active_flag = request.json().get('active_flag', target.active_flag)
-        application_metadata = request.json().get(
+        request_json = request_data.request_json
+        width = request_json.get('width', target.width)
+        name = request_json.get('name', target.name)
+        active_flag = request_json.get('active_flag', target.active_flag)
+        application_metadata = request_json.get(
             'application_metadata',
             target.application_metadata,
         )
 
         image_value = target.image_value
-        if 'image' in request.json():
-            image_value = base64.b64decode(request.json()['image'])
+        if 'image' in request_json:
+            image_value = self._keep_image(
+                image_value=request_data.image_value,
+            )
 
-        if 'active_flag' in request.json() and active_flag is None:
+        if 'active_flag' in request_json and active_flag is None:
             fail_exception = Fail(status_code=HTTPStatus.BAD_REQUEST)
             context.headers = fail_exception.headers
             context.status_code = fail_exception.status_code
             return fail_exception.response_text
 
         if (
-            'application_metadata' in request.json()
+            'application_metadata' in request_json
             and application_metadata is None
         ):
             fail_exception = Fail(status_code=HTTPStatus.BAD_REQUEST)
@@ -573,8 +678,7 @@ class MockVuforiaWebServicesAPI:
         available_values = list(set(range(6)) - {target.tracking_rating})
         processed_tracking_rating = random.choice(available_values)
 
-        gmt = ZoneInfo('GMT')
-        last_modified_date = datetime.datetime.now(tz=gmt)
+        last_modified_date = time_now()
 
         new_target = dataclasses.replace(
             target,
@@ -616,13 +720,14 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/articles/Solution/How-To-Use-the-Vuforia-Web-Services-API.html#How-To-Retrieve-a-Target-Summary-Report
         """
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
                 request_body=request.body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -634,7 +739,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
         assert isinstance(database, VuforiaDatabase)
         target_id = request.path.split('/')[-1]
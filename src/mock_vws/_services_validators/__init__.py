@@ -47,6 +47,7 @@ from .name_validators import (
     validate_name_type,
 )
 from .project_state_validators import validate_project_state
+from .request_data import ServicesRequestData
 from .target_validators import validate_target_id_exists
 from .width_validators import validate_width
 
@@ -57,7 +58,7 @@ def run_services_validators(
     request_body: bytes,
     request_method: str,
     databases: Set[VuforiaDatabase],
-) -> None:
+) -> ServicesRequestData:
     """
     Run all validators.
 
@@ -67,7 +68,13 @@ def run_services_validators(
         request_body: The body of the request.
         request_method: The HTTP method of the request.
         databases: All Vuforia databases.
+
+    Returns:
+        The parsed body of the request, so that the endpoint does not parse
+        the body again.
     """
+    request_data = ServicesRequestData(request_body=request_body)
+
     validate_auth_header_exists(request_headers=request_headers)
     validate_auth_header_has_signature(request_headers=request_headers)
     validate_access_key_exists(
@@ -96,49 +103,49 @@ def run_services_validators(
         databases=databases,
     )
     validate_json(
-        request_body=request_body,
+        request_data=request_data,
         request_method=request_method,
     )
     validate_keys(
-        request_body=request_body,
+        request_data=request_data,
         request_path=request_path,
         request_method=request_method,
     )
-    validate_metadata_type(request_body=request_body)
-    validate_metadata_encoding(request_body=request_body)
-    validate_metadata_size(request_body=request_body)
-    validate_active_flag(request_body=request_body)
-
-    validate_image_data_type(request_body=request_body)
-    validate_image_encoding(request_body=request_body)
-    validate_image_is_image(request_body=request_body)
-    validate_image_format(request_body=request_body)
-    validate_image_color_space(request_body=request_body)
-    validate_image_size(request_body=request_body)
-
-    validate_name_type(request_body=request_body)
-    validate_name_length(request_body=request_body)
+    validate_metadata_type(request_data=request_data)
+    validate_metadata_encoding(request_data=request_data)
+    validate_metadata_size(request_data=request_data)
+    validate_active_flag(request_data=request_data)
+
+    validate_image_data_type(request_data=request_data)
+    validate_image_encoding(request_data=request_data)
+    validate_image_is_image(request_data=request_data)
+    validate_image_format(request_data=request_data)
+    validate_image_color_space(request_data=request_data)
+    validate_image_size(request_data=request_data)
+
+    validate_name_type(request_data=request_data)
+    validate_name_length(request_data=request_data)
     validate_name_characters_in_range(
-        request_body=request_body,
+        request_data=request_data,
         request_method=request_method,
         request_path=request_path,
     )
     validate_name_does_not_exist_new_target(
         request_headers=request_headers,
-        request_body=request_body,
+        request_data=request_data,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
     validate_name_does_not_exist_existing_target(
         request_headers=request_headers,
-        request_body=request_body,
+        request_data=request_data,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
 
-    validate_width(request_body=request_body)
+    validate_width(request_data=request_data)
     validate_content_type_header_given(
         request_headers=request_headers,
         request_method=request_method,
@@ -162,3 +169,5 @@ def run_services_validators(
         request_headers=request_headers,
         request_body=request_body,
     )
+
+    return request_data
@@ -2,32 +2,31 @@
 Validators for the active flag.
 """
 
-import json
 from http import HTTPStatus
 
 from mock_vws._services_validators.exceptions import Fail
+from mock_vws._services_validators.request_data import ServicesRequestData
 
 
-def validate_active_flag(request_body: bytes) -> None:
+def validate_active_flag(request_data: ServicesRequestData) -> None:
     """
     Validate the active flag data given to the endpoint.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
 
     Raises:
         Fail: There is active flag data given to the endpoint which is not
             either a Boolean or NULL.
     """
 
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    if 'active_flag' not in json.loads(request_text):
+    if 'active_flag' not in request_data.request_json:
         return
 
-    active_flag = json.loads(request_text).get('active_flag')
+    active_flag = request_data.request_json.get('active_flag')
 
     if active_flag is None or isinstance(active_flag, bool):
         return
@@ -2,7 +2,6 @@
 Validators for given JSON.
 """
 
-import json
 from http import HTTPStatus
 from json.decoder import JSONDecodeError
 
@@ -12,17 +11,18 @@ from mock_vws._services_validators.exceptions import (
     Fail,
     UnnecessaryRequestBody,
 )
+from mock_vws._services_validators.request_data import ServicesRequestData
 
 
 def validate_json(
-    request_body: bytes,
+    request_data: ServicesRequestData,
     request_method: str,
 ) -> None:
     """
     Validate that there is either no JSON given or the JSON given is valid.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
         request_method: The HTTP method of the request.
 
     Raises:
@@ -31,13 +31,13 @@ def validate_json(
         Fail: The request body includes invalid JSON.
     """
 
-    if not request_body:
+    if not request_data.request_body:
         return
 
     if request_method not in (POST, PUT):
         raise UnnecessaryRequestBody
 
     try:
-        json.loads(request_body.decode())
+        request_data.request_json
     except JSONDecodeError as exc:
         raise Fail(status_code=HTTPStatus.BAD_REQUEST) from exc
@@ -2,7 +2,6 @@
 Validators for JSON keys.
 """
 
-import json
 import re
 from dataclasses import dataclass
 from http import HTTPStatus
@@ -11,6 +10,7 @@ from typing import Set
 from requests_mock import DELETE, GET, POST, PUT
 
 from .exceptions import Fail
+from .request_data import ServicesRequestData
 
 
 @dataclass
@@ -34,7 +34,7 @@ class _Route:
 
 
 def validate_keys(
-    request_body: bytes,
+    request_data: ServicesRequestData,
     request_path: str,
     request_method: str,
 ) -> None:
@@ -42,7 +42,7 @@ def validate_keys(
     Validate the request keys given to a VWS endpoint.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
         request_path: The path of the request.
         request_method: The HTTP method of the request.
 
@@ -142,12 +142,10 @@ def validate_keys(
     optional_keys = matching_route.optional_keys
     allowed_keys = mandatory_keys.union(optional_keys)
 
-    if not request_body and not allowed_keys:
+    if not request_data.request_body and not allowed_keys:
         return
 
-    request_text = request_body.decode()
-    request_json = json.loads(request_text)
-    given_keys = set(request_json.keys())
+    given_keys = set(request_data.request_json.keys())
     all_given_keys_allowed = given_keys.issubset(allowed_keys)
     all_mandatory_keys_given = mandatory_keys.issubset(given_keys)
 
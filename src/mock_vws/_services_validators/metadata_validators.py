@@ -3,29 +3,28 @@ Validators for application metadata.
 """
 
 import binascii
-import json
 from http import HTTPStatus
 
 from mock_vws._base64_decoding import decode_base64
 from mock_vws._services_validators.exceptions import Fail, MetadataTooLarge
+from mock_vws._services_validators.request_data import ServicesRequestData
 
 
-def validate_metadata_size(request_body: bytes) -> None:
+def validate_metadata_size(request_data: ServicesRequestData) -> None:
     """
     Validate that the given application metadata is a string or 1024 * 1024
     bytes or fewer.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
 
     Raises:
         MetadataTooLarge: Application metadata is given and it is too large.
     """
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    request_json = json.loads(request_text)
+    request_json = request_data.request_json
     application_metadata = request_json.get('application_metadata')
     if application_metadata is None:
         return
@@ -38,22 +37,21 @@ def validate_metadata_size(request_body: bytes) -> None:
     raise MetadataTooLarge
 
 
-def validate_metadata_encoding(request_body: bytes) -> None:
+def validate_metadata_encoding(request_data: ServicesRequestData) -> None:
     """
     Validate that the given application metadata can be base64 decoded.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
 
     Raises:
         Fail: Application metadata is given and it cannot be base64
             decoded.
     """
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    request_json = json.loads(request_text)
+    request_json = request_data.request_json
     if 'application_metadata' not in request_json:
         return
 
@@ -68,21 +66,20 @@ def validate_metadata_encoding(request_body: bytes) -> None:
         raise Fail(status_code=HTTPStatus.UNPROCESSABLE_ENTITY) from exc
 
 
-def validate_metadata_type(request_body: bytes) -> None:
+def validate_metadata_type(request_data: ServicesRequestData) -> None:
     """
     Validate that the given application metadata is a string or NULL.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
 
     Raises:
         Fail: Application metadata is given and it is not a string or NULL.
     """
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    request_json = json.loads(request_text)
+    request_json = request_data.request_json
     if 'application_metadata' not in request_json:
         return
 
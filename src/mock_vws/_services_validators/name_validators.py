@@ -2,7 +2,6 @@
 Validators for target names.
 """
 
-import json
 from http import HTTPStatus
 from typing import Dict, Set
 
@@ -12,11 +11,12 @@ from mock_vws._services_validators.exceptions import (
     OopsErrorOccurredResponse,
     TargetNameExist,
 )
+from mock_vws._services_validators.request_data import ServicesRequestData
 from mock_vws.database import VuforiaDatabase
 
 
 def validate_name_characters_in_range(
-    request_body: bytes,
+    request_data: ServicesRequestData,
     request_method: str,
     request_path: str,
 ) -> None:
@@ -24,7 +24,7 @@ def validate_name_characters_in_range(
     Validate the characters in the name argument given to a VWS endpoint.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
         request_method: The HTTP method the request is using.
         request_path: The path to the endpoint.
 
@@ -35,14 +35,13 @@ def validate_name_characters_in_range(
             another endpoint.
     """
 
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    if 'name' not in json.loads(request_text):
+    if 'name' not in request_data.request_json:
         return
 
-    name = json.loads(request_text)['name']
+    name = request_data.request_json['name']
 
     if all(ord(character) <= 65535 for character in name):
         return
@@ -53,25 +52,24 @@ def validate_name_characters_in_range(
     raise TargetNameExist
 
 
-def validate_name_type(request_body: bytes) -> None:
+def validate_name_type(request_data: ServicesRequestData) -> None:
     """
     Validate the type of the name argument given to a VWS endpoint.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
 
     Raises:
         Fail: A name is given and it is not a string.
     """
 
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    if 'name' not in json.loads(request_text):
+    if 'name' not in request_data.request_json:
         return
 
-    name = json.loads(request_text)['name']
+    name = request_data.request_json['name']
 
     if isinstance(name, str):
         return
@@ -79,25 +77,24 @@ def validate_name_type(request_body: bytes) -> None:
     raise Fail(status_code=HTTPStatus.BAD_REQUEST)
 
 
-def validate_name_length(request_body: bytes) -> None:
+def validate_name_length(request_data: ServicesRequestData) -> None:
     """
     Validate the length of the name argument given to a VWS endpoint.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
 
     Raises:
         Fail: A name is given and it is not a between 1 and 64 characters in
             length.
     """
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    if 'name' not in json.loads(request_text):
+    if 'name' not in request_data.request_json:
         return
 
-    name = json.loads(request_text)['name']
+    name = request_data.request_json['name']
 
     if name and len(name) < 65:
         return
@@ -107,7 +104,7 @@ def validate_name_length(request_body: bytes) -> None:
 
 def validate_name_does_not_exist_new_target(
     databases: Set[VuforiaDatabase],
-    request_body: bytes,
+    request_data: ServicesRequestData,
     request_headers: Dict[str, str],
     request_method: str,
     request_path: str,
@@ -117,7 +114,7 @@ def validate_name_does_not_exist_new_target(
 
     Args:
         databases: All Vuforia databases.
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
         request_headers: The headers sent with the request.
         request_method: The HTTP method the request is using.
         request_path: The path to the endpoint.
@@ -125,21 +122,20 @@ def validate_name_does_not_exist_new_target(
     Raises:
         TargetNameExist: The target name already exists.
     """
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    if 'name' not in json.loads(request_text):
+    if 'name' not in request_data.request_json:
         return
 
     split_path = request_path.split('/')
     if len(split_path) != 2:
         return
 
-    name = json.loads(request_text)['name']
+    name = request_data.request_json['name']
     database = get_database_matching_server_keys(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_data.request_body,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
@@ -148,8 +144,8 @@ def validate_name_does_not_exist_new_target(
 
     matching_name_targets = [
         target
-        for target in database.not_deleted_targets
-        if target.name == name
+        for target in database.get_targets_with_name(name=name)
+        if not target.delete_date
     ]
 
     if not matching_name_targets:
@@ -160,7 +156,7 @@ def validate_name_does_not_exist_new_target(
 
 def validate_name_does_not_exist_existing_target(
     request_headers: Dict[str, str],
-    request_body: bytes,
+    request_data: ServicesRequestData,
     request_method: str,
     request_path: str,
     databases: Set[VuforiaDatabase],
@@ -171,7 +167,7 @@ def validate_name_does_not_exist_existing_target(
 
     Args:
         databases: All Vuforia databases.
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
         request_headers: The headers sent with the request.
         request_method: The HTTP method the request is using.
         request_path: The path to the endpoint.
@@ -181,11 +177,10 @@ def validate_name_does_not_exist_existing_target(
             target being updated but it is the same as another target.
     """
 
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    if 'name' not in json.loads(request_text):
+    if 'name' not in request_data.request_json:
         return
 
     split_path = request_path.split('/')
@@ -194,10 +189,10 @@ def validate_name_does_not_exist_existing_target(
 
     target_id = split_path[-1]
 
-    name = json.loads(request_text)['name']
+    name = request_data.request_json['name']
     database = get_database_matching_server_keys(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_data.request_body,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
@@ -206,8 +201,8 @@ def validate_name_does_not_exist_existing_target(
 
     matching_name_targets = [
         target
-        for target in database.not_deleted_targets
-        if target.name == name
+        for target in database.get_targets_with_name(name=name)
+        if not target.delete_date
     ]
 
     if not matching_name_targets:
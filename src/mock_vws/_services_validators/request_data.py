@@ -0,0 +1,59 @@
+"""
+Data from a request to a VWS endpoint, parsed at most once.
+"""
+
+import io
+import json
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict
+
+from PIL import Image
+
+from mock_vws._base64_decoding import decode_base64
+
+
+@dataclass(frozen=True)
+class ServicesRequestData:
+    """
+    The body of a request to a VWS endpoint.
+
+    Each part of the body is parsed only when it is first needed, and then
+    only once, so that validators can share the parsed data.
+
+    Args:
+        request_body: The body of the request.
+    """
+
+    request_body: bytes
+
+    @cached_property
+    def request_json(self) -> Dict[str, Any]:
+        """
+        The body of the request parsed as JSON.
+
+        Raises:
+            json.decoder.JSONDecodeError: The body is not valid JSON.
+        """
+        request_json: Dict[str, Any] = json.loads(self.request_body.decode())
+        return request_json
+
+    @cached_property
+    def image_value(self) -> bytes:
+        """
+        The given image, decoded from base64.
+
+        Raises:
+            binascii.Error: The image cannot be base64 decoded.
+        """
+        return decode_base64(encoded_data=self.request_json['image'])
+
+    @cached_property
+    def pil_image(self) -> Image.Image:
+        """
+        The given image, opened with Pillow.
+
+        Raises:
+            OSError: The image is not an image file.
+        """
+        return Image.open(io.BytesIO(self.image_value))
@@ -46,10 +46,9 @@ def validate_target_id_exists(
     assert isinstance(database, VuforiaDatabase)
 
     try:
-        [_] = [
-            target
-            for target in database.not_deleted_targets
-            if target.target_id == target_id
-        ]
+        target = database.get_target(target_id=target_id)
     except ValueError as exc:
         raise UnknownTarget from exc
+
+    if target.delete_date:
+        raise UnknownTarget
@@ -2,32 +2,31 @@
 Validators for the width field.
 """
 
-import json
 import numbers
 from http import HTTPStatus
 
 from mock_vws._services_validators.exceptions import Fail
+from mock_vws._services_validators.request_data import ServicesRequestData
 
 
-def validate_width(request_body: bytes) -> None:
+def validate_width(request_data: ServicesRequestData) -> None:
     """
     Validate the width argument given to a VWS endpoint.
 
     Args:
-        request_body: The body of the request.
+        request_data: The parsed body of the request.
 
     Raises:
         Fail: Width is given and is not a positive number.
     """
 
-    if not request_body:
+    if not request_data.request_body:
         return
 
-    request_text = request_body.decode()
-    if 'width' not in json.loads(request_text):
+    if 'width' not in request_data.request_json:
         return
 
-    width = json.loads(request_text).get('width')
+    width = request_data.request_json['width']
 
     width_is_number = isinstance(width, numbers.Number)
     width_positive = width_is_number and width > 0
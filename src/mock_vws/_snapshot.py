@@ -0,0 +1,262 @@
+"""
+A compact binary format for snapshots of databases and their targets.
+
+A snapshot file is laid out as:
+
+* A header, with a magic value, the format version and the position and
+  length of the metadata section.
+* The image section, which has the raw bytes of each distinct image once.
+* The metadata section, which is JSON. It has the databases and their
+  targets, and an index of where each image is in the image section.
+
+Images are not base64 encoded, and the metadata section does not include
+them, so it is small even when there are many large images.
+The file is memory mapped when it is loaded. Images are not copied out of
+it; each loaded target refers to where its image is in the file, and the image
+is read only when it is needed.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping
+
+from mock_vws.database import VuforiaDatabase, indexed_targets
+from mock_vws.image_store import MappedImage, image_digest
+from mock_vws.states import States
+from mock_vws.target import Target, TargetDict
+
+_MAGIC = b'MOCKVWS\x00'
+_FORMAT_VERSION = 2
+# The magic value, the format version, and the position and length of the
+# metadata section.
+_HEADER = struct.Struct('<8sIQQ')
+
+
+def target_metadata(target: Target) -> Dict[str, Any]:
+    """
+    Return the details of a target which can be dumped as JSON, without its
+    image.
+    """
+    delete_date: str | None = None
+    if target.delete_date is not None:
+        delete_date = target.delete_date.isoformat()
+
+    return {
+        'name': target.name,
+        'width': target.width,
+        'active_flag': target.active_flag,
+        'processing_time_seconds': target.processing_time_seconds,
+        'processed_tracking_rating': target.processed_tracking_rating,
+        'application_metadata': target.application_metadata,
+        'target_id': target.target_id,
+        'last_modified_date': target.last_modified_date.isoformat(),
+        'delete_date_optional': delete_date,
+        'upload_date': target.upload_date.isoformat(),
+    }
+
+
+def target_from_metadata(
+    metadata: Dict[str, Any],
+    image_value: bytes | MappedImage,
+) -> Target:
+    """
+    Load a target from the details given by :func:`target_metadata` and its
+    image.
+    """
+    target_dict: TargetDict = {
+        'name': metadata['name'],
+        'width': metadata['width'],
+        'image_base64': '',
+        'active_flag': metadata['active_flag'],
+        'processing_time_seconds': metadata['processing_time_seconds'],
+        'processed_tracking_rating': metadata['processed_tracking_rating'],
+        'application_metadata': metadata['application_metadata'],
+        'target_id': metadata['target_id'],
+        'last_modified_date': metadata['last_modified_date'],
+        'delete_date_optional': metadata['delete_date_optional'],
+        'upload_date': metadata['upload_date'],
+    }
+    target = Target.from_dict(target_dict=target_dict)
+    # We set the image after loading so that it is not base64 encoded only to
+    # be decoded again.
+    return dataclasses.replace(target, image_value=image_value)
+
+
+def database_metadata(database: VuforiaDatabase) -> Dict[str, Any]:
+    """
+    Return the details of a database which can be dumped as JSON, without its
+    targets.
+    """
+    return {
+        'database_name': database.database_name,
+        'server_access_key': database.server_access_key,
+        'server_secret_key': database.server_secret_key,
+        'client_access_key': database.client_access_key,
+        'client_secret_key': database.client_secret_key,
+        'state_name': database.state.name,
+    }
+
+
+def database_from_metadata(
+    metadata: Dict[str, Any],
+    targets: Iterable[Target],
+    image_digests: Mapping[str, str] | None = None,
+) -> VuforiaDatabase:
+    """
+    Load a database from the details given by :func:`database_metadata` and
+    its targets.
+
+    The images of targets whose digests are given in ``image_digests``, keyed
+    by target ID, are not hashed to index them.
+    """
+    return VuforiaDatabase(
+        database_name=metadata['database_name'],
+        server_access_key=metadata['server_access_key'],
+        server_secret_key=metadata['server_secret_key'],
+        client_access_key=metadata['client_access_key'],
+        client_secret_key=metadata['client_secret_key'],
+        state=States[metadata['state_name']],
+        targets=indexed_targets(
+            targets=targets,
+            image_digests=image_digests,
+        ),
+    )
+
+
+def write_snapshot(path: Path, databases: Iterable[VuforiaDatabase]) -> None:
+    """
+    Write a snapshot of databases to a file.
+
+    Each image is written as it is reached, so the file is not built in
+    memory.
+
+    The snapshot is written to a temporary file which then replaces any file
+    at the given path, so that a snapshot which is memory mapped by loaded
+    targets is not changed under them.
+
+    Args:
+        path: The path to write the snapshot to.
+        databases: The databases to write.
+    """
+    # Each image is given by its offset and length in the image section, and
+    # its digest.
+    image_index: List[List[int | str]] = []
+    image_positions: Dict[str, int] = {}
+    databases_metadata = []
+
+    temporary_path = path.with_name(path.name + '.tmp')
+    with temporary_path.open('wb') as snapshot_file:
+        # We do not yet know where the metadata section is, so we write the
+        # header again at the end.
+        snapshot_file.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, 0, 0))
+        for database in databases:
+            targets_metadata = []
+            for target in database.targets:
+                digest = image_digest(image_value=target.image_value)
+                if digest not in image_positions:
+                    image_positions[digest] = len(image_index)
+                    offset = snapshot_file.tell() - _HEADER.size
+                    length = snapshot_file.write(target.image_bytes)
+                    image_index.append([offset, length, digest])
+                targets_metadata.append(
+                    {
+                        **target_metadata(target=target),
+                        'image_index': image_positions[digest],
+                    },
+                )
+
+            databases_metadata.append(
+                {
+                    **database_metadata(database=database),
+                    'targets': targets_metadata,
+                },
+            )
+
+        metadata = json.dumps(
+            {'images': image_index, 'databases': databases_metadata},
+            separators=(',', ':'),
+        ).encode()
+        metadata_offset = snapshot_file.tell()
+        snapshot_file.write(metadata)
+        snapshot_file.seek(0)
+        snapshot_file.write(
+            _HEADER.pack(
+                _MAGIC,
+                _FORMAT_VERSION,
+                metadata_offset,
+                len(metadata),
+            ),
+        )
+    os.replace(temporary_path, path)
+
+
+def read_snapshot(path: Path) -> Iterator[VuforiaDatabase]:
+    """
+    Read databases from a snapshot file.
+
+    The file stays memory mapped while any loaded target refers to it.
+
+    Args:
+        path: The path to a snapshot written by :func:`write_snapshot`.
+
+    Yields:
+        Each database in the snapshot.
+
+    Raises:
+        ValueError: The file is not a snapshot in a supported format.
+    """
+    with path.open('rb') as snapshot_file:
+        if os.fstat(snapshot_file.fileno()).st_size < _HEADER.size:
+            raise ValueError(f'"{path}" is not a snapshot file.')
+        # The mapping is kept open after the file is closed, for as long as
+        # images refer to it.
+        snapshot = mmap.mmap(
+            snapshot_file.fileno(),
+            0,
+            access=mmap.ACCESS_READ,
+        )
+
+    (
+        magic,
+        format_version,
+        metadata_offset,
+        metadata_length,
+    ) = _HEADER.unpack_from(snapshot)
+    if magic != _MAGIC:
+        raise ValueError(f'"{path}" is not a snapshot file.')
+    if format_version != _FORMAT_VERSION:
+        raise ValueError(
+            f'"{path}" has snapshot format version {format_version}, '
+            f'but only version {_FORMAT_VERSION} is supported.',
+        )
+
+    metadata_end = metadata_offset + metadata_length
+    metadata = json.loads(snapshot[metadata_offset:metadata_end])
+    # Targets which share an image share a reference to it.
+    images = [
+        MappedImage(
+            mapping=snapshot,
+            offset=_HEADER.size + offset,
+            length=length,
+            digest=digest,
+        )
+        for offset, length, digest in metadata['images']
+    ]
+
+    for database_dict in metadata['databases']:
+        yield database_from_metadata(
+            metadata=database_dict,
+            targets=[
+                target_from_metadata(
+                    metadata=target_dict,
+                    image_value=images[target_dict['image_index']],
+                )
+                for target_dict in database_dict['targets']
+            ],
+        )
@@ -0,0 +1,67 @@
+"""
+A clock which gives the time for the Vuforia mocks.
+"""
+
+from __future__ import annotations
+
+import datetime
+
+from backports.zoneinfo import ZoneInfo
+
+
+class Clock:
+    """
+    A clock which gives the time for a Vuforia mock.
+
+    By default the clock follows the system time.
+    The clock can be moved forward, for example to skip the time which it
+    takes to process a target, and it can be frozen so that the time changes
+    only when the clock is moved.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a clock which follows the system time.
+        """
+        self._offset = datetime.timedelta()
+        self._frozen_time: datetime.datetime | None = None
+
+    def now(self) -> datetime.datetime:
+        """
+        Return the current time of this clock in the GMT time zone.
+        """
+        if self._frozen_time is not None:
+            return self._frozen_time
+
+        gmt = ZoneInfo('GMT')
+        return datetime.datetime.now(tz=gmt) + self._offset
+
+    def advance(self, seconds: int | float) -> None:
+        """
+        Move the clock forward.
+
+        Args:
+            seconds: The number of seconds to move the clock forward by.
+        """
+        time_difference = datetime.timedelta(seconds=seconds)
+        if self._frozen_time is not None:
+            self._frozen_time += time_difference
+        else:
+            self._offset += time_difference
+
+    def freeze(self) -> None:
+        """
+        Stop the clock at its current time.
+        """
+        self._frozen_time = self.now()
+
+    def unfreeze(self) -> None:
+        """
+        Start the clock again from the time at which it is stopped.
+        """
+        if self._frozen_time is None:
+            return
+
+        gmt = ZoneInfo('GMT')
+        self._offset = self._frozen_time - datetime.datetime.now(tz=gmt)
+        self._frozen_time = None
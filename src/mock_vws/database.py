@@ -4,11 +4,38 @@ Utilities for managing mock Vuforia databases.
 
 from __future__ import annotations
 
+import datetime
+import heapq
+import itertools
+import math
+import threading
 import uuid
 from dataclasses import dataclass, field
-from typing import List, Set, TypedDict
+from typing import (
+    AbstractSet,
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Set,
+    Tuple,
+    TypedDict,
+    TypeVar,
+    Union,
+)
 
+from mock_vws._clock import time_now
 from mock_vws._constants import TargetStatuses
+from mock_vws.clock import Clock
+from mock_vws.image_store import (
+    CompressedImage,
+    MappedImage,
+    StoredImage,
+    image_digest,
+)
 from mock_vws.states import States
 from mock_vws.target import Target, TargetDict
 
@@ -27,6 +54,12 @@ class DatabaseDict(TypedDict):
     targets: List[TargetDict]
 
 
+_IndexKey = TypeVar('_IndexKey', str, bytes)
+# An index keeps a single target, or a set of targets when more than one
+# target has the same key.
+_IndexEntry = Union[Target, Set[Target]]
+
+
 def _random_hex() -> str:
     """
     Return a random hex value.
@@ -34,6 +67,608 @@ def _random_hex() -> str:
     return uuid.uuid4().hex
 
 
+def _image_digest(
+    image_value: bytes | StoredImage | CompressedImage | MappedImage,
+) -> bytes:
+    """
+    Return a digest of an image to use as an index key.
+
+    We keep the digest as bytes as that is smaller than the hexadecimal
+    digest.
+    """
+    return bytes.fromhex(image_digest(image_value=image_value))
+
+
+def _add_to_index(
+    index: Dict[_IndexKey, _IndexEntry],
+    key: _IndexKey,
+    target: Target,
+) -> None:
+    """
+    Add a target to an index of targets.
+
+    Most keys have only one target, so we keep a single target without a
+    set, as a set for each target would use a lot of memory.
+    """
+    entry = index.get(key)
+    if entry is None:
+        index[key] = target
+    elif isinstance(entry, Target):
+        if entry != target:
+            index[key] = {entry, target}
+    else:
+        entry.add(target)
+
+
+def _remove_from_index(
+    index: Dict[_IndexKey, _IndexEntry],
+    key: _IndexKey,
+    target: Target,
+) -> None:
+    """
+    Remove a target from an index of targets.
+    """
+    entry = index[key]
+    if isinstance(entry, Target):
+        if entry == target:
+            del index[key]
+        return
+
+    entry.discard(target)
+    if len(entry) == 1:
+        (index[key],) = entry
+
+
+def _processing_finished(target: Target) -> datetime.datetime:
+    """
+    Return when a target finishes processing.
+    """
+    return target.last_modified_date + datetime.timedelta(
+        seconds=target.processing_time_seconds,
+    )
+
+
+def _targets_in_index(
+    index: Dict[_IndexKey, _IndexEntry],
+    key: _IndexKey,
+) -> Set[Target]:
+    """
+    Return the targets with the given key in an index of targets.
+    """
+    entry = index.get(key)
+    if entry is None:
+        return set()
+    if isinstance(entry, Target):
+        return {entry}
+    return set(entry)
+
+
+class _TargetSet(Set[Target]):
+    """
+    A set of targets which keeps indexes of the targets by ID, by name and by
+    image, so that targets can be found without checking every target.
+
+    All ways of changing the set keep the indexes up to date.
+
+    The set can be used from several threads.
+    Each change to the set and its indexes, and each look up, is made while
+    holding ``lock``.
+    Iterating over the set iterates over a snapshot of it, so that the set can
+    change while it is iterated over.
+    The snapshot is kept until the set next changes, so that iterating over a
+    set which has not changed does not copy it again.
+    """
+
+    def __init__(
+        self,
+        targets: Iterable[Target] = (),
+        image_digests: Mapping[str, str] | None = None,
+    ) -> None:
+        """
+        Args:
+            targets: The targets to start with.
+            image_digests: The hexadecimal SHA-256 digests of the images of
+                any of the given targets, keyed by target ID. The images of
+                these targets are not hashed again.
+        """
+        super().__init__()
+        # This is re-entrant so that methods which hold the lock can call
+        # other methods which take it, and so that callers can hold it while
+        # making several changes.
+        self.lock = threading.RLock()
+        # Deleted targets are purged once they were deleted longer ago than
+        # this, if it is set.
+        self._deleted_target_retention: datetime.timedelta | None = None
+        # The time is given by this clock if it is set, and otherwise by the
+        # clock of the mock which is handling a request.
+        self._clock: Clock | None = None
+        # A copy of the targets, made when the set is iterated over, or
+        # ``None`` if the set has changed since.
+        self._snapshot: FrozenSet[Target] | None = None
+        self._reset_indexes()
+        known_digests = image_digests or {}
+        for target in targets:
+            digest = known_digests.get(target.target_id)
+            self._add(
+                element=target,
+                digest=None if digest is None else bytes.fromhex(digest),
+            )
+
+    def __iter__(self) -> Iterator[Target]:
+        """
+        Iterate over a snapshot of the targets.
+        """
+        with self.lock:
+            if self._snapshot is None:
+                self._snapshot = frozenset(super().__iter__())
+            snapshot = self._snapshot
+        return iter(snapshot)
+
+    def _reset_indexes(self) -> None:
+        """
+        Make all indexes empty.
+        """
+        self._targets_by_id: Dict[str, _IndexEntry] = {}
+        self._targets_by_name: Dict[str, _IndexEntry] = {}
+        self._targets_by_image_digest: Dict[bytes, _IndexEntry] = {}
+        # Targets which have not been deleted, and which were processing when
+        # we last checked, with a queue of them ordered by when their
+        # processing finishes.
+        self._processing_targets: Set[Target] = set()
+        self._processing_queue: List[
+            Tuple[datetime.datetime, int, Target]
+        ] = []
+        self._processing_queue_counter = itertools.count()
+        # Targets which have not been deleted and which have finished
+        # processing, by status and active flag.
+        # Every target which has not been deleted is in exactly one of these
+        # sets or the set of processing targets, so we do not keep another
+        # set of them.
+        self._processed_targets: Dict[Tuple[str, bool], Set[Target]] = {}
+        self._processed_at: datetime.datetime | None = None
+        # Targets which have been deleted, with a queue of them ordered by
+        # when they were deleted, so that they can be purged.
+        self._deleted_targets: Set[Target] = set()
+        self._deleted_queue: List[Tuple[datetime.datetime, int, Target]] = []
+
+    def _queue_for_processing(self, target: Target) -> None:
+        """
+        Record that a target which has not been deleted may be processing.
+        """
+        self._processing_targets.add(target)
+        heapq.heappush(
+            self._processing_queue,
+            (
+                _processing_finished(target=target),
+                next(self._processing_queue_counter),
+                target,
+            ),
+        )
+
+    def _catch_up_with_time(self) -> None:
+        """
+        Move targets which have finished processing since we last checked out
+        of the processing queue, and purge deleted targets which are no
+        longer kept.
+        """
+        with self.lock:
+            now = time_now() if self._clock is None else self._clock.now()
+            if self._deleted_target_retention is not None:
+                self.purge_deleted_targets(
+                    deleted_before=now - self._deleted_target_retention,
+                )
+            if self._processed_at is not None and now < self._processed_at:
+                # The time has gone backwards, for example because a test has
+                # faked the time or moved a clock back, so targets which
+                # finished processing after the new time are processing again.
+                # This is rare, so we check every processed target rather than
+                # keep processed targets in order.
+                for targets in self._processed_targets.values():
+                    for target in list(targets):
+                        if _processing_finished(target=target) >= now:
+                            targets.remove(target)
+                            self._queue_for_processing(target=target)
+            self._processed_at = now
+
+            while (
+                self._processing_queue and self._processing_queue[0][0] < now
+            ):
+                _, _, target = heapq.heappop(self._processing_queue)
+                # The target may have been removed since it was queued.
+                if target not in self._processing_targets:
+                    continue
+                self._processing_targets.remove(target)
+                key = (target.status, target.active_flag)
+                self._processed_targets.setdefault(key, set()).add(target)
+
+    def get_not_deleted_targets(self) -> Set[Target]:
+        """
+        Return all targets which have not been deleted.
+        """
+        with self.lock:
+            self._catch_up_with_time()
+            not_deleted_targets = set(self._processing_targets)
+            for targets in self._processed_targets.values():
+                not_deleted_targets.update(targets)
+            return not_deleted_targets
+
+    def get_processing_targets(self) -> Set[Target]:
+        """
+        Return all targets which have not been deleted and are processing.
+        """
+        with self.lock:
+            self._catch_up_with_time()
+            return set(self._processing_targets)
+
+    def get_processed_targets(
+        self,
+        status: TargetStatuses,
+        active_flag: bool,
+    ) -> Set[Target]:
+        """
+        Return all targets which have not been deleted and which have finished
+        processing with the given status and active flag.
+        """
+        key = (status.value, active_flag)
+        with self.lock:
+            self._catch_up_with_time()
+            return set(self._processed_targets.get(key, set()))
+
+    def count_processing_targets(self) -> int:
+        """
+        Return the number of targets which have not been deleted and are
+        processing.
+
+        This does not copy the targets.
+        """
+        with self.lock:
+            self._catch_up_with_time()
+            return len(self._processing_targets)
+
+    def count_processed_targets(
+        self,
+        status: TargetStatuses,
+        active_flag: bool,
+    ) -> int:
+        """
+        Return the number of targets which have not been deleted and which
+        have finished processing with the given status and active flag.
+
+        This does not copy the targets.
+        """
+        key = (status.value, active_flag)
+        with self.lock:
+            self._catch_up_with_time()
+            return len(self._processed_targets.get(key, ()))
+
+    def get_deleted_targets(self) -> Set[Target]:
+        """
+        Return all targets which have been deleted and not purged.
+        """
+        with self.lock:
+            self._catch_up_with_time()
+            return set(self._deleted_targets)
+
+    def has_targets_deleted_before(
+        self,
+        deleted_before: datetime.datetime,
+    ) -> bool:
+        """
+        Return whether any target was deleted before the given time.
+
+        This only looks at the start of the queue of deleted targets.
+        """
+        with self.lock:
+            # Targets which have been removed since they were queued are left
+            # in the queue until they are reached.
+            while (
+                self._deleted_queue
+                and self._deleted_queue[0][2] not in self._deleted_targets
+            ):
+                heapq.heappop(self._deleted_queue)
+            return bool(
+                self._deleted_queue
+                and self._deleted_queue[0][0] < deleted_before,
+            )
+
+    def keep_deleted_targets_for(self, seconds: float) -> None:
+        """
+        Purge targets which were deleted longer ago than the given number of
+        seconds whenever the set is looked up, or forever if it is infinite.
+        """
+        with self.lock:
+            self._deleted_target_retention = None
+            if not math.isinf(seconds):
+                self._deleted_target_retention = datetime.timedelta(
+                    seconds=seconds,
+                )
+
+    def use_clock(self, clock: Clock) -> None:
+        """
+        Use the given clock for the time, for the set and for the statuses of
+        its targets.
+        """
+        with self.lock:
+            self._clock = clock
+            for target in set.__iter__(self):
+                target.use_clock(clock=clock)
+
+    def purge_deleted_targets(
+        self,
+        deleted_before: datetime.datetime,
+    ) -> Set[Target]:
+        """
+        Remove targets which were deleted before the given time.
+
+        Returns:
+            The removed targets.
+        """
+        purged_targets = set()
+        with self.lock:
+            while (
+                self._deleted_queue
+                and self._deleted_queue[0][0] < deleted_before
+            ):
+                _, _, target = heapq.heappop(self._deleted_queue)
+                # The target may have been removed since it was queued.
+                if target in self._deleted_targets:
+                    self.discard(target)
+                    purged_targets.add(target)
+        return purged_targets
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """
+        Make copies, such as with ``copy.copy``, rebuild the indexes rather
+        than share them.
+        """
+        return (self.__class__, (list(self),))
+
+    def get_targets_with_id(self, target_id: str) -> Set[Target]:
+        """
+        Return all targets with the given ID.
+        """
+        with self.lock:
+            self._catch_up_with_time()
+            return _targets_in_index(
+                index=self._targets_by_id,
+                key=target_id,
+            )
+
+    def get_targets_with_name(self, name: str) -> Set[Target]:
+        """
+        Return all targets with the given name.
+        """
+        with self.lock:
+            self._catch_up_with_time()
+            return _targets_in_index(index=self._targets_by_name, key=name)
+
+    def get_targets_with_image(self, image_value: bytes) -> Set[Target]:
+        """
+        Return all targets with the given image.
+        """
+        digest = _image_digest(image_value=image_value)
+        with self.lock:
+            self._catch_up_with_time()
+            candidates = _targets_in_index(
+                index=self._targets_by_image_digest,
+                key=digest,
+            )
+        return {
+            target
+            for target in candidates
+            if target.image_bytes == image_value
+        }
+
+    def add(self, element: Target) -> None:
+        """
+        Add a target.
+        """
+        self._add(element=element, digest=None)
+
+    def _add(self, element: Target, digest: bytes | None) -> None:
+        """
+        Add a target, with the digest of its image if that is known.
+        """
+        if digest is None:
+            digest = _image_digest(image_value=element.image_value)
+        with self.lock:
+            if element in self:
+                return
+            if self._clock is not None:
+                element.use_clock(clock=self._clock)
+            super().add(element)
+            self._snapshot = None
+            _add_to_index(
+                index=self._targets_by_id,
+                key=element.target_id,
+                target=element,
+            )
+            _add_to_index(
+                index=self._targets_by_name,
+                key=element.name,
+                target=element,
+            )
+            _add_to_index(
+                index=self._targets_by_image_digest,
+                key=digest,
+                target=element,
+            )
+            if not element.delete_date:
+                self._queue_for_processing(target=element)
+            else:
+                self._deleted_targets.add(element)
+                heapq.heappush(
+                    self._deleted_queue,
+                    (
+                        element.delete_date,
+                        next(self._processing_queue_counter),
+                        element,
+                    ),
+                )
+
+    def discard(self, element: object) -> None:
+        """
+        Remove a target if it is in the set.
+        """
+        with self.lock:
+            if not isinstance(element, Target) or element not in self:
+                return
+            super().discard(element)
+            self._snapshot = None
+            _remove_from_index(
+                index=self._targets_by_id,
+                key=element.target_id,
+                target=element,
+            )
+            _remove_from_index(
+                index=self._targets_by_name,
+                key=element.name,
+                target=element,
+            )
+            _remove_from_index(
+                index=self._targets_by_image_digest,
+                key=_image_digest(image_value=element.image_value),
+                target=element,
+            )
+            self._processing_targets.discard(element)
+            for targets in self._processed_targets.values():
+                targets.discard(element)
+            self._deleted_targets.discard(element)
+            # Removed targets are left in the queues until they are reached,
+            # unless the queue of deleted targets has grown to be mostly
+            # removed targets, which would keep their images in memory.
+            if len(self._deleted_queue) > 2 * len(self._deleted_targets) + 64:
+                self._deleted_queue = [
+                    item
+                    for item in self._deleted_queue
+                    if item[2] in self._deleted_targets
+                ]
+                heapq.heapify(self._deleted_queue)
+
+    def remove(self, element: Target) -> None:
+        """
+        Remove a target.
+
+        Raises:
+            KeyError: The target is not in the set.
+        """
+        with self.lock:
+            if element not in self:
+                raise KeyError(element)
+            self.discard(element)
+
+    def pop(self) -> Target:
+        """
+        Remove and return an arbitrary target.
+
+        Raises:
+            KeyError: The set is empty.
+        """
+        with self.lock:
+            element = next(iter(self)) if self else super().pop()
+            self.discard(element)
+            return element
+
+    def clear(self) -> None:
+        """
+        Remove all targets.
+        """
+        with self.lock:
+            super().clear()
+            self._snapshot = None
+            self._reset_indexes()
+
+    def update(self, *s: Iterable[Target]) -> None:
+        """
+        Add all targets from the given iterables.
+        """
+        with self.lock:
+            for targets in s:
+                for target in targets:
+                    self.add(target)
+
+    def difference_update(self, *s: Iterable[Any]) -> None:
+        """
+        Remove all targets which are in any of the given iterables.
+        """
+        with self.lock:
+            for targets in s:
+                for target in list(targets):
+                    self.discard(target)
+
+    def intersection_update(self, *s: Iterable[Any]) -> None:
+        """
+        Remove all targets which are not in all of the given iterables.
+        """
+        with self.lock:
+            to_keep = set(self).intersection(*s)
+            for target in set(self) - to_keep:
+                self.discard(target)
+
+    def symmetric_difference_update(self, s: Iterable[Target]) -> None:
+        """
+        Remove targets which are in the given iterable and add targets which
+        are only in the given iterable.
+        """
+        with self.lock:
+            for target in set(s):
+                if target in self:
+                    self.discard(target)
+                else:
+                    self.add(target)
+
+    def __ior__(  # type: ignore[override,misc]
+        self,
+        s: AbstractSet[Target],
+    ) -> _TargetSet:
+        """
+        Add all targets from the given set.
+        """
+        self.update(s)
+        return self
+
+    def __iand__(self, s: AbstractSet[object]) -> _TargetSet:
+        """
+        Remove all targets which are not in the given set.
+        """
+        self.intersection_update(s)
+        return self
+
+    def __isub__(self, s: AbstractSet[object]) -> _TargetSet:
+        """
+        Remove all targets which are in the given set.
+        """
+        self.difference_update(s)
+        return self
+
+    def __ixor__(  # type: ignore[override,misc]
+        self,
+        s: AbstractSet[Target],
+    ) -> _TargetSet:
+        """
+        Remove targets which are in the given set and add targets which are
+        only in the given set.
+        """
+        self.symmetric_difference_update(s)
+        return self
+
+
+def indexed_targets(
+    targets: Iterable[Target],
+    image_digests: Mapping[str, str] | None = None,
+) -> Set[Target]:
+    """
+    Return a set of targets to give to a database, with its indexes built.
+
+    Args:
+        targets: The targets.
+        image_digests: The hexadecimal SHA-256 digests of the images of any
+            of the targets, keyed by target ID. The images of these targets
+            are not hashed again to index them.
+    """
+    return _TargetSet(targets=targets, image_digests=image_digests)
+
+
 @dataclass(eq=True, frozen=True)
 class VuforiaDatabase:
     """
@@ -74,6 +709,27 @@ class VuforiaDatabase:
     total_recos = 0
     target_quota = 1000
 
+    def __post_init__(self) -> None:
+        """
+        Keep the given targets in a set which indexes them by image.
+        """
+        if not isinstance(self.targets, _TargetSet):
+            object.__setattr__(self, 'targets', _TargetSet(self.targets))
+
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        A lock to hold while making changes to the database's targets which
+        depend on each other, such as replacing a target or checking that a
+        name is not used before adding a target with it.
+
+        Each single change to ``targets`` is safe to make from several threads
+        without this lock.
+        The lock is re-entrant.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.lock
+
     def to_dict(self) -> DatabaseDict:
         """
         Dump a target to a dictionary which can be loaded as JSON.
@@ -93,11 +749,27 @@ class VuforiaDatabase:
         """
         Return a target from the database with the given ID.
         """
-        [target] = [
-            target for target in self.targets if target.target_id == target_id
-        ]
+        assert isinstance(self.targets, _TargetSet)
+        [target] = self.targets.get_targets_with_id(target_id=target_id)
         return target
 
+    def get_targets_with_name(self, name: str) -> Set[Target]:
+        """
+        Return all targets in the database with the given name.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.get_targets_with_name(name=name)
+
+    def get_targets_with_image(self, image_value: bytes) -> Set[Target]:
+        """
+        Return all targets in the database with the given image.
+
+        This uses an index of the targets by image, so it does not compare the
+        given image with the image of every target.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.get_targets_with_image(image_value=image_value)
+
     @classmethod
     def from_dict(cls, database_dict: DatabaseDict) -> VuforiaDatabase:
         """
@@ -116,55 +788,181 @@ class VuforiaDatabase:
             },
         )
 
+    def purge_deleted_targets(
+        self,
+        deleted_before: datetime.datetime,
+    ) -> Set[Target]:
+        """
+        Remove targets which were deleted before the given time.
+
+        Deleted targets are otherwise kept, so that queries can behave as VWS
+        does shortly after a target is deleted.
+        This uses a queue of deleted targets ordered by when they were
+        deleted, so it does not check every target.
+
+        Args:
+            deleted_before: Targets deleted before this time are removed.
+
+        Returns:
+            The removed targets.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.purge_deleted_targets(
+            deleted_before=deleted_before,
+        )
+
+    def has_targets_deleted_before(
+        self,
+        deleted_before: datetime.datetime,
+    ) -> bool:
+        """
+        Return whether any target was deleted before the given time and has
+        not been purged, without checking every target.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.has_targets_deleted_before(
+            deleted_before=deleted_before,
+        )
+
+    def keep_deleted_targets_for(self, seconds: float) -> None:
+        """
+        Purge targets which were deleted longer ago than the given number of
+        seconds whenever the database's targets are looked up, for example to
+        list them, count them or find one by ID, name or image.
+
+        The time is given by the clock which the database uses, if it has
+        been given one with :meth:`use_clock`.
+
+        Args:
+            seconds: The number of seconds to keep deleted targets for. Use
+                ``math.inf`` to keep them forever, which is the default.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        self.targets.keep_deleted_targets_for(seconds=seconds)
+
+    def use_clock(self, clock: Clock) -> None:
+        """
+        Use the given clock for the time when the database's targets are
+        looked up, for example to find which targets are processing or which
+        deleted targets to purge, and for the statuses of its targets.
+
+        Otherwise the time is given by the clock of the mock which is
+        handling a request, or by the system time outside of requests.
+
+        Args:
+            clock: The clock to use.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        self.targets.use_clock(clock=clock)
+
+    @property
+    def deleted_targets(self) -> Set[Target]:
+        """
+        All targets which have been deleted and have not been purged.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.get_deleted_targets()
+
     @property
     def not_deleted_targets(self) -> Set[Target]:
         """
         All targets which have not been deleted.
         """
-        return {target for target in self.targets if not target.delete_date}
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.get_not_deleted_targets()
 
     @property
     def active_targets(self) -> Set[Target]:
         """
         All active targets.
         """
-        return {
-            target
-            for target in self.not_deleted_targets
-            if target.status == TargetStatuses.SUCCESS.value
-            and target.active_flag
-        }
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.get_processed_targets(
+            status=TargetStatuses.SUCCESS,
+            active_flag=True,
+        )
 
     @property
     def inactive_targets(self) -> Set[Target]:
         """
         All inactive targets.
         """
-        return {
-            target
-            for target in self.not_deleted_targets
-            if target.status == TargetStatuses.SUCCESS.value
-            and not target.active_flag
-        }
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.get_processed_targets(
+            status=TargetStatuses.SUCCESS,
+            active_flag=False,
+        )
 
     @property
     def failed_targets(self) -> Set[Target]:
         """
         All failed targets.
         """
-        return {
-            target
-            for target in self.not_deleted_targets
-            if target.status == TargetStatuses.FAILED.value
-        }
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.get_processed_targets(
+            status=TargetStatuses.FAILED,
+            active_flag=True,
+        ) | self.targets.get_processed_targets(
+            status=TargetStatuses.FAILED,
+            active_flag=False,
+        )
 
     @property
     def processing_targets(self) -> Set[Target]:
         """
         All processing targets.
         """
-        return {
-            target
-            for target in self.not_deleted_targets
-            if target.status == TargetStatuses.PROCESSING.value
-        }
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.get_processing_targets()
+
+    @property
+    def active_target_count(self) -> int:
+        """
+        The number of active targets.
+
+        This is kept as targets change, so the targets are not counted.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.count_processed_targets(
+            status=TargetStatuses.SUCCESS,
+            active_flag=True,
+        )
+
+    @property
+    def inactive_target_count(self) -> int:
+        """
+        The number of inactive targets.
+
+        This is kept as targets change, so the targets are not counted.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.count_processed_targets(
+            status=TargetStatuses.SUCCESS,
+            active_flag=False,
+        )
+
+    @property
+    def failed_target_count(self) -> int:
+        """
+        The number of failed targets.
+
+        This is kept as targets change, so the targets are not counted.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.count_processed_targets(
+            status=TargetStatuses.FAILED,
+            active_flag=True,
+        ) + self.targets.count_processed_targets(
+            status=TargetStatuses.FAILED,
+            active_flag=False,
+        )
+
+    @property
+    def processing_target_count(self) -> int:
+        """
+        The number of processing targets.
+
+        This is kept as targets change, so the targets are not counted.
+        """
+        assert isinstance(self.targets, _TargetSet)
+        return self.targets.count_processing_targets()
@@ -0,0 +1,190 @@
+"""
+Ways to keep target images other than as raw bytes in memory: in files in an
+image store, compressed in memory, or in a memory mapped file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import tempfile
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Tuple
+
+# The number of decompressed images to keep.
+# Processing and matching a target needs its image several times in a row, so
+# a few images are enough.
+_DECOMPRESSED_IMAGE_CACHE_SIZE = 32
+
+
+@dataclass(frozen=True)
+class StoredImage:
+    """
+    An image kept in an image store.
+
+    This holds only the location of the image, so that the image is read only
+    when it is needed.
+
+    Args:
+        path: The path to the file which contains the image.
+        digest: The SHA-256 digest of the image, in hexadecimal.
+    """
+
+    path: str
+    digest: str
+
+    def read(self) -> bytes:
+        """
+        Read the image.
+        """
+        return Path(self.path).read_bytes()
+
+
+@dataclass(frozen=True)
+class MappedImage:
+    """
+    An image in a memory mapped file, such as a snapshot.
+
+    The image is read from the file only when it is needed, and the operating
+    system can drop the pages of the file which hold it from memory.
+
+    Args:
+        mapping: The memory mapped file.
+        offset: The position of the image in the file.
+        length: The length of the image.
+        digest: The SHA-256 digest of the image, in hexadecimal.
+    """
+
+    mapping: mmap.mmap = field(repr=False)
+    offset: int
+    length: int
+    digest: str
+
+    def read(self) -> bytes:
+        """
+        Read the image.
+        """
+        start = self.offset
+        end = start + self.length
+        return self.mapping[start:end]
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """
+        Copy and pickle the image as bytes, as a mapping cannot be copied or
+        pickled.
+        """
+        return (bytes, (self.read(),))
+
+
+@lru_cache(maxsize=_DECOMPRESSED_IMAGE_CACHE_SIZE)
+def _decompress(compressed_value: bytes) -> bytes:
+    """
+    Decompress an image, keeping the most recently used images.
+    """
+    return zlib.decompress(compressed_value)
+
+
+@dataclass(frozen=True)
+class CompressedImage:
+    """
+    An image kept compressed in memory.
+
+    The image is decompressed only when it is needed, for example to process
+    or match the target.
+
+    Args:
+        compressed_value: The image, compressed with zlib.
+        digest: The SHA-256 digest of the image, in hexadecimal.
+    """
+
+    compressed_value: bytes
+    digest: str
+
+    def read(self) -> bytes:
+        """
+        Decompress the image.
+
+        Recently decompressed images are cached, so that an image which is
+        needed several times in a row is decompressed once.
+        """
+        return _decompress(compressed_value=self.compressed_value)
+
+
+def compress_image(image_value: bytes) -> CompressedImage:
+    """
+    Compress an image to keep in memory.
+
+    The fastest compression level is used, as images are compressed on every
+    upload.
+
+    Args:
+        image_value: The image to compress.
+
+    Returns:
+        The compressed image.
+    """
+    return CompressedImage(
+        compressed_value=zlib.compress(image_value, 1),
+        digest=hashlib.sha256(image_value).hexdigest(),
+    )
+
+
+def image_digest(
+    image_value: bytes | StoredImage | CompressedImage | MappedImage,
+) -> str:
+    """
+    Return the SHA-256 digest of an image, in hexadecimal.
+
+    The digest of a stored, compressed or mapped image is known without
+    reading the image.
+    """
+    if isinstance(image_value, (StoredImage, CompressedImage, MappedImage)):
+        return image_value.digest
+    return hashlib.sha256(image_value).hexdigest()
+
+
+class ImageStore:
+    """
+    Images kept in files in a directory, each named by a digest of its
+    content.
+
+    Each distinct image is written only once, however many targets use it.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """
+        Use a directory for images, creating it if it does not exist.
+
+        Args:
+            directory: The directory to keep images in.
+        """
+        self._directory = directory
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def add(self, image_value: bytes) -> StoredImage:
+        """
+        Add an image to the store, if it is not already there.
+
+        Args:
+            image_value: The image to add.
+
+        Returns:
+            A reference to the stored image.
+        """
+        digest = hashlib.sha256(image_value).hexdigest()
+        path = self._directory / digest
+        if not path.exists():
+            # We write to a temporary file first so that a partly written
+            # image is never read, even by another process.
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=self._directory,
+            )
+            with os.fdopen(file_descriptor, 'wb') as temporary_file:
+                temporary_file.write(image_value)
+            os.replace(temporary_path, path)
+
+        return StoredImage(path=str(path), digest=digest)
@@ -4,18 +4,49 @@ A fake implementation of a target for the Vuforia Web Services API.
 from __future__ import annotations
 
 import base64
+import dataclasses
 import datetime
 import io
 import random
 import statistics
+import threading
 import uuid
 from dataclasses import dataclass, field
-from typing import Optional, TypedDict, Union
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Tuple,
+    Type,
+    TypedDict,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from backports.zoneinfo import ZoneInfo
 from PIL import Image, ImageStat
 
+from mock_vws._clock import time_now
 from mock_vws._constants import TargetStatuses
+from mock_vws.clock import Clock
+from mock_vws.image_store import (
+    CompressedImage,
+    MappedImage,
+    StoredImage,
+    image_digest,
+)
+
+# The number of post-processing statuses to keep.
+_POST_PROCESSING_STATUS_CACHE_SIZE = 65536
+
+# The status which a target with each image has once it is processed, keyed
+# by the image's digest.
+# Targets are replaced rather than changed, for example when a target is
+# updated or loaded from a dictionary, and this means that each image is
+# processed once however many copies of its target are made.
+_POST_PROCESSING_STATUSES: Dict[str, TargetStatuses] = {}
+_POST_PROCESSING_STATUSES_LOCK = threading.Lock()
 
 
 class TargetDict(TypedDict):
@@ -38,19 +69,38 @@ class TargetDict(TypedDict):
     upload_date: str
 
 
-def _random_hex() -> str:
+_SlottedClass = TypeVar('_SlottedClass')
+
+
+def _with_slots(cls: Type[_SlottedClass]) -> Type[_SlottedClass]:
     """
-    Return a random hex value.
+    Return a copy of a frozen dataclass which keeps its fields in slots
+    rather than in a ``__dict__``.
+
+    This is what ``dataclass(slots=True)`` does from Python 3.10.
+    Attributes named in the class's ``_extra_slots`` are also given slots.
     """
-    return uuid.uuid4().hex
+    cls_dict = dict(cls.__dict__)
+    # ``dataclass`` keeps the fields of the class in ``__dataclass_fields__``,
+    # with any ``ClassVar`` or ``InitVar`` pseudo-fields, which classes given
+    # to this do not have.
+    field_names = tuple(cls_dict['__dataclass_fields__'])
+    cls_dict['__slots__'] = field_names + cls_dict.get('_extra_slots', ())
+    # Defaults are given to ``__init__``, and a class attribute with the same
+    # name as a slot is not allowed.
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    slotted_cls = type(cls.__name__, cls.__bases__, cls_dict)
+    return cast(Type[_SlottedClass], slotted_cls)
 
 
-def _time_now() -> datetime.datetime:
+def _random_hex() -> str:
     """
-    Return the current time in the GMT time zone.
+    Return a random hex value.
     """
-    gmt = ZoneInfo('GMT')
-    return datetime.datetime.now(tz=gmt)
+    return uuid.uuid4().hex
 
 
 def _random_tracking_rating() -> int:
@@ -60,22 +110,37 @@ def _random_tracking_rating() -> int:
     return random.randint(0, 5)
 
 
+@_with_slots
 @dataclass(frozen=True, eq=True)
 class Target:
     """
     A Vuforia Target as managed in
     https://developer.vuforia.com/target-manager.
+
+    The image may be given as a reference to an image in an image store or in
+    a memory mapped snapshot, so that it is not held in memory, or compressed.
+
+    Targets keep their attributes in slots, as a mock may hold very many
+    targets.
+    A target takes about 400 bytes, not counting its image, and a database's
+    indexes take a few hundred bytes more for each target.
+    Targets are hashed by ID only, so that hashing a target does not hash
+    its image.
     """
 
+    # These hold the status which the target has once it is processed, and
+    # the clock of the database which has the target.
+    _extra_slots = ('_post_processing_status_value', '_clock_value')
+
     active_flag: bool
     application_metadata: Optional[str]
-    image_value: bytes
+    image_value: Union[bytes, StoredImage, CompressedImage, MappedImage]
     name: str
     processing_time_seconds: float
     width: float
     current_month_recos: int = 0
     delete_date: Optional[datetime.datetime] = None
-    last_modified_date: datetime.datetime = field(default_factory=_time_now)
+    last_modified_date: datetime.datetime = field(default_factory=time_now)
     previous_month_recos: int = 0
     processed_tracking_rating: int = field(
         default_factory=_random_tracking_rating,
@@ -83,7 +148,33 @@ class Target:
     reco_rating: str = ''
     target_id: str = field(default_factory=_random_hex)
     total_recos: int = 0
-    upload_date: datetime.datetime = field(default_factory=_time_now)
+    upload_date: datetime.datetime = field(default_factory=time_now)
+
+    def __hash__(self) -> int:
+        """
+        Hash the target by its ID.
+
+        Targets which are equal have the same ID, so they have the same hash.
+        """
+        return hash(self.target_id)
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        """
+        Return the values of the fields, for copying and pickling.
+
+        Slotted classes have no ``__dict__`` to copy.
+        """
+        return tuple(
+            getattr(self, field.name) for field in dataclasses.fields(self)
+        )
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        """
+        Set the values of the fields, for copying and unpickling.
+        """
+        for target_field, value in zip(dataclasses.fields(self), state):
+            # The class is frozen, so we cannot use ``setattr``.
+            object.__setattr__(self, target_field.name, value)
 
     @property
     def _post_processing_status(self) -> TargetStatuses:
@@ -94,17 +185,76 @@ class Target:
         The status depends on the standard deviation of the color bands.
         How VWS determines this is unknown, but it relates to how suitable the
         target is for detection.
+
+        This is computed from the image only once per image, and is then kept
+        by the image's digest, so that copies of the target do not process the
+        image again.
         """
-        image_file = io.BytesIO(self.image_value)
-        image = Image.open(image_file)
-        image_stat = ImageStat.Stat(image)
+        cached_status: TargetStatuses | None = getattr(
+            self,
+            '_post_processing_status_value',
+            None,
+        )
+        if cached_status is not None:
+            return cached_status
+
+        digest = image_digest(image_value=self.image_value)
+        status = _POST_PROCESSING_STATUSES.get(digest)
+        if status is None:
+            image_file = io.BytesIO(self.image_bytes)
+            image = Image.open(image_file)
+            image_stat = ImageStat.Stat(image)
+
+            average_std_dev = statistics.mean(image_stat.stddev)
+
+            status = TargetStatuses.FAILED
+            if average_std_dev > 5:
+                status = TargetStatuses.SUCCESS
+
+            with _POST_PROCESSING_STATUSES_LOCK:
+                if len(_POST_PROCESSING_STATUSES) >= (
+                    _POST_PROCESSING_STATUS_CACHE_SIZE
+                ):
+                    # Forget the status which was kept first.
+                    del _POST_PROCESSING_STATUSES[
+                        next(iter(_POST_PROCESSING_STATUSES))
+                    ]
+                _POST_PROCESSING_STATUSES[digest] = status
+
+        # The class is frozen, so we cannot use ``setattr``.
+        object.__setattr__(self, '_post_processing_status_value', status)
+        return status
+
+    def use_clock(self, clock: Clock) -> None:
+        """
+        Use the given clock for the time when giving the target's status and
+        tracking rating.
 
-        average_std_dev = statistics.mean(image_stat.stddev)
+        Databases give their clock to the targets which they have.
+        Otherwise the time is given by the clock of the mock which is handling
+        a request, or by the system time outside of requests.
+        """
+        # The class is frozen, so we cannot use ``setattr``.
+        object.__setattr__(self, '_clock_value', clock)
 
-        if average_std_dev > 5:
-            return TargetStatuses.SUCCESS
+    def _now(self) -> datetime.datetime:
+        """
+        Return the current time, as given by the clock which the target uses.
+        """
+        clock: Clock | None = getattr(self, '_clock_value', None)
+        if clock is None:
+            return time_now()
+        return clock.now()
 
-        return TargetStatuses.FAILED
+    @property
+    def image_bytes(self) -> bytes:
+        """
+        Return the image of the target, read from the image store or snapshot
+        if it is kept there, or decompressed if it is kept compressed.
+        """
+        if isinstance(self.image_value, bytes):
+            return self.image_value
+        return self.image_value.read()
 
     @property
     def status(self) -> str:
@@ -122,8 +272,7 @@ class Target:
             seconds=self.processing_time_seconds,
         )
 
-        timezone = self.upload_date.tzinfo
-        now = datetime.datetime.now(tz=timezone)
+        now = self._now()
         time_since_change = now - self.last_modified_date
 
         if time_since_change <= processing_time:
@@ -150,8 +299,7 @@ class Target:
             / 2,
         )
 
-        timezone = self.upload_date.tzinfo
-        now = datetime.datetime.now(tz=timezone)
+        now = self._now()
         time_since_upload = now - self.upload_date
 
         if time_since_upload <= pre_rating_time:
@@ -214,7 +362,7 @@ class Target:
         if self.delete_date:
             delete_date = datetime.datetime.isoformat(self.delete_date)
 
-        image_base64 = base64.encodebytes(self.image_value).decode()
+        image_base64 = base64.encodebytes(self.image_bytes).decode()
 
         return {
             'name': self.name,
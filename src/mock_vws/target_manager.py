@@ -2,14 +2,21 @@
 A fake implementation of a Vuforia target manager.
 """
 
-from typing import Set
+from __future__ import annotations
 
+import threading
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+from mock_vws._snapshot import read_snapshot, write_snapshot
 from mock_vws.database import VuforiaDatabase
 
 
 class TargetManager:
     """
     A target manager as per https://developer.vuforia.com/target-manager.
+
+    Databases can be added, removed and looked up from several threads.
     """
 
     def __init__(self) -> None:
@@ -17,6 +24,48 @@ class TargetManager:
         Create a target manager with no databases.
         """
         self._databases: Set[VuforiaDatabase] = set()
+        self._databases_by_server_access_key: Dict[str, VuforiaDatabase] = {}
+        self._databases_by_server_secret_key: Dict[str, VuforiaDatabase] = {}
+        self._databases_by_client_access_key: Dict[str, VuforiaDatabase] = {}
+        self._databases_by_client_secret_key: Dict[str, VuforiaDatabase] = {}
+        self._databases_by_name: Dict[str, VuforiaDatabase] = {}
+        self._lock = threading.Lock()
+
+    def _indexes(
+        self,
+        database: VuforiaDatabase,
+    ) -> Tuple[Tuple[Dict[str, VuforiaDatabase], str, str], ...]:
+        """
+        Return each index of databases, with the given database's key in it
+        and the name of that key.
+        """
+        return (
+            (
+                self._databases_by_server_access_key,
+                database.server_access_key,
+                'server access key',
+            ),
+            (
+                self._databases_by_server_secret_key,
+                database.server_secret_key,
+                'server secret key',
+            ),
+            (
+                self._databases_by_client_access_key,
+                database.client_access_key,
+                'client access key',
+            ),
+            (
+                self._databases_by_client_secret_key,
+                database.client_secret_key,
+                'client secret key',
+            ),
+            (
+                self._databases_by_name,
+                database.database_name,
+                'name',
+            ),
+        )
 
     def remove_database(self, database: VuforiaDatabase) -> None:
         """
@@ -28,7 +77,10 @@ class TargetManager:
         Raises:
             KeyError: The database is not in the target manager.
         """
-        self._databases.remove(database)
+        with self._lock:
+            self._databases.remove(database)
+            for index, key, _ in self._indexes(database=database):
+                del index[key]
 
     def add_database(self, database: VuforiaDatabase) -> None:
         """
@@ -45,43 +97,109 @@ class TargetManager:
             'All {key_name}s must be unique. '
             'There is already a database with the {key_name} "{value}".'
         )
-        for existing_db in self.databases:
-            for existing, new, key_name in (
-                (
-                    existing_db.server_access_key,
-                    database.server_access_key,
-                    'server access key',
-                ),
-                (
-                    existing_db.server_secret_key,
-                    database.server_secret_key,
-                    'server secret key',
-                ),
-                (
-                    existing_db.client_access_key,
-                    database.client_access_key,
-                    'client access key',
-                ),
-                (
-                    existing_db.client_secret_key,
-                    database.client_secret_key,
-                    'client secret key',
-                ),
-                (
-                    existing_db.database_name,
-                    database.database_name,
-                    'name',
-                ),
-            ):
-                if existing == new:
-                    message = message_fmt.format(key_name=key_name, value=new)
+        indexes = self._indexes(database=database)
+        # We hold the lock while checking that the keys are unique, so that
+        # two databases with the same keys cannot be added at the same time.
+        with self._lock:
+            for index, key, key_name in indexes:
+                if key in index:
+                    message = message_fmt.format(key_name=key_name, value=key)
                     raise ValueError(message)
 
-        self._databases.add(database)
+            self._databases.add(database)
+            for index, key, _ in indexes:
+                index[key] = database
+
+    def get_database_by_server_access_key(
+        self,
+        server_access_key: str,
+    ) -> VuforiaDatabase | None:
+        """
+        Get the database with the given server access key.
+
+        Args:
+            server_access_key: A server access key.
+
+        Returns:
+            The database with the given server access key, or ``None`` if there
+            is no such database.
+        """
+        return self._databases_by_server_access_key.get(server_access_key)
+
+    def get_database_by_client_access_key(
+        self,
+        client_access_key: str,
+    ) -> VuforiaDatabase | None:
+        """
+        Get the database with the given client access key.
+
+        Args:
+            client_access_key: A client access key.
+
+        Returns:
+            The database with the given client access key, or ``None`` if there
+            is no such database.
+        """
+        return self._databases_by_client_access_key.get(client_access_key)
+
+    def get_database_by_name(
+        self,
+        database_name: str,
+    ) -> VuforiaDatabase | None:
+        """
+        Get the database with the given name.
+
+        Args:
+            database_name: A database name.
+
+        Returns:
+            The database with the given name, or ``None`` if there is no such
+            database.
+        """
+        return self._databases_by_name.get(database_name)
 
     @property
     def databases(self) -> Set[VuforiaDatabase]:
         """
         All cloud databases.
+
+        This is a copy, so that it does not change while it is used.
+        Add and remove databases with :meth:`add_database` and
+        :meth:`remove_database` rather than by changing this set.
+        """
+        with self._lock:
+            return set(self._databases)
+
+    def save(self, path: Path) -> None:
+        """
+        Save all cloud databases and their targets to a snapshot file.
+
+        The snapshot is a compact binary file which holds each distinct image
+        once, without base64 encoding.
+
+        Args:
+            path: The path to write the snapshot to.
+        """
+        write_snapshot(path=path, databases=self.databases)
+
+    @classmethod
+    def load(cls, path: Path) -> TargetManager:
+        """
+        Load a target manager from a snapshot file.
+
+        The file is memory mapped rather than read all at once, and images
+        are read from it only when they are needed.
+
+        Args:
+            path: The path to a snapshot written by :meth:`save`.
+
+        Returns:
+            A target manager with the databases in the snapshot.
+
+        Raises:
+            ValueError: The file is not a snapshot in a supported format.
         """
-        return self._databases
+        target_manager = cls()
+        for database in read_snapshot(path=path):
+            target_manager.add_database(database=database)
+        return target_manager
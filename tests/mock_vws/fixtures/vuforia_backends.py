@@ -119,6 +119,9 @@ def _enable_use_docker_in_memory(
         name='TARGET_MANAGER_BASE_URL',
         value=target_manager_base_url,
     )
+    # ``requests_mock_flask`` decodes each response as text, so raw images
+    # cannot be given.
+    monkeypatch.setenv(name='TARGET_MANAGER_RAW_IMAGES', value='false')
 
     with requests_mock.Mocker(real_http=False) as mock:
         add_flask_app_to_mock(
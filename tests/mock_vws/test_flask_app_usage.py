@@ -2,9 +2,26 @@
 Tests for the usage of the mock Flask application.
 """
 
+import asyncio
+import base64
+import dataclasses
+import functools
+import gzip
+import http.client
+import http.server
 import io
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
 import uuid
 from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, List, MutableMapping, Optional, Tuple
 
 import pytest
 import requests
@@ -12,11 +29,39 @@ from pytest import MonkeyPatch
 from requests_mock import Mocker
 from requests_mock_flask import add_flask_app_to_mock
 from vws import VWS, CloudRecoService
+from vws.exceptions.vws_exceptions import TargetNameExist
+from vws.reports import TargetStatuses
+from vws_auth_tools import authorization_header, rfc_1123_date
+from werkzeug.serving import make_server
 
-from mock_vws._flask_server.target_manager import TARGET_MANAGER_FLASK_APP
+from mock_vws import _services_validators
+from mock_vws._flask_server import all_in_one, target_manager, wsgi_server
+from mock_vws._flask_server.asgi import VWS_ASGI_APP
+from mock_vws._flask_server.binary_protocol import (
+    BINARY_CONTENT_TYPE,
+    decode_binary,
+    encode_binary,
+    encode_target,
+)
+from mock_vws._flask_server.journal import Journal, follow_journal
+from mock_vws._flask_server.sqlite_store import SQLiteStore
+from mock_vws._flask_server.target_manager import (
+    TARGET_MANAGER_FLASK_APP,
+    _ChangeTracker,
+)
+from mock_vws._flask_server.target_manager_backends import (
+    HTTPTargetManagerBackend,
+    InProcessTargetManagerBackend,
+)
+from mock_vws._flask_server.target_manager_cache import TargetManagerCache
+from mock_vws._flask_server.target_manager_session import TargetManagerSession
 from mock_vws._flask_server.vwq import CLOUDRECO_FLASK_APP
 from mock_vws._flask_server.vws import VWS_FLASK_APP
+from mock_vws.clock import Clock
 from mock_vws.database import VuforiaDatabase
+from mock_vws.image_store import ImageStore, image_digest
+from mock_vws.target import Target
+from mock_vws.target_manager import TargetManager
 from tests.mock_vws.utils.usage_test_helpers import (
     process_deletion_seconds,
     processing_time_seconds,
@@ -56,6 +101,9 @@ def enable_requests_mock(
         name='TARGET_MANAGER_BASE_URL',
         value=_EXAMPLE_URL_FOR_TARGET_MANAGER,
     )
+    # ``requests_mock_flask`` decodes each response as text, so raw images
+    # cannot be given.
+    monkeypatch.setenv(name='TARGET_MANAGER_RAW_IMAGES', value='false')
 
 
 class TestProcessingTime:
@@ -111,6 +159,49 @@ class TestProcessingTime:
         assert abs(expected - time_taken) < self.LEEWAY
 
 
+class TestClock:
+    """
+    Tests for giving the applications a clock.
+    """
+
+    def test_advance(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """
+        Moving the clock forward skips the time taken to process a target.
+        """
+        clock = Clock()
+        for flask_app in (
+            VWS_FLASK_APP,
+            CLOUDRECO_FLASK_APP,
+            TARGET_MANAGER_FLASK_APP,
+        ):
+            monkeypatch.setitem(flask_app.config, 'CLOCK', clock)
+        monkeypatch.setenv(name='PROCESSING_TIME_SECONDS', value='100')
+
+        database = VuforiaDatabase()
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        status = vws_client.get_target_record(target_id=target_id).status
+        assert status == TargetStatuses.PROCESSING
+        clock.advance(seconds=101)
+        status = vws_client.get_target_record(target_id=target_id).status
+        assert status == TargetStatuses.SUCCESS
+
+
 class TestCustomQueryRecognizesDeletionSeconds:
     """
     Tests for setting the amount of time after a target has been deleted
@@ -347,3 +438,1954 @@ class TestDeleteDatabase:
 
         response = requests.delete(url=delete_url, json={})
         assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestGetDatabases:
+    """
+    Tests for getting all databases.
+    """
+
+    def test_gzip(self, high_quality_image: io.BytesIO) -> None:
+        """
+        The databases are compressed with gzip when that is requested and the
+        client accepts it.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        expected_databases = requests.get(url=databases_url).json()
+        (database_dict,) = [
+            database_dict
+            for database_dict in expected_databases
+            if database_dict['database_name'] == database.database_name
+        ]
+        (target_dict,) = database_dict['targets']
+        assert target_dict['name'] == 'example'
+
+        test_client = TARGET_MANAGER_FLASK_APP.test_client()
+        response = test_client.get(
+            '/databases',
+            query_string={'gzip': 'true'},
+            headers={'Accept-Encoding': 'gzip'},
+        )
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.data)) == (
+            expected_databases
+        )
+
+        response = test_client.get(
+            '/databases',
+            query_string={'gzip': 'true'},
+            headers={'Accept-Encoding': 'identity'},
+        )
+        assert 'Content-Encoding' not in response.headers
+        assert response.json == expected_databases
+
+
+class TestDatabaseByAccessKey:
+    """
+    Tests for getting a database by one of its access keys.
+    """
+
+    def test_get_database(self, high_quality_image: io.BytesIO) -> None:
+        """
+        A database is given with metadata for the targets which have changed
+        since the given version, and target images are available separately.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+
+        by_server_key_url = (
+            databases_url
+            + '/by-server-access-key/'
+            + database.server_access_key
+        )
+        by_client_key_url = (
+            databases_url
+            + '/by-client-access-key/'
+            + database.client_access_key
+        )
+        database_dict = requests.get(url=by_server_key_url).json()
+        assert database_dict == requests.get(url=by_client_key_url).json()
+        assert database_dict['database_name'] == database.database_name
+        (target_dict,) = database_dict['targets']
+        assert target_dict['target_id'] == target_id
+        assert 'image_base64' not in target_dict
+
+        image_url = (
+            f'{databases_url}/{database.database_name}/targets/{target_id}'
+            '/image'
+        )
+        image_response = requests.get(url=image_url)
+        image = base64.b64decode(image_response.text)
+        assert image == high_quality_image.getvalue()
+
+        unchanged_database_dict = requests.get(
+            url=by_server_key_url,
+            params={'since': database_dict['version']},
+        ).json()
+        assert unchanged_database_dict['targets'] == []
+
+    def test_get_while_target_added(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """
+        A database can be got while a target is being added to it.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        responses: List[Any] = []
+        # Requests made with ``requests_mock`` are made one at a time, so we
+        # use a test client to get the database while the target is added.
+        get_thread = threading.Thread(
+            target=lambda: responses.append(
+                TARGET_MANAGER_FLASK_APP.test_client().get(
+                    '/databases/by-server-access-key/'
+                    + database.server_access_key,
+                ),
+            ),
+        )
+        target_being_added = threading.Event()
+        purge_deleted_targets = target_manager._purge_deleted_targets
+        record_target_change = _ChangeTracker.record_target_change
+
+        def _purge_once_target_being_added() -> None:
+            """
+            Wait until a target is being added before getting the database.
+            """
+            if threading.current_thread() is get_thread:
+                target_being_added.wait(timeout=10)
+                return
+            purge_deleted_targets()
+
+        def _record_target_change_during_get(
+            self: _ChangeTracker,
+            database_name: str,
+            target_id: str,
+        ) -> None:
+            """
+            Let the database be got while the target is being added.
+            """
+            target_being_added.set()
+            get_thread.join(timeout=0.5)
+            record_target_change(
+                self,
+                database_name=database_name,
+                target_id=target_id,
+            )
+
+        monkeypatch.setattr(
+            target_manager,
+            '_purge_deleted_targets',
+            _purge_once_target_being_added,
+        )
+        monkeypatch.setattr(
+            _ChangeTracker,
+            'record_target_change',
+            _record_target_change_during_get,
+        )
+        get_thread.start()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        get_thread.join()
+
+        (response,) = responses
+        assert response.status_code == HTTPStatus.OK
+        (target_dict,) = response.get_json()['targets']
+        assert target_dict['target_id'] == target_id
+
+    def test_not_found(self) -> None:
+        """
+        A 404 error is given when there is no database with the given key.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        response = requests.get(url=databases_url + '/by-server-access-key/a')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_target_not_found(self) -> None:
+        """
+        A 404 error is given for a target in a database which does not exist,
+        or for a target which does not exist in a database.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        database_url = f'{databases_url}/{database.database_name}'
+        unknown_database_url = f'{databases_url}/{uuid.uuid4().hex}'
+
+        for targets_url in (
+            f'{database_url}/targets',
+            f'{unknown_database_url}/targets',
+        ):
+            target_url = f'{targets_url}/{uuid.uuid4().hex}'
+            for response in (
+                requests.get(url=f'{target_url}/image'),
+                requests.put(url=target_url, json={'name': 'example'}),
+                requests.delete(url=target_url),
+            ):
+                assert response.status_code == HTTPStatus.NOT_FOUND
+
+        response = requests.post(
+            url=f'{unknown_database_url}/targets',
+            json=Target(
+                name='example',
+                width=1,
+                image_value=b'',
+                active_flag=True,
+                processing_time_seconds=0,
+                application_metadata=None,
+            ).to_dict(),
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestTargetManagerCache:
+    """
+    Tests for the local copy of the target manager's databases.
+    """
+
+    def test_requests_not_serialized(self) -> None:
+        """
+        A database can be got from the cache while a request to the target
+        manager for another database is waiting for a response.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        slow_database = VuforiaDatabase()
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=slow_database.to_dict())
+        requests.post(url=databases_url, json=database.to_dict())
+        slow_request_started = threading.Event()
+        slow_request_released = threading.Event()
+
+        class _SlowSession(TargetManagerSession):
+            """
+            A session which waits before requests for one database.
+            """
+
+            def request(
+                self,
+                method: str,
+                url: str,
+                **kwargs: Any,
+            ) -> requests.Response:
+                """
+                Wait before requests for the slow database.
+                """
+                if slow_database.server_access_key in url:
+                    slow_request_started.set()
+                    slow_request_released.wait(timeout=10)
+                return super().request(method=method, url=url, **kwargs)
+
+        cache = TargetManagerCache(session=_SlowSession())
+        results: Dict[str, Optional[VuforiaDatabase]] = {}
+
+        def get_database(server_access_key: str) -> None:
+            """
+            Get a database from the cache.
+            """
+            results[
+                server_access_key
+            ] = cache.get_database_by_server_access_key(
+                target_manager_base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER,
+                server_access_key=server_access_key,
+            )
+
+        slow_thread = threading.Thread(
+            target=get_database,
+            args=(slow_database.server_access_key,),
+        )
+        slow_thread.start()
+        assert slow_request_started.wait(timeout=10)
+        thread = threading.Thread(
+            target=get_database,
+            args=(database.server_access_key,),
+        )
+        thread.start()
+        thread.join(timeout=5)
+        thread_finished = not thread.is_alive()
+        slow_request_released.set()
+        slow_thread.join()
+        thread.join()
+
+        assert thread_finished
+        for expected_database in (slow_database, database):
+            cached_database = results[expected_database.server_access_key]
+            assert cached_database is not None
+            assert cached_database.database_name == (
+                expected_database.database_name
+            )
+
+    def test_images_not_hashed_again(
+        self,
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """
+        When a database is updated in the cache, the images of its targets
+        are not hashed again, as their digests are given by the target
+        manager.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        cache = TargetManagerCache(session=TargetManagerSession())
+        cache.get_database_by_server_access_key(
+            target_manager_base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER,
+            server_access_key=database.server_access_key,
+        )
+        vws_client.add_target(
+            name='other_example',
+            width=1,
+            image=different_high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+
+        hashed_images = []
+
+        def _recording_image_digest(image_value: Any) -> str:
+            """
+            Record that an image is hashed.
+            """
+            hashed_images.append(image_value)
+            return image_digest(image_value=image_value)
+
+        monkeypatch.setattr(
+            'mock_vws.database.image_digest',
+            _recording_image_digest,
+        )
+        cached_database = cache.get_database_by_server_access_key(
+            target_manager_base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER,
+            server_access_key=database.server_access_key,
+        )
+
+        assert cached_database is not None
+        assert len(cached_database.targets) == 2
+        assert not hashed_images
+        (matching_target,) = cached_database.get_targets_with_image(
+            image_value=different_high_quality_image.getvalue(),
+        )
+        assert matching_target.name == 'other_example'
+
+
+class TestImageStore:
+    """
+    Tests for keeping the target manager's target images in an image store.
+    """
+
+    def test_images_stored(
+        self,
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Images are kept in the directory given in an environment variable,
+        with one image store for the directory.
+        """
+        image_store_directories = []
+
+        class _RecordingImageStore(ImageStore):
+            """
+            An image store which records the directories of image stores
+            which are created.
+            """
+
+            def __init__(self, directory: Path) -> None:
+                """
+                Record the directory of the image store.
+                """
+                image_store_directories.append(directory)
+                super().__init__(directory=directory)
+
+        monkeypatch.setattr(
+            'mock_vws._flask_server.target_manager.ImageStore',
+            _RecordingImageStore,
+        )
+        monkeypatch.setenv(
+            name='TARGET_MANAGER_IMAGE_DIRECTORY',
+            value=str(tmp_path),
+        )
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+
+        (image_path,) = tmp_path.iterdir()
+        assert image_path.read_bytes() == high_quality_image.getvalue()
+        image_url = (
+            f'{databases_url}/{database.database_name}/targets/{target_id}'
+            '/image'
+        )
+        image_response = requests.get(url=image_url)
+        image = base64.b64decode(image_response.text)
+        assert image == high_quality_image.getvalue()
+
+        vws_client.add_target(
+            name='other_example',
+            width=1,
+            image=different_high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        assert len(list(tmp_path.iterdir())) == 2
+        assert image_store_directories == [tmp_path]
+
+
+class TestCompressImages:
+    """
+    Tests for keeping the target manager's target images compressed.
+    """
+
+    def test_images_compressed(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """
+        Images are kept compressed when an environment variable is set, and
+        are decompressed when they are needed.
+        """
+        monkeypatch.setenv(name='TARGET_MANAGER_COMPRESS_IMAGES', value='true')
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        cloud_reco_client = CloudRecoService(
+            client_access_key=database.client_access_key,
+            client_secret_key=database.client_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        vws_client.wait_for_target_processed(target_id=target_id)
+
+        matching_targets = cloud_reco_client.query(image=high_quality_image)
+        assert [
+            matching_target.target_id for matching_target in matching_targets
+        ] == [target_id]
+        image_url = (
+            f'{databases_url}/{database.database_name}/targets/{target_id}'
+            '/image'
+        )
+        image_response = requests.get(url=image_url)
+        image = base64.b64decode(image_response.text)
+        assert image == high_quality_image.getvalue()
+
+
+class TestBinaryProtocol:
+    """
+    Tests for the binary encoding used between the VWS and VWQ applications
+    and the target manager.
+    """
+
+    def test_target_manager_routes(
+        self,
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        The target manager accepts and gives targets in the binary encoding,
+        and gives raw images when asked.
+        """
+        database = VuforiaDatabase()
+        test_client = TARGET_MANAGER_FLASK_APP.test_client()
+        test_client.post('/databases', json=database.to_dict())
+        image = high_quality_image.getvalue()
+        target = Target(
+            name='example',
+            width=1,
+            image_value=image,
+            active_flag=True,
+            processing_time_seconds=0,
+            application_metadata=None,
+        )
+        targets_path = f'/databases/{database.database_name}/targets'
+        response = test_client.post(
+            targets_path,
+            data=encode_target(target=target),
+            content_type=BINARY_CONTENT_TYPE,
+            headers={'Accept': BINARY_CONTENT_TYPE},
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.mimetype == BINARY_CONTENT_TYPE
+        target_details, response_image = decode_binary(body=response.data)
+        assert target_details['target_id'] == target.target_id
+        assert response_image == image
+
+        new_image = different_high_quality_image.getvalue()
+        target_path = f'{targets_path}/{target.target_id}'
+        response = test_client.put(
+            target_path,
+            data=encode_binary(metadata={'name': 'new'}, image=new_image),
+            content_type=BINARY_CONTENT_TYPE,
+            headers={'Prefer': 'return=minimal'},
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.data == b''
+
+        response = test_client.get(
+            f'{target_path}/image',
+            headers={'Accept': 'application/octet-stream'},
+        )
+        assert response.data == new_image
+        response = test_client.get(f'{target_path}/image')
+        assert base64.b64decode(response.data) == new_image
+
+    @pytest.mark.parametrize(
+        'body',
+        [
+            b'',
+            b'\x01\x00',
+            encode_binary(metadata={'name': 'example'}, image=b'image')[:10],
+            encode_binary(metadata={'name': 'example'}, image=None),
+            b'\x01\x00\x00\x00\x02[]image',
+        ],
+        ids=[
+            'empty',
+            'short_header',
+            'short_details',
+            'no_image',
+            'details_not_object',
+        ],
+    )
+    def test_invalid_body(self, body: bytes) -> None:
+        """
+        A target given in the binary encoding with a body which is not valid,
+        or which has no image, is not added.
+        """
+        database = VuforiaDatabase()
+        test_client = TARGET_MANAGER_FLASK_APP.test_client()
+        test_client.post('/databases', json=database.to_dict())
+        targets_path = f'/databases/{database.database_name}/targets'
+        response = test_client.post(
+            targets_path,
+            data=body,
+            content_type=BINARY_CONTENT_TYPE,
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = test_client.put(
+            f'{targets_path}/{uuid.uuid4().hex}',
+            data=body[:4],
+            content_type=BINARY_CONTENT_TYPE,
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        (database_dict,) = [
+            database_dict
+            for database_dict in json.loads(test_client.get('/databases').data)
+            if database_dict['database_name'] == database.database_name
+        ]
+        assert database_dict['targets'] == []
+
+    def test_http_backend(
+        self,
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        requests_mock: Mocker,
+    ) -> None:
+        """
+        Targets sent by the HTTP backend are kept by the target manager, and
+        their images are fetched raw.
+        """
+        server = make_server(
+            host='127.0.0.1',
+            port=0,
+            app=TARGET_MANAGER_FLASK_APP,
+            threaded=True,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        databases_url = f'http://127.0.0.1:{server.port}/databases'
+        monkeypatch.setattr(requests_mock, 'real_http', True)
+        monkeypatch.setenv(
+            name='TARGET_MANAGER_BASE_URL',
+            value=f'http://127.0.0.1:{server.port}',
+        )
+        monkeypatch.delenv(name='TARGET_MANAGER_RAW_IMAGES')
+        database = VuforiaDatabase()
+        target = Target(
+            name='example',
+            width=1,
+            image_value=high_quality_image.getvalue(),
+            active_flag=True,
+            processing_time_seconds=0,
+            application_metadata=None,
+        )
+        new_image = different_high_quality_image.getvalue()
+        backend = HTTPTargetManagerBackend()
+
+        try:
+            requests.post(url=databases_url, json=database.to_dict())
+            backend.add_target(
+                database_name=database.database_name,
+                target=target,
+            )
+            backend.update_target(
+                database_name=database.database_name,
+                target_id=target.target_id,
+                update_values={
+                    'name': 'new',
+                    'image': new_image,
+                },
+            )
+            copied_database = backend.get_database_by_access_key(
+                key_name='server',
+                access_key=database.server_access_key,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert copied_database is not None
+        (copied_target,) = copied_database.targets
+        assert copied_target.name == 'new'
+        assert copied_target.image_bytes == new_image
+
+    def test_http_backend_errors(self) -> None:
+        """
+        An error is raised when the target manager gives an error response to
+        the HTTP backend.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        backend = HTTPTargetManagerBackend()
+        target_id = uuid.uuid4().hex
+
+        with pytest.raises(requests.HTTPError) as delete_exc:
+            backend.delete_target(
+                database_name=database.database_name,
+                target_id=target_id,
+            )
+        with pytest.raises(requests.HTTPError) as update_exc:
+            backend.update_target(
+                database_name=database.database_name,
+                target_id=target_id,
+                update_values={'name': 'new'},
+            )
+
+        for exc in (delete_exc, update_exc):
+            assert exc.value.response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestSQLiteStore:
+    """
+    Tests for keeping the target manager's databases in a SQLite store.
+    """
+
+    def test_databases_kept(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Databases and targets are kept in the store, and are loaded from it
+        when the target manager has no copy of them.
+        """
+        store_path = str(tmp_path / 'store.sqlite')
+        monkeypatch.setenv(name='TARGET_MANAGER_SQLITE_PATH', value=store_path)
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        vws_client.wait_for_target_processed(target_id=target_id)
+        vws_client.update_target(target_id=target_id, name='new_name')
+
+        # Using a different store makes the target manager forget the
+        # databases it holds.
+        other_store_path = str(tmp_path / 'other_store.sqlite')
+        monkeypatch.setenv(
+            name='TARGET_MANAGER_SQLITE_PATH',
+            value=other_store_path,
+        )
+        assert requests.get(url=databases_url).json() == []
+
+        monkeypatch.setenv(name='TARGET_MANAGER_SQLITE_PATH', value=store_path)
+        (database_dict,) = requests.get(url=databases_url).json()
+        assert database_dict['database_name'] == database.database_name
+        target_record = vws_client.get_target_record(target_id=target_id)
+        assert target_record.target_record.name == 'new_name'
+
+    def test_shared_store(
+        self,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Changes made to the store by another process are used.
+        """
+        store_path = str(tmp_path / 'store.sqlite')
+        monkeypatch.setenv(name='TARGET_MANAGER_SQLITE_PATH', value=store_path)
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        assert requests.get(url=databases_url).json() == []
+
+        database = VuforiaDatabase()
+        other_process_store = SQLiteStore(path=store_path)
+        other_process_store.add_database(database=database)
+        (database_dict,) = requests.get(url=databases_url).json()
+        assert database_dict['database_name'] == database.database_name
+
+        other_process_store.remove_database(
+            database_name=database.database_name,
+        )
+        assert requests.get(url=databases_url).json() == []
+
+    def test_deleted_databases_forgotten(self, tmp_path: Path) -> None:
+        """
+        Only the latest deleted databases are recorded, and the names of all
+        databases are given to processes which have not read the store since
+        a deleted database which is no longer recorded.
+        """
+        store = SQLiteStore(
+            path=str(tmp_path / 'store.sqlite'),
+            deleted_databases_kept=1,
+        )
+        first_database, second_database, third_database = (
+            VuforiaDatabase(),
+            VuforiaDatabase(),
+            VuforiaDatabase(),
+        )
+        for database in (first_database, second_database, third_database):
+            store.add_database(database=database)
+        version = store.version
+        assert store.get_changes(since=version).database_names is None
+
+        store.remove_database(database_name=first_database.database_name)
+        changes_after_first_deletion = store.get_changes(since=version)
+        store.remove_database(database_name=second_database.database_name)
+        changes = store.get_changes(since=version)
+        latest_changes = store.get_changes(
+            since=changes_after_first_deletion.version,
+        )
+
+        assert changes_after_first_deletion.database_names is None
+        assert changes.deleted_database_versions == {
+            second_database.database_name: store.version,
+        }
+        assert changes.database_names == {third_database.database_name}
+        assert latest_changes.database_names is None
+        assert list(latest_changes.deleted_database_versions) == [
+            second_database.database_name,
+        ]
+
+    def test_shared_store_deleted_databases_forgotten(
+        self,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Databases which another process deleted are removed, even if the
+        store no longer records that they were deleted.
+        """
+        store_path = str(tmp_path / 'store.sqlite')
+        monkeypatch.setenv(name='TARGET_MANAGER_SQLITE_PATH', value=store_path)
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        other_process_store = SQLiteStore(
+            path=store_path,
+            deleted_databases_kept=1,
+        )
+        first_database, second_database = VuforiaDatabase(), VuforiaDatabase()
+        for database in (first_database, second_database):
+            other_process_store.add_database(database=database)
+        assert len(requests.get(url=databases_url).json()) == 2
+
+        for database in (first_database, second_database):
+            other_process_store.remove_database(
+                database_name=database.database_name,
+            )
+        # This database has the name of a deleted database.
+        new_database = VuforiaDatabase(
+            database_name=second_database.database_name,
+        )
+        other_process_store.add_database(database=new_database)
+
+        (database_dict,) = requests.get(url=databases_url).json()
+        assert database_dict == {
+            key: value
+            for key, value in new_database.to_dict().items()
+            if key in database_dict
+        }
+
+    def test_changes_while_syncing(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Targets can be changed while other threads bring the databases up to
+        date with the store.
+        """
+        monkeypatch.setenv(
+            name='TARGET_MANAGER_SQLITE_PATH',
+            value=str(tmp_path / 'store.sqlite'),
+        )
+        backend = InProcessTargetManagerBackend()
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        target = Target(
+            name='example',
+            active_flag=True,
+            width=1,
+            image_value=high_quality_image.getvalue(),
+            processing_time_seconds=0,
+            application_metadata=None,
+        )
+        backend.add_target(database_name=database.database_name, target=target)
+        stop = threading.Event()
+
+        def sync() -> None:
+            """
+            Bring the databases up to date with the store until stopped.
+            """
+            while not stop.is_set():
+                backend.get_database_by_access_key(
+                    key_name='server',
+                    access_key=database.server_access_key,
+                )
+
+        sync_threads = [
+            threading.Thread(target=sync, daemon=True) for _ in range(4)
+        ]
+        for sync_thread in sync_threads:
+            sync_thread.start()
+
+        def update() -> None:
+            """
+            Update the target many times.
+            """
+            for width in range(200):
+                backend.update_target(
+                    database_name=database.database_name,
+                    target_id=target.target_id,
+                    update_values={'width': width},
+                )
+
+        update_thread = threading.Thread(target=update, daemon=True)
+        update_thread.start()
+        update_thread.join(timeout=60)
+        stop.set()
+        for sync_thread in sync_threads:
+            sync_thread.join(timeout=5)
+        assert not update_thread.is_alive()
+
+
+class TestTargetNames:
+    """
+    Tests for keeping target names unique when requests are made at once.
+    """
+
+    @pytest.mark.parametrize('in_process', [True, False])
+    @pytest.mark.parametrize('use_sqlite_store', [True, False])
+    def test_name_checked_when_added(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+        in_process: bool,
+        use_sqlite_store: bool,
+    ) -> None:
+        """
+        The target manager checks that no target has the name of a new target
+        when it adds the target, as another request may have added a target
+        with the same name since the request was validated.
+        """
+        if use_sqlite_store:
+            monkeypatch.setenv(
+                name='TARGET_MANAGER_SQLITE_PATH',
+                value=str(tmp_path / 'store.sqlite'),
+            )
+        if in_process:
+            monkeypatch.setitem(
+                VWS_FLASK_APP.config,
+                'TARGET_MANAGER_BACKEND',
+                InProcessTargetManagerBackend(),
+            )
+
+        def validate_nothing(**_: Any) -> None:
+            """
+            Do not validate the name, as if the target with the same name is
+            added after the request is validated.
+            """
+
+        monkeypatch.setattr(
+            _services_validators,
+            'validate_name_does_not_exist_new_target',
+            validate_nothing,
+        )
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        with pytest.raises(TargetNameExist):
+            vws_client.add_target(
+                name='example',
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+        assert vws_client.list_targets() == [target_id]
+
+
+class TestJournal:
+    """
+    Tests for recording changes to the target manager's databases in a
+    journal.
+    """
+
+    def test_databases_kept(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Databases and targets are replayed from the journal when the target
+        manager has no copy of them.
+        """
+        journal_directory = str(tmp_path / 'journal')
+        monkeypatch.setenv(
+            name='TARGET_MANAGER_JOURNAL_DIRECTORY',
+            value=journal_directory,
+        )
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        vws_client.wait_for_target_processed(target_id=target_id)
+        vws_client.update_target(target_id=target_id, name='new_name')
+
+        # Using a different journal makes the target manager forget the
+        # databases it holds.
+        monkeypatch.setenv(
+            name='TARGET_MANAGER_JOURNAL_DIRECTORY',
+            value=str(tmp_path / 'other_journal'),
+        )
+        assert requests.get(url=databases_url).json() == []
+
+        monkeypatch.setenv(
+            name='TARGET_MANAGER_JOURNAL_DIRECTORY',
+            value=journal_directory,
+        )
+        (database_dict,) = requests.get(url=databases_url).json()
+        assert database_dict['database_name'] == database.database_name
+        target_record = vws_client.get_target_record(target_id=target_id)
+        assert target_record.target_record.name == 'new_name'
+
+    def test_compaction(
+        self,
+        high_quality_image: io.BytesIO,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Compacting a journal starts a new generation with a snapshot, and a
+        compacted journal is loaded from its snapshot.
+        """
+        target = Target(
+            name='example',
+            active_flag=True,
+            width=1,
+            image_value=high_quality_image.getvalue(),
+            processing_time_seconds=0,
+            application_metadata=None,
+        )
+        database = VuforiaDatabase(targets={target})
+        removed_database = VuforiaDatabase()
+        journal = Journal(directory=tmp_path, compaction_size=4)
+        journal.load()
+        journal.add_database(database=database)
+        journal.add_database(database=removed_database)
+        assert not journal.needs_compaction
+        journal.remove_database(database_name=removed_database.database_name)
+        assert journal.needs_compaction
+
+        loaded_target_manager = journal.load()
+        (loaded_database,) = loaded_target_manager.databases
+        assert loaded_database.database_name == database.database_name
+        loaded_target = loaded_database.get_target(target_id=target.target_id)
+        assert loaded_target.to_dict() == target.to_dict()
+
+        journal.compact(target_manager=loaded_target_manager)
+        assert not journal.needs_compaction
+        assert journal.generation == 1
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            'journal-1',
+            'snapshot-1',
+        ]
+        (compacted_database,) = journal.load().databases
+        assert compacted_database.database_name == database.database_name
+        assert len(compacted_database.targets) == 1
+        journal.close()
+
+    def test_compaction_interrupted(
+        self,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        A journal which was being compacted when the target manager stopped
+        gives the same databases when it is loaded, and the files of earlier
+        generations are removed.
+        """
+        database = VuforiaDatabase()
+        journal = Journal(directory=tmp_path)
+        loaded_target_manager = journal.load()
+        journal.add_database(database=database)
+        loaded_target_manager.add_database(database=database)
+        with monkeypatch.context() as context:
+            # This is as if the target manager stopped before it removed the
+            # files of the earlier generation.
+            context.setattr(
+                Journal,
+                '_remove_generations_before',
+                lambda self, generation: None,
+            )
+            journal.compact(target_manager=loaded_target_manager)
+        journal.close()
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            'journal-0',
+            'journal-1',
+            'snapshot-1',
+        ]
+
+        # This is as if the target manager stopped before it wrote the
+        # snapshot.
+        snapshot_path = tmp_path / 'snapshot-1'
+        snapshot = snapshot_path.read_bytes()
+        snapshot_path.unlink()
+        (replayed_database,) = journal.load().databases
+        assert replayed_database.database_name == database.database_name
+        journal.close()
+
+        snapshot_path.write_bytes(snapshot)
+        (loaded_database,) = journal.load().databases
+        assert loaded_database.database_name == database.database_name
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            'journal-1',
+            'snapshot-1',
+        ]
+        journal.close()
+
+    def test_records_appended_during_compaction(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Records can be appended while the snapshot is written, and are kept
+        once whether or not the snapshot includes them.
+        """
+        database = VuforiaDatabase()
+        target = Target(
+            name='example',
+            active_flag=True,
+            width=1,
+            image_value=high_quality_image.getvalue(),
+            processing_time_seconds=0,
+            application_metadata=None,
+        )
+        journal = Journal(directory=tmp_path)
+        loaded_target_manager = journal.load()
+        journal.add_database(database=database)
+        loaded_target_manager.add_database(database=database)
+        save = loaded_target_manager.save
+
+        def save_while_target_added(path: Path) -> None:
+            """
+            Add a target while the snapshot is written.
+            """
+            journal.save_target(
+                database_name=database.database_name,
+                target=target,
+            )
+            database.targets.add(target)
+            save(path=path)
+
+        monkeypatch.setattr(
+            loaded_target_manager,
+            'save',
+            save_while_target_added,
+        )
+        journal.compact(target_manager=loaded_target_manager)
+
+        (loaded_database,) = journal.load().databases
+        (loaded_target,) = loaded_database.targets
+        assert loaded_target.to_dict() == target.to_dict()
+        journal.close()
+
+    def test_unchanged_image_not_recorded(
+        self,
+        high_quality_image: io.BytesIO,
+        tmp_path: Path,
+    ) -> None:
+        """
+        The image of a target is not recorded again when the target is
+        replaced by a target with the same image, such as when it is deleted.
+        """
+        image_value = high_quality_image.getvalue()
+        target = Target(
+            name='example',
+            active_flag=True,
+            width=1,
+            image_value=image_value,
+            processing_time_seconds=0,
+            application_metadata=None,
+        )
+        database = VuforiaDatabase(targets={target})
+        journal = Journal(directory=tmp_path)
+        journal.load()
+        journal.add_database(database=database)
+        journal_path = tmp_path / 'journal-0'
+        size_before_deletion = journal_path.stat().st_size
+        deleted_target = dataclasses.replace(
+            target,
+            delete_date=target.last_modified_date,
+        )
+        journal.save_target(
+            database_name=database.database_name,
+            target=deleted_target,
+            replaced_target=target,
+        )
+        deletion_size = journal_path.stat().st_size - size_before_deletion
+
+        (loaded_database,) = journal.load().databases
+        (loaded_target,) = loaded_database.targets
+        assert deletion_size < len(image_value)
+        assert loaded_target.delete_date == deleted_target.delete_date
+        assert loaded_target.image_bytes == image_value
+        journal.close()
+
+    def test_follow_journal(
+        self,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Readers can follow the journal from where they stopped into the
+        journal of a new generation, until the journal they were reading is
+        removed.
+        """
+        first_database, second_database, third_database = (
+            VuforiaDatabase(),
+            VuforiaDatabase(),
+            VuforiaDatabase(),
+        )
+        journal = Journal(directory=tmp_path)
+        loaded_target_manager = journal.load()
+        journal.add_database(database=first_database)
+        (*_, (_, _, generation, position)) = follow_journal(
+            directory=tmp_path,
+            generation=0,
+        )
+        journal.add_database(database=second_database)
+        with monkeypatch.context() as context:
+            context.setattr(
+                Journal,
+                '_remove_generations_before',
+                lambda self, generation: None,
+            )
+            journal.compact(target_manager=loaded_target_manager)
+        journal.add_database(database=third_database)
+
+        followed = [
+            (event['database_name'], event_generation)
+            for event, _, event_generation, _ in follow_journal(
+                directory=tmp_path,
+                generation=generation,
+                start=position,
+            )
+        ]
+        assert followed == [
+            (second_database.database_name, 0),
+            (third_database.database_name, 1),
+        ]
+
+        journal.compact(target_manager=loaded_target_manager)
+        with pytest.raises(FileNotFoundError):
+            list(
+                follow_journal(
+                    directory=tmp_path,
+                    generation=generation,
+                    start=position,
+                ),
+            )
+        journal.close()
+
+    def test_partly_written_record(self, tmp_path: Path) -> None:
+        """
+        A record at the end of the journal which is only partly written is
+        removed when the journal is loaded.
+        """
+        database = VuforiaDatabase()
+        journal = Journal(directory=tmp_path)
+        journal.load()
+        journal.add_database(database=database)
+        journal.close()
+        journal_path = tmp_path / 'journal-0'
+        complete_size = journal_path.stat().st_size
+        with journal_path.open('ab') as journal_file:
+            journal_file.write(b'\x10\x00\x00\x00\x00\x00\x00\x00{"kind"')
+
+        (loaded_database,) = journal.load().databases
+        assert loaded_database.database_name == database.database_name
+        assert journal_path.stat().st_size == complete_size
+        journal.close()
+
+    def test_compacted_in_background(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        The target manager compacts its journal in the background, so
+        requests are handled while the snapshot is written.
+        """
+        journal_directory = tmp_path / 'journal'
+        monkeypatch.setenv(
+            name='TARGET_MANAGER_JOURNAL_DIRECTORY',
+            value=str(journal_directory),
+        )
+        monkeypatch.setattr(
+            target_manager,
+            'Journal',
+            functools.partial(Journal, compaction_size=2),
+        )
+        snapshot_started = threading.Event()
+        snapshot_released = threading.Event()
+        released_when_saved: List[bool] = []
+        save = TargetManager.save
+
+        def _save_when_released(self: TargetManager, path: Path) -> None:
+            """
+            Wait until released before writing a snapshot.
+            """
+            snapshot_started.set()
+            released_when_saved.append(snapshot_released.wait(timeout=10))
+            save(self, path=path)
+
+        monkeypatch.setattr(TargetManager, 'save', _save_when_released)
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_ids = [
+            vws_client.add_target(
+                name=name,
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            for name in ('first', 'second')
+        ]
+        assert snapshot_started.is_set()
+        snapshot_released.set()
+        compaction_thread = target_manager._COMPACTION_THREAD
+        assert compaction_thread is not None
+        compaction_thread.join()
+
+        assert released_when_saved == [True]
+        assert (journal_directory / 'snapshot-1').exists()
+        (loaded_database,) = (
+            Journal(directory=journal_directory).load().databases
+        )
+        assert {target.target_id for target in loaded_database.targets} == set(
+            target_ids,
+        )
+
+    def test_synced_when_idle(
+        self,
+        tmp_path: Path,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """
+        Records which are left written when no more records are appended are
+        synced after the sync interval, and records are synced when the
+        journal is closed.
+        """
+        synced_file_descriptors: List[int] = []
+        real_fsync = os.fsync
+
+        def fsync(fd: int) -> None:
+            """
+            Sync a file and record that it was synced.
+            """
+            synced_file_descriptors.append(fd)
+            real_fsync(fd)
+
+        monkeypatch.setattr(os, 'fsync', fsync)
+        journal = Journal(directory=tmp_path, sync_interval_seconds=0.1)
+        journal.load()
+        synced_file_descriptors.clear()
+        journal.add_database(database=VuforiaDatabase())
+        assert not synced_file_descriptors
+        time.sleep(0.5)
+        assert len(synced_file_descriptors) == 1
+        journal.close()
+
+        journal = Journal(directory=tmp_path, sync_interval_seconds=60)
+        journal.load()
+        synced_file_descriptors.clear()
+        journal.add_database(database=VuforiaDatabase())
+        assert not synced_file_descriptors
+        journal.close()
+        assert len(synced_file_descriptors) == 1
+
+
+class TestPurgeDeletedTargets:
+    """
+    Tests for removing targets which were deleted long ago from the target
+    manager.
+    """
+
+    @pytest.mark.parametrize('storage', ['memory', 'sqlite', 'journal'])
+    def test_purged_on_read(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        tmp_path: Path,
+        storage: str,
+    ) -> None:
+        """
+        Targets which were deleted longer ago than the retention period are
+        removed when the target manager is next used, even if it is only
+        read from, and they are removed from caches of its databases.
+        """
+        journal_directory = str(tmp_path / 'journal')
+        if storage == 'sqlite':
+            monkeypatch.setenv(
+                name='TARGET_MANAGER_SQLITE_PATH',
+                value=str(tmp_path / 'store.sqlite'),
+            )
+        if storage == 'journal':
+            monkeypatch.setenv(
+                name='TARGET_MANAGER_JOURNAL_DIRECTORY',
+                value=journal_directory,
+            )
+        clock = Clock()
+        for flask_app in (
+            VWS_FLASK_APP,
+            CLOUDRECO_FLASK_APP,
+            TARGET_MANAGER_FLASK_APP,
+        ):
+            monkeypatch.setitem(flask_app.config, 'CLOCK', clock)
+        monkeypatch.setenv(name='DELETED_TARGET_RETENTION_SECONDS', value='10')
+
+        database = VuforiaDatabase()
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        clock.advance(seconds=100)
+        vws_client.delete_target(target_id=target_id)
+
+        cache = TargetManagerCache(session=TargetManagerSession())
+        cached_database = cache.get_database_by_server_access_key(
+            target_manager_base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER,
+            server_access_key=database.server_access_key,
+        )
+        assert cached_database is not None
+        assert [target.target_id for target in cached_database.targets] == [
+            target_id,
+        ]
+
+        clock.advance(seconds=11)
+        cached_database = cache.get_database_by_server_access_key(
+            target_manager_base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER,
+            server_access_key=database.server_access_key,
+        )
+        assert cached_database is not None
+        assert not cached_database.targets
+
+        if storage == 'journal':
+            # Using a different journal makes the target manager forget the
+            # databases it holds, so they are replayed from the journal.
+            monkeypatch.setenv(
+                name='TARGET_MANAGER_JOURNAL_DIRECTORY',
+                value=str(tmp_path / 'other_journal'),
+            )
+            assert requests.get(url=databases_url).json() == []
+            monkeypatch.setenv(
+                name='TARGET_MANAGER_JOURNAL_DIRECTORY',
+                value=journal_directory,
+            )
+
+        (database_dict,) = [
+            database_dict
+            for database_dict in requests.get(url=databases_url).json()
+            if database_dict['database_name'] == database.database_name
+        ]
+        assert database_dict['targets'] == []
+
+
+class TestASGI:
+    """
+    Tests for serving the Flask applications with ASGI.
+    """
+
+    def test_concurrent_requests(self) -> None:
+        """
+        Many requests can be in flight at once, and each gets the response
+        from the Flask application.
+        """
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        request_path = '/summary'
+
+        async def get_summary() -> Tuple[int, Dict[str, Any]]:
+            """
+            Get a database summary through the ASGI application.
+            """
+            date = rfc_1123_date()
+            authorization_string = authorization_header(
+                access_key=database.server_access_key,
+                secret_key=database.server_secret_key,
+                method='GET',
+                content=b'',
+                content_type='',
+                date=date,
+                request_path=request_path,
+            )
+            scope = {
+                'type': 'http',
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'https',
+                'path': request_path,
+                'query_string': b'',
+                'headers': [
+                    (b'authorization', authorization_string.encode()),
+                    (b'date', date.encode()),
+                ],
+            }
+            messages: List[MutableMapping[str, Any]] = []
+
+            async def receive() -> Dict[str, Any]:
+                """
+                Give the request body.
+                """
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message: MutableMapping[str, Any]) -> None:
+                """
+                Record a response message.
+                """
+                messages.append(message)
+
+            await VWS_ASGI_APP(scope, receive, send)
+            response_start, *response_body_messages = messages
+            response_body = b''.join(
+                message.get('body', b'') for message in response_body_messages
+            )
+            return response_start['status'], json.loads(response_body)
+
+        async def get_summaries() -> List[Tuple[int, Dict[str, Any]]]:
+            """
+            Get many database summaries at once.
+            """
+            requests_in_flight = [get_summary() for _ in range(20)]
+            return list(await asyncio.gather(*requests_in_flight))
+
+        responses = asyncio.run(get_summaries())
+        assert len(responses) == 20
+        for status, response_json in responses:
+            assert status == HTTPStatus.OK
+            assert response_json['name'] == database.database_name
+
+    def test_requests_handled_at_once(self, monkeypatch: MonkeyPatch) -> None:
+        """
+        Requests are handled by the Flask application in different threads at
+        the same time, rather than one after another.
+        """
+        request_count = 5
+        barrier = threading.Barrier(parties=request_count, timeout=10)
+        flask_wsgi_app = VWS_FLASK_APP.wsgi_app
+
+        def wsgi_app(environ: Dict[str, Any], start_response: Any) -> Any:
+            """
+            Wait until every request is being handled, then handle the
+            request.
+            """
+            barrier.wait()
+            return flask_wsgi_app(environ, start_response)
+
+        monkeypatch.setattr(VWS_FLASK_APP, 'wsgi_app', wsgi_app)
+
+        async def get_status() -> int:
+            """
+            Make a request through the ASGI application and return the
+            response status.
+            """
+            scope = {
+                'type': 'http',
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'https',
+                'path': '/summary',
+                'query_string': b'',
+                'headers': [],
+            }
+            messages: List[MutableMapping[str, Any]] = []
+
+            async def receive() -> Dict[str, Any]:
+                """
+                Give the request body.
+                """
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message: MutableMapping[str, Any]) -> None:
+                """
+                Record a response message.
+                """
+                messages.append(message)
+
+            await VWS_ASGI_APP(scope, receive, send)
+            status: int = messages[0]['status']
+            return status
+
+        async def get_statuses() -> List[int]:
+            """
+            Make many requests at once.
+            """
+            requests_in_flight = [get_status() for _ in range(request_count)]
+            return list(await asyncio.gather(*requests_in_flight))
+
+        statuses = asyncio.run(get_statuses())
+        assert statuses == [HTTPStatus.UNAUTHORIZED] * request_count
+
+
+class TestInProcessTargetManager:
+    """
+    Tests for using the target manager's databases in the same process.
+    """
+
+    def test_no_requests_to_target_manager(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: MonkeyPatch,
+        requests_mock: Mocker,
+    ) -> None:
+        """
+        The VWS and VWQ applications can use the target manager's databases
+        without making requests to the target manager.
+        """
+        backend = InProcessTargetManagerBackend()
+        monkeypatch.setitem(
+            VWS_FLASK_APP.config,
+            'TARGET_MANAGER_BACKEND',
+            backend,
+        )
+        monkeypatch.setitem(
+            CLOUDRECO_FLASK_APP.config,
+            'TARGET_MANAGER_BACKEND',
+            backend,
+        )
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + '/databases'
+        database = VuforiaDatabase()
+        requests.post(url=databases_url, json=database.to_dict())
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        cloud_reco_client = CloudRecoService(
+            client_access_key=database.client_access_key,
+            client_secret_key=database.client_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        vws_client.wait_for_target_processed(target_id=target_id)
+        vws_client.update_target(target_id=target_id, name='new_name')
+        vws_client.wait_for_target_processed(target_id=target_id)
+        matching_targets = cloud_reco_client.query(image=high_quality_image)
+        assert matching_targets[0].target_id == target_id
+        assert matching_targets[0].target_data is not None
+        assert matching_targets[0].target_data.name == 'new_name'
+        vws_client.delete_target(target_id=target_id)
+        assert vws_client.list_targets() == []
+
+        target_manager_requests = [
+            request
+            for request in requests_mock.request_history
+            if request.url.startswith(_EXAMPLE_URL_FOR_TARGET_MANAGER)
+        ]
+        assert len(target_manager_requests) == 1
+
+    def test_all_in_one_server(self) -> None:
+        """
+        The all-in-one server serves the target manager, VWS and VWQ
+        applications from one process, handles many requests with a pool of
+        threads, and stops when it is sent ``SIGTERM``.
+        """
+        ports = []
+        for _ in range(3):
+            with socket.socket() as free_socket:
+                free_socket.bind(('127.0.0.1', 0))
+                ports.append(free_socket.getsockname()[1])
+        target_manager_port, vws_port, vwq_port = ports
+
+        server_path = Path(all_in_one.__file__)
+        server = subprocess.Popen(
+            [sys.executable, str(server_path)],
+            env={
+                **os.environ,
+                'SERVER_HOST': '127.0.0.1',
+                'TARGET_MANAGER_PORT': str(target_manager_port),
+                'VWS_PORT': str(vws_port),
+                'VWQ_PORT': str(vwq_port),
+                'THREADS': '2',
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            database = VuforiaDatabase()
+            deadline = time.monotonic() + 30
+            while True:
+                connection = http.client.HTTPConnection(
+                    '127.0.0.1',
+                    target_manager_port,
+                )
+                try:
+                    connection.request(
+                        'POST',
+                        '/databases',
+                        body=json.dumps(database.to_dict()),
+                        headers={'Content-Type': 'application/json'},
+                    )
+                except ConnectionRefusedError:
+                    assert time.monotonic() < deadline
+                    time.sleep(0.1)
+                    continue
+                break
+            assert connection.getresponse().status == HTTPStatus.CREATED
+            connection.close()
+
+            for _ in range(5):
+                connection = http.client.HTTPConnection('127.0.0.1', vws_port)
+                date = rfc_1123_date()
+                authorization_string = authorization_header(
+                    access_key=database.server_access_key,
+                    secret_key=database.server_secret_key,
+                    method='GET',
+                    content=b'',
+                    content_type='',
+                    date=date,
+                    request_path='/summary',
+                )
+                connection.request(
+                    'GET',
+                    '/summary',
+                    headers={
+                        'Authorization': authorization_string,
+                        'Date': date,
+                    },
+                )
+                response = connection.getresponse()
+                assert response.status == HTTPStatus.OK
+                summary = json.loads(response.read())
+                assert summary['name'] == database.database_name
+                connection.close()
+        finally:
+            server.send_signal(signal.SIGTERM)
+            assert server.wait(timeout=30) == 0
+
+
+class TestWSGIServer:
+    """
+    Tests for serving the Flask applications with several workers.
+    """
+
+    def test_workers(self, tmp_path: Path) -> None:
+        """
+        Workers share databases through a SQLite store, connections are kept
+        open between requests, and the server stops when it is sent
+        ``SIGTERM``.
+        """
+        with socket.socket() as free_socket:
+            free_socket.bind(('127.0.0.1', 0))
+            port = free_socket.getsockname()[1]
+
+        server_path = Path(wsgi_server.__file__)
+        server = subprocess.Popen(
+            [sys.executable, str(server_path), 'target-manager'],
+            env={
+                **os.environ,
+                'SERVER_HOST': '127.0.0.1',
+                'PORT': str(port),
+                'WORKERS': '2',
+                'THREADS': '2',
+                'TARGET_MANAGER_SQLITE_PATH': str(tmp_path / 'store.db'),
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            database = VuforiaDatabase()
+            deadline = time.monotonic() + 30
+            while True:
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                try:
+                    connection.request(
+                        'POST',
+                        '/databases',
+                        body=json.dumps(database.to_dict()),
+                        headers={'Content-Type': 'application/json'},
+                    )
+                except ConnectionRefusedError:
+                    assert time.monotonic() < deadline
+                    time.sleep(0.1)
+                    continue
+                break
+            assert connection.getresponse().read()
+
+            for _ in range(5):
+                connection.request('GET', '/databases')
+                response = connection.getresponse()
+                assert response.status == HTTPStatus.OK
+                (database_dict,) = json.loads(response.read())
+                assert database_dict['database_name'] == database.database_name
+            connection.close()
+        finally:
+            server.send_signal(signal.SIGTERM)
+            assert server.wait(timeout=30) == 0
+
+    def test_idle_connections(self) -> None:
+        """
+        Idle keep-alive connections do not stop other connections from being
+        handled.
+        """
+        with socket.socket() as free_socket:
+            free_socket.bind(('127.0.0.1', 0))
+            port = free_socket.getsockname()[1]
+
+        server_path = Path(wsgi_server.__file__)
+        server = subprocess.Popen(
+            [sys.executable, str(server_path), 'target-manager'],
+            env={
+                **os.environ,
+                'SERVER_HOST': '127.0.0.1',
+                'PORT': str(port),
+                'THREADS': '1',
+                'KEEP_ALIVE_SECONDS': '60',
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            idle_connections = []
+            deadline = time.monotonic() + 30
+            for _ in range(3):
+                while True:
+                    connection = http.client.HTTPConnection(
+                        '127.0.0.1',
+                        port,
+                        timeout=10,
+                    )
+                    try:
+                        connection.request(
+                            'POST',
+                            '/databases',
+                            body=json.dumps(VuforiaDatabase().to_dict()),
+                            headers={'Content-Type': 'application/json'},
+                        )
+                    except ConnectionRefusedError:
+                        assert time.monotonic() < deadline
+                        time.sleep(0.1)
+                        continue
+                    break
+                response = connection.getresponse()
+                assert response.status == HTTPStatus.CREATED
+                assert response.getheader('Connection') == 'keep-alive'
+                response.read()
+                idle_connections.append(connection)
+
+            for connection in idle_connections:
+                connection.close()
+        finally:
+            server.send_signal(signal.SIGTERM)
+            assert server.wait(timeout=30) == 0
+
+
+class TestTargetManagerSession:
+    """
+    Tests for the session used for requests to the target manager.
+    """
+
+    def test_connections_kept_open(
+        self,
+        monkeypatch: MonkeyPatch,
+        requests_mock: Mocker,
+    ) -> None:
+        """
+        One connection is used for many requests, and requests time out after
+        the time given in an environment variable.
+        """
+        connection_count = 0
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            """
+            A handler which counts connections.
+            """
+
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self) -> None:
+                """
+                Count a connection.
+                """
+                nonlocal connection_count
+                connection_count += 1
+                super().setup()
+
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                """
+                Respond, slowly for the path ``/slow``.
+                """
+                if self.path == '/slow':
+                    time.sleep(1)
+                self.send_response(HTTPStatus.OK)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args: Any) -> None:
+                """
+                Do not log requests.
+                """
+
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        monkeypatch.setattr(requests_mock, 'real_http', True)
+        monkeypatch.setenv(name='TARGET_MANAGER_TIMEOUT_SECONDS', value='0.2')
+        session = TargetManagerSession()
+
+        try:
+            for _ in range(5):
+                response = session.request(method='GET', url=base_url)
+                assert response.status_code == HTTPStatus.OK
+            assert connection_count == 1
+
+            with pytest.raises(requests.exceptions.Timeout):
+                session.request(method='GET', url=base_url + '/slow')
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,237 @@
+"""
+Tests for parsing ``multipart/form-data`` bodies.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Dict, List, Union
+
+import pytest
+from urllib3.filepost import encode_multipart_formdata
+
+from mock_vws._multipart import parse_header, parse_multipart
+
+_BOUNDARY = 'example_boundary'
+
+
+def _parse_with_cgi(
+    body: bytes,
+    boundary: str,
+) -> Dict[str, List[Union[str, bytes]]]:
+    """
+    Parse a ``multipart/form-data`` body with the ``cgi`` module, which was
+    used before ``parse_multipart``.
+
+    A part without a name is recorded under ``''``, as ``parse_multipart``
+    does, rather than under ``None``.
+    """
+    cgi = pytest.importorskip('cgi')
+    parsed = cgi.parse_multipart(
+        fp=io.BytesIO(body),
+        pdict={'boundary': boundary.encode()},
+    )
+    return {name or '': values for name, values in parsed.items()}
+
+
+def _body(parts: List[bytes], line_ending: bytes = b'\r\n') -> bytes:
+    """
+    Make a ``multipart/form-data`` body with the given parts and the
+    boundary ``_BOUNDARY``, with a closing delimiter.
+
+    Args:
+        parts: Each part, with its headers and content separated by a blank
+            line, with ``\\r\\n`` line endings.
+        line_ending: The line ending to use.
+    """
+    delimiter = b'--' + _BOUNDARY.encode()
+    lines = []
+    for part in parts:
+        lines.append(delimiter)
+        lines.append(part)
+    lines.append(delimiter + b'--')
+    body = b'\r\n'.join(lines) + b'\r\n'
+    return body.replace(b'\r\n', line_ending)
+
+
+_FIELD = b'Content-Disposition: form-data; name="max_num_results"\r\n\r\n5'
+_FILE = (
+    b'Content-Disposition: form-data; name="image"; filename="image.jpeg"\r\n'
+    b'Content-Type: image/jpeg\r\n'
+    b'\r\n'
+    b'\x00\x01image data\xff'
+)
+
+
+class TestParseHeader:
+    """
+    Tests for parsing header values.
+    """
+
+    def test_unquoted_boundary(self) -> None:
+        """
+        Parameters are given by lower case name.
+        """
+        main_value, params = parse_header(
+            line='multipart/form-data; BOUNDARY=example',
+        )
+        assert main_value == 'multipart/form-data'
+        assert params == {'boundary': 'example'}
+
+    def test_quoted_boundary(self) -> None:
+        """
+        Quotes are removed from a quoted parameter, which may contain
+        semicolons and escaped quotes.
+        """
+        _, params = parse_header(
+            line=(
+                'multipart/form-data; boundary="exa;mple \\"b\\""; '
+                'charset=utf-8'
+            ),
+        )
+        assert params == {'boundary': 'exa;mple "b"', 'charset': 'utf-8'}
+
+    def test_quoted_boundary_body(self) -> None:
+        """
+        A body is parsed with the boundary from a quoted parameter.
+        """
+        boundary = 'exa;mple'
+        body = _body(parts=[_FIELD]).replace(
+            _BOUNDARY.encode(),
+            boundary.encode(),
+        )
+        _, params = parse_header(
+            line=f'multipart/form-data; boundary="{boundary}"',
+        )
+        fields = parse_multipart(body=body, boundary=params['boundary'])
+        assert fields == {'max_num_results': ['5']}
+
+
+class TestParseMultipart:
+    """
+    Tests for parsing ``multipart/form-data`` bodies.
+    """
+
+    @pytest.mark.parametrize('line_ending', [b'\r\n', b'\n'])
+    def test_line_endings(self, line_ending: bytes) -> None:
+        """
+        Parts may be separated by either CRLF or LF line endings, and the
+        line ending before a delimiter is not part of the content.
+        """
+        body = _body(parts=[_FIELD, _FILE], line_ending=line_ending)
+        fields = parse_multipart(body=body, boundary=_BOUNDARY)
+        assert fields == {
+            'max_num_results': ['5'],
+            'image': [b'\x00\x01image data\xff'],
+        }
+
+    def test_missing_closing_delimiter(self) -> None:
+        """
+        The content of the last part runs to the end of the body if there is
+        no closing delimiter, without the final line ending.
+        """
+        closing_delimiter = b'--' + _BOUNDARY.encode() + b'--\r\n'
+        body = _body(parts=[_FIELD, _FILE])
+        assert body.endswith(closing_delimiter)
+        body = body[: -len(closing_delimiter)]
+        fields = parse_multipart(body=body, boundary=_BOUNDARY)
+        assert fields == {
+            'max_num_results': ['5'],
+            'image': [b'\x00\x01image data\xff'],
+        }
+
+    def test_duplicate_fields(self) -> None:
+        """
+        Every value given for a field is kept, in order.
+        """
+        other_field = _FIELD.replace(b'\r\n\r\n5', b'\r\n\r\n10')
+        body = _body(parts=[_FIELD, other_field])
+        fields = parse_multipart(body=body, boundary=_BOUNDARY)
+        assert fields == {'max_num_results': ['5', '10']}
+
+    @pytest.mark.parametrize(
+        'content',
+        [
+            b'--' + _BOUNDARY.encode() + b'---',
+            b'\xff--' + _BOUNDARY.encode() + b'\r\n\xff',
+            b'\xff\r\n--' + _BOUNDARY.encode() + b'_not_a_delimiter\xff',
+            b'\xff\n--' + _BOUNDARY.encode() + b'x\r\n--\xff',
+        ],
+    )
+    def test_binary_content_with_boundary(self, content: bytes) -> None:
+        """
+        Content which includes the boundary, but not as a delimiter line, is
+        kept.
+        """
+        image_part = _FILE.replace(b'\x00\x01image data\xff', content)
+        body = _body(parts=[image_part, _FIELD])
+        fields = parse_multipart(body=body, boundary=_BOUNDARY)
+        assert fields == {
+            'image': [content],
+            'max_num_results': ['5'],
+        }
+        assert fields == _parse_with_cgi(body=body, boundary=_BOUNDARY)
+
+    def test_part_without_name(self) -> None:
+        """
+        A part without a name is recorded under an empty name.
+        """
+        part = b'Content-Disposition: form-data\r\n\r\nvalue'
+        body = _body(parts=[part])
+        fields = parse_multipart(body=body, boundary=_BOUNDARY)
+        assert fields == {'': ['value']}
+
+
+class TestCGICompatibility:
+    """
+    ``parse_multipart`` gives the same results as the ``cgi`` module, which
+    was used before it.
+    """
+
+    @pytest.mark.parametrize(
+        'body',
+        [
+            _body(parts=[_FIELD, _FILE]),
+            _body(parts=[_FIELD, _FILE], line_ending=b'\n'),
+            _body(parts=[_FILE, _FIELD, _FIELD]),
+            _body(parts=[_FIELD, _FILE])[: -len(_BOUNDARY) - 6],
+            _body(parts=[b'Content-Disposition: form-data\r\n\r\nvalue']),
+            _body(
+                parts=[
+                    _FILE.replace(
+                        b'image data',
+                        b'\r\n--' + _BOUNDARY.encode() + b'x\r\n',
+                    ),
+                ],
+            ),
+            _body(parts=[]),
+            b'',
+        ],
+    )
+    def test_same_as_cgi(self, body: bytes) -> None:
+        """
+        The fields of a body are the same as those given by the ``cgi``
+        module.
+        """
+        fields = parse_multipart(body=body, boundary=_BOUNDARY)
+        assert fields == _parse_with_cgi(body=body, boundary=_BOUNDARY)
+
+    def test_urllib3_body(self) -> None:
+        """
+        A body made by ``urllib3``, as the ``vws`` client makes query bodies,
+        is parsed as the ``cgi`` module parses it.
+        """
+        body, content_type = encode_multipart_formdata(
+            fields={
+                'image': ('image.jpeg', b'\x00\r\n\xff' * 100, 'image/jpeg'),
+                'max_num_results': '2',
+                'include_target_data': 'all',
+            },
+        )
+        _, params = parse_header(line=content_type)
+        fields = parse_multipart(body=body, boundary=params['boundary'])
+        assert fields == _parse_with_cgi(
+            body=body,
+            boundary=params['boundary'],
+        )
+        assert fields['image'] == [b'\x00\r\n\xff' * 100]
@@ -2,24 +2,57 @@
 Tests for the usage of the mock for ``requests``.
 """
 
+import base64
+import copy
+import dataclasses
 import email.utils
 import io
 import json
+import math
+import pickle
 import socket
-from datetime import datetime
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, List, Optional, Set, Tuple
 
 import pytest
 import requests
+from backports.zoneinfo import ZoneInfo
 from freezegun import freeze_time
+from PIL import Image
 from requests.exceptions import MissingSchema
 from requests_mock.exceptions import NoMockAddress
-from vws import VWS
+from vws import VWS, CloudRecoService
+from vws.exceptions.vws_exceptions import (
+    AuthenticationFailure,
+    TargetNameExist,
+)
+from vws.reports import TargetStatuses
 from vws_auth_tools import rfc_1123_date
 
 from mock_vws import MockVWS
+from mock_vws._mock_common import Route
+from mock_vws._requests_mock_server import mock_web_query_api
+from mock_vws._requests_mock_server.mock_web_query_api import (
+    MockVuforiaWebQueryAPI,
+)
+from mock_vws.clock import Clock
 from mock_vws.database import VuforiaDatabase
+from mock_vws.image_store import (
+    CompressedImage,
+    ImageStore,
+    MappedImage,
+    StoredImage,
+    compress_image,
+)
 from mock_vws.states import States
 from mock_vws.target import Target
+from mock_vws.target_manager import TargetManager
+from tests.mock_vws.utils import make_image_file
 from tests.mock_vws.utils.usage_test_helpers import (
     process_deletion_seconds,
     processing_time_seconds,
@@ -132,6 +165,410 @@ class TestProcessingTime:
         assert abs(expected - time_taken) < self.LEEWAY
 
 
+class TestClock:
+    """
+    Tests for giving the mock a clock.
+    """
+
+    def test_advance(self, high_quality_image: io.BytesIO) -> None:
+        """
+        Moving the clock forward skips the time taken to process a target.
+        """
+        database = VuforiaDatabase()
+        clock = Clock()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        with MockVWS(processing_time_seconds=100, clock=clock) as mock:
+            mock.add_database(database=database)
+            target_id = vws_client.add_target(
+                name='example',
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            status = vws_client.get_target_record(target_id=target_id).status
+            assert status == TargetStatuses.PROCESSING
+            clock.advance(seconds=101)
+            status = vws_client.get_target_record(target_id=target_id).status
+            assert status == TargetStatuses.SUCCESS
+
+    def test_outside_requests(self, high_quality_image: io.BytesIO) -> None:
+        """
+        A database added to the mock uses the mock's clock, also when its
+        targets are looked up outside of requests.
+        """
+        database = VuforiaDatabase()
+        clock = Clock()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        with MockVWS(processing_time_seconds=60, clock=clock) as mock:
+            mock.add_database(database=database)
+            target_id = vws_client.add_target(
+                name='example',
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            assert len(database.processing_targets) == 1
+            clock.advance(seconds=120)
+            status = vws_client.get_target_record(target_id=target_id).status
+
+        assert status == TargetStatuses.SUCCESS
+        target = database.get_target(target_id=target_id)
+        assert target.status == TargetStatuses.SUCCESS.value
+        assert database.active_targets == {target}
+        assert not database.processing_targets
+
+    def test_advance_past_date_skew(
+        self,
+        high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        Requests are accepted after the clock is moved forward by more than
+        the time by which a request's date may differ from the time, as
+        clients sign requests with the system time.
+        """
+        database = VuforiaDatabase()
+        clock = Clock()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        cloud_reco_client = CloudRecoService(
+            client_access_key=database.client_access_key,
+            client_secret_key=database.client_secret_key,
+        )
+        with MockVWS(processing_time_seconds=100, clock=clock) as mock:
+            mock.add_database(database=database)
+            # This is more than the 65 minutes allowed by the query endpoint.
+            clock.advance(seconds=2 * 60 * 60)
+            target_id = vws_client.add_target(
+                name='example',
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            clock.advance(seconds=101)
+            status = vws_client.get_target_record(target_id=target_id).status
+            [match] = cloud_reco_client.query(image=high_quality_image)
+
+        assert status == TargetStatuses.SUCCESS
+        assert match.target_id == target_id
+
+    def test_freeze(self, high_quality_image: io.BytesIO) -> None:
+        """
+        While the clock is frozen, the time changes only when the clock is
+        moved forward.
+        """
+        database = VuforiaDatabase()
+        clock = Clock()
+        clock.freeze()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        with MockVWS(processing_time_seconds=0.1, clock=clock) as mock:
+            mock.add_database(database=database)
+            target_id = vws_client.add_target(
+                name='example',
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            time.sleep(0.2)
+            status = vws_client.get_target_record(target_id=target_id).status
+            assert status == TargetStatuses.PROCESSING
+            clock.advance(seconds=0.2)
+            status = vws_client.get_target_record(target_id=target_id).status
+            assert status == TargetStatuses.SUCCESS
+
+        clock.unfreeze()
+        assert clock.now() > database.get_target(target_id).last_modified_date
+
+
+class TestImageStore:
+    """
+    Tests for keeping target images in an image store.
+    """
+
+    def test_images_stored(
+        self,
+        high_quality_image: io.BytesIO,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Images of targets added through the mock are kept in the image store,
+        with each distinct image kept once.
+        """
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        image_store = ImageStore(directory=tmp_path)
+        with MockVWS(image_store=image_store) as mock:
+            mock.add_database(database=database)
+            target_ids = [
+                vws_client.add_target(
+                    name=name,
+                    width=1,
+                    image=high_quality_image,
+                    active_flag=True,
+                    application_metadata=None,
+                )
+                for name in ('example_1', 'example_2')
+            ]
+            for target_id in target_ids:
+                vws_client.wait_for_target_processed(target_id=target_id)
+            duplicates = vws_client.get_duplicate_targets(
+                target_id=target_ids[0],
+            )
+
+        assert duplicates == [target_ids[1]]
+        (image_path,) = tmp_path.iterdir()
+        assert image_path.read_bytes() == high_quality_image.getvalue()
+        for target_id in target_ids:
+            target = database.get_target(target_id=target_id)
+            assert isinstance(target.image_value, StoredImage)
+            assert target.image_bytes == high_quality_image.getvalue()
+
+
+class TestCompressImages:
+    """
+    Tests for keeping target images compressed in memory.
+    """
+
+    def test_images_compressed(self, high_quality_image: io.BytesIO) -> None:
+        """
+        Images of targets added through the mock are kept compressed, and
+        are decompressed when they are needed.
+        """
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        cloud_reco_client = CloudRecoService(
+            client_access_key=database.client_access_key,
+            client_secret_key=database.client_secret_key,
+        )
+        with MockVWS(compress_images=True) as mock:
+            mock.add_database(database=database)
+            target_id = vws_client.add_target(
+                name='example',
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            vws_client.wait_for_target_processed(target_id=target_id)
+            matching_targets = cloud_reco_client.query(
+                image=high_quality_image,
+            )
+
+        assert [
+            matching_target.target_id for matching_target in matching_targets
+        ] == [target_id]
+        target = database.get_target(target_id=target_id)
+        assert isinstance(target.image_value, CompressedImage)
+        assert target.image_bytes == high_quality_image.getvalue()
+
+
+class TestDeletedTargetRetention:
+    """
+    Tests for removing deleted targets from databases.
+    """
+
+    @staticmethod
+    def _add_and_delete_target(
+        vws_client: VWS,
+        clock: Clock,
+        image: io.BytesIO,
+    ) -> str:
+        """
+        Add a target and delete it.
+
+        Returns:
+            The ID of the deleted target.
+        """
+        target_id = vws_client.add_target(
+            name='example',
+            width=1,
+            image=image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        clock.advance(seconds=1)
+        vws_client.delete_target(target_id=target_id)
+        return target_id
+
+    @pytest.mark.parametrize(
+        'retention_seconds, expected_retention_seconds',
+        [(None, 4), (2, 4), (10, 10)],
+    )
+    def test_purged(
+        self,
+        high_quality_image: io.BytesIO,
+        retention_seconds: Optional[float],
+        expected_retention_seconds: float,
+    ) -> None:
+        """
+        Deleted targets are removed when the database is next used after the
+        retention period, which is at least as long as deleted targets affect
+        queries.
+        """
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        clock = Clock()
+        clock.freeze()
+        with MockVWS(
+            processing_time_seconds=0,
+            query_recognizes_deletion_seconds=1,
+            query_processes_deletion_seconds=3,
+            deleted_target_retention_seconds=retention_seconds,
+            clock=clock,
+        ) as mock:
+            mock.add_database(database=database)
+            target_id = self._add_and_delete_target(
+                vws_client=vws_client,
+                clock=clock,
+                image=high_quality_image,
+            )
+            # Adding and deleting a target takes one second.
+            clock.advance(seconds=expected_retention_seconds - 1.5)
+            new_target_id = self._add_and_delete_target(
+                vws_client=vws_client,
+                clock=clock,
+                image=high_quality_image,
+            )
+            assert database.get_target(target_id=target_id).delete_date
+            clock.advance(seconds=1)
+            self._add_and_delete_target(
+                vws_client=vws_client,
+                clock=clock,
+                image=high_quality_image,
+            )
+
+        deleted_target_ids = {
+            target.target_id for target in database.deleted_targets
+        }
+        assert target_id not in deleted_target_ids
+        assert new_target_id in deleted_target_ids
+        with pytest.raises(ValueError):
+            database.get_target(target_id=target_id)
+
+    def test_purged_on_read(self, high_quality_image: io.BytesIO) -> None:
+        """
+        Deleted targets are removed after the retention period even if
+        targets are only read.
+        """
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        clock = Clock()
+        clock.freeze()
+        with MockVWS(
+            processing_time_seconds=0,
+            deleted_target_retention_seconds=10,
+            clock=clock,
+        ) as mock:
+            mock.add_database(database=database)
+            target_id = self._add_and_delete_target(
+                vws_client=vws_client,
+                clock=clock,
+                image=high_quality_image,
+            )
+            clock.advance(seconds=11)
+            assert vws_client.list_targets() == []
+
+        assert target_id not in {
+            target.target_id for target in database.targets
+        }
+
+    def test_purged_by_mock_clock(
+        self,
+        high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        Deleted targets are purged by the time of the mock's clock, also when
+        the database is used outside of requests.
+        """
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        clock = Clock()
+        clock.freeze()
+        with MockVWS(
+            processing_time_seconds=0,
+            query_recognizes_deletion_seconds=0,
+            query_processes_deletion_seconds=0,
+            deleted_target_retention_seconds=0.1,
+            clock=clock,
+        ) as mock:
+            mock.add_database(database=database)
+            target_id = self._add_and_delete_target(
+                vws_client=vws_client,
+                clock=clock,
+                image=high_quality_image,
+            )
+
+        # The system time passes the retention period, but the mock's clock
+        # is frozen.
+        time.sleep(0.2)
+        (deleted_target,) = database.deleted_targets
+        assert deleted_target.target_id == target_id
+        clock.advance(seconds=0.2)
+        assert not database.deleted_targets
+        assert not database.targets
+
+    def test_keep_forever(self, high_quality_image: io.BytesIO) -> None:
+        """
+        Deleted targets can be kept forever.
+        """
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        clock = Clock()
+        clock.freeze()
+        with MockVWS(
+            processing_time_seconds=0,
+            deleted_target_retention_seconds=math.inf,
+            clock=clock,
+        ) as mock:
+            mock.add_database(database=database)
+            target_id = self._add_and_delete_target(
+                vws_client=vws_client,
+                clock=clock,
+                image=high_quality_image,
+            )
+            clock.advance(seconds=100)
+            self._add_and_delete_target(
+                vws_client=vws_client,
+                clock=clock,
+                image=high_quality_image,
+            )
+
+        assert database.get_target(target_id=target_id).delete_date
+        assert len(database.deleted_targets) == 2
+
+
 class TestDatabaseName:
     """
     Tests for the database name.
@@ -156,6 +593,156 @@ class TestDatabaseName:
         assert database_details.database_name == 'foo'
 
 
+class TestRoutes:
+    """
+    Tests for sending requests to the route which matches them.
+    """
+
+    @staticmethod
+    def _route_names(
+        routes: Set[Route],
+        requests_to_make: List[Tuple[str, str]],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> List[Optional[str]]:
+        """
+        Make requests to a mock with the given query routes, and return the
+        name of the route which handled each request, or ``None`` if no route
+        handled it.
+        """
+        monkeypatch.setattr(mock_web_query_api, 'ROUTES', routes)
+        for route in routes:
+            monkeypatch.setattr(
+                MockVuforiaWebQueryAPI,
+                route.route_name,
+                lambda *_, route_name=route.route_name: route_name,
+                raising=False,
+            )
+
+        route_names: List[Optional[str]] = []
+        with MockVWS(base_vwq_url='https://example.com'):
+            for method, path in requests_to_make:
+                try:
+                    response = requests.request(
+                        method=method,
+                        url='https://example.com' + path,
+                    )
+                except NoMockAddress:
+                    route_names.append(None)
+                else:
+                    route_names.append(response.text)
+        return route_names
+
+    def test_routes_matched(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        A request is sent to the route with a pattern which matches the whole
+        of the request's path, and with the request's method.
+        """
+        routes = {
+            Route(
+                route_name='first_route',
+                path_pattern='/first/[a-z]+',
+                http_methods=frozenset({'GET', 'DELETE'}),
+            ),
+            Route(
+                route_name='second_route',
+                path_pattern='/second',
+                http_methods=frozenset({'POST'}),
+            ),
+        }
+        route_names = self._route_names(
+            routes=routes,
+            requests_to_make=[
+                ('GET', '/first/abc'),
+                ('DELETE', '/first/abc'),
+                ('POST', '/second'),
+                ('GET', '/first/abc/def'),
+                ('GET', '/second'),
+                ('POST', '/first/abc'),
+                ('GET', '/unknown'),
+            ],
+            monkeypatch=monkeypatch,
+        )
+        assert route_names == [
+            'first_route',
+            'first_route',
+            'second_route',
+            None,
+            None,
+            None,
+            None,
+        ]
+
+    def test_overlapping_patterns(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        An error is raised for a request which the patterns of more than one
+        route match, rather than one of the routes being picked.
+        """
+        routes = {
+            Route(
+                route_name='first_route',
+                path_pattern='/things/.+',
+                http_methods=frozenset({'GET'}),
+            ),
+            Route(
+                route_name='second_route',
+                path_pattern='/things/special',
+                http_methods=frozenset({'GET'}),
+            ),
+        }
+        route_names = self._route_names(
+            routes=routes,
+            requests_to_make=[('GET', '/things/other')],
+            monkeypatch=monkeypatch,
+        )
+        assert route_names == ['first_route']
+
+        expected = (
+            'More than one route matches GET '
+            'https://example.com/things/special: first_route, second_route.'
+        )
+        with pytest.raises(ValueError) as exc:
+            self._route_names(
+                routes=routes,
+                requests_to_make=[('GET', '/things/special')],
+                monkeypatch=monkeypatch,
+            )
+        assert str(exc.value) == expected
+
+    def test_overlapping_patterns_other_method(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Only routes with the request's method are used, so patterns of routes
+        with different methods can overlap.
+        """
+        routes = {
+            Route(
+                route_name='first_route',
+                path_pattern='/things/.+',
+                http_methods=frozenset({'GET'}),
+            ),
+            Route(
+                route_name='second_route',
+                path_pattern='/things/special',
+                http_methods=frozenset({'PUT'}),
+            ),
+        }
+        route_names = self._route_names(
+            routes=routes,
+            requests_to_make=[
+                ('GET', '/things/special'),
+                ('PUT', '/things/special'),
+                ('PUT', '/things/other'),
+            ],
+            monkeypatch=monkeypatch,
+        )
+        assert route_names == ['first_route', 'second_route', None]
+
+
 class TestCustomBaseURLs:
     """
     Tests for using custom base URLs.
@@ -385,6 +972,120 @@ class TestTargets:
         new_target = Target.from_dict(target_dict=target_dict)
         assert new_target == target
 
+    def test_copy(self, high_quality_image: io.BytesIO) -> None:
+        """
+        Targets can be copied, pickled and replaced, and are hashed by ID.
+        """
+        target = Target(
+            name='example',
+            active_flag=True,
+            width=1,
+            image_value=high_quality_image.getvalue(),
+            processing_time_seconds=0,
+            application_metadata=None,
+        )
+        # This caches the status.
+        assert target.status == TargetStatuses.SUCCESS.value
+
+        assert copy.deepcopy(target) == target
+        assert pickle.loads(pickle.dumps(target)) == target
+        assert copy.copy(target).status == TargetStatuses.SUCCESS.value
+        new_target = dataclasses.replace(target, name='new_name')
+        assert new_target.name == 'new_name'
+        assert new_target != target
+        assert hash(new_target) == hash(target)
+
+    def test_memory_footprint(self) -> None:
+        """
+        Targets take a few hundred bytes each, not counting their images,
+        both alone and in a database.
+        """
+        target_count = 1000
+        image_value = make_image_file(
+            file_format='PNG',
+            color_space='RGB',
+            width=20,
+            height=20,
+        ).getvalue()
+        tracemalloc.start()
+        try:
+            start_size, _ = tracemalloc.get_traced_memory()
+            targets = [
+                Target(
+                    name=f'example_{index}',
+                    active_flag=True,
+                    width=1,
+                    image_value=image_value,
+                    processing_time_seconds=0,
+                    application_metadata=None,
+                )
+                for index in range(target_count)
+            ]
+            for target in targets:
+                assert target.status == TargetStatuses.SUCCESS.value
+            targets_size, _ = tracemalloc.get_traced_memory()
+            database = VuforiaDatabase(targets=set(targets))
+            assert database.active_target_count == target_count
+            database_size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        target_size = (targets_size - start_size) / target_count
+        target_in_database_size = (database_size - start_size) / target_count
+        assert target_size < 512
+        assert target_in_database_size < 768
+
+    def test_image_processed_once(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        A target's image is decoded to find its status only once, even for
+        copies of the target which are replaced or loaded from a dictionary.
+        """
+        # A new image, so that no other test has processed it.
+        image_value = make_image_file(
+            file_format='PNG',
+            color_space='RGB',
+            width=20,
+            height=20,
+        ).getvalue()
+        opened_images = []
+        open_image = Image.open
+
+        def counting_open(image_file: io.BytesIO) -> Image.Image:
+            """
+            Record opening an image.
+            """
+            opened_images.append(image_file)
+            return open_image(image_file)
+
+        monkeypatch.setattr(Image, 'open', counting_open)
+        target = Target(
+            name='example',
+            active_flag=True,
+            width=1,
+            image_value=image_value,
+            processing_time_seconds=0,
+            application_metadata=None,
+        )
+        compressed_target = dataclasses.replace(
+            target,
+            image_value=compress_image(image_value=image_value),
+        )
+        copies = [
+            target,
+            dataclasses.replace(target, name='new_name'),
+            Target.from_dict(target_dict=target.to_dict()),
+            compressed_target,
+            Target.from_dict(target_dict=compressed_target.to_dict()),
+        ]
+        for target_copy in copies:
+            assert target_copy.status == TargetStatuses.SUCCESS.value
+            assert target_copy.tracking_rating >= 0
+
+        assert len(opened_images) == 1
+
     def test_to_dict_deleted(self, high_quality_image: io.BytesIO) -> None:
         """
         Test for dumping a deleted target to a dictionary and loading it back.
@@ -417,6 +1118,311 @@ class TestTargets:
         new_target = Target.from_dict(target_dict=target_dict)
         assert new_target.delete_date == target.delete_date
 
+    def test_targets_added_to_database(
+        self,
+        high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        Targets given when creating a database, and targets added to a
+        database's targets directly, can be matched and found as duplicates.
+        """
+        image_value = high_quality_image.getvalue()
+        given_target, added_target = [
+            Target(
+                active_flag=True,
+                application_metadata=None,
+                image_value=image_value,
+                name=name,
+                processing_time_seconds=0,
+                width=1,
+            )
+            for name in ('given', 'added')
+        ]
+        database = VuforiaDatabase(targets={given_target})
+        database.targets.add(added_target)
+
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        cloud_reco_client = CloudRecoService(
+            client_access_key=database.client_access_key,
+            client_secret_key=database.client_secret_key,
+        )
+
+        with MockVWS() as mock:
+            mock.add_database(database=database)
+            matches = cloud_reco_client.query(
+                image=high_quality_image,
+                max_num_results=2,
+            )
+            duplicates = vws_client.get_duplicate_targets(
+                target_id=given_target.target_id,
+            )
+
+        assert {match.target_id for match in matches} == {
+            given_target.target_id,
+            added_target.target_id,
+        }
+        assert duplicates == [added_target.target_id]
+
+    def test_target_added_to_database_by_id_and_name(
+        self,
+        high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        Targets added to a database's targets directly can be found by ID and
+        by name.
+        """
+        target = Target(
+            active_flag=True,
+            application_metadata=None,
+            image_value=high_quality_image.getvalue(),
+            name='example',
+            processing_time_seconds=0,
+            width=1,
+        )
+        database = VuforiaDatabase()
+        database.targets.add(target)
+
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+
+        with MockVWS() as mock:
+            mock.add_database(database=database)
+            target_record = vws_client.get_target_record(
+                target_id=target.target_id,
+            ).target_record
+            with pytest.raises(TargetNameExist):
+                vws_client.add_target(
+                    name=target.name,
+                    width=1,
+                    image=high_quality_image,
+                    active_flag=True,
+                    application_metadata=None,
+                )
+
+        assert target_record.name == target.name
+        assert database.get_target(target_id=target.target_id) == target
+
+    def test_targets_changed_while_iterated(
+        self,
+        high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        A database's targets can be changed while they are iterated over, and
+        later iterations see the changes.
+        """
+        first_target, second_target, third_target = [
+            Target(
+                active_flag=True,
+                application_metadata=None,
+                image_value=high_quality_image.getvalue(),
+                name=name,
+                processing_time_seconds=0,
+                width=1,
+            )
+            for name in ('first', 'second', 'third')
+        ]
+        database = VuforiaDatabase(targets={first_target, second_target})
+
+        iterated_targets = set()
+        for target in database.targets:
+            iterated_targets.add(target)
+            database.targets.discard(first_target)
+            database.targets.add(third_target)
+
+        assert iterated_targets == {first_target, second_target}
+        assert set(database.targets) == {second_target, third_target}
+        database.targets.clear()
+        assert not list(database.targets)
+
+
+def _assert_target_counts(
+    database: VuforiaDatabase,
+    active: int,
+    inactive: int,
+    failed: int,
+    processing: int,
+) -> None:
+    """
+    Assert that a database has the given numbers of targets in each state,
+    and that these are the numbers of targets in each state's set.
+    """
+    assert database.active_target_count == active
+    assert database.inactive_target_count == inactive
+    assert database.failed_target_count == failed
+    assert database.processing_target_count == processing
+    assert len(database.active_targets) == active
+    assert len(database.inactive_targets) == inactive
+    assert len(database.failed_targets) == failed
+    assert len(database.processing_targets) == processing
+
+
+class TestTargetCounts:
+    """
+    Tests for the numbers of targets in each state which a database keeps.
+    """
+
+    def test_counts_kept(
+        self,
+        high_quality_image: io.BytesIO,
+        image_file_failed_state: io.BytesIO,
+    ) -> None:
+        """
+        The numbers of targets in each state change as targets are added and
+        removed, and as targets finish processing.
+        """
+        start_time = datetime(2020, 1, 1, tzinfo=ZoneInfo('GMT'))
+
+        def make_target(
+            image_value: bytes,
+            active_flag: bool = True,
+            processing_time_seconds: int = 10,
+        ) -> Target:
+            """
+            Make a target which was last modified at the start time.
+            """
+            return Target(
+                active_flag=active_flag,
+                application_metadata=None,
+                image_value=image_value,
+                name=uuid.uuid4().hex,
+                processing_time_seconds=processing_time_seconds,
+                width=1,
+                last_modified_date=start_time,
+                upload_date=start_time,
+            )
+
+        good_image = high_quality_image.getvalue()
+        failed_image = image_file_failed_state.getvalue()
+        active_target = make_target(image_value=good_image)
+        inactive_target = make_target(
+            image_value=good_image,
+            active_flag=False,
+        )
+        failed_target = make_target(image_value=failed_image)
+        processing_target = make_target(
+            image_value=good_image,
+            processing_time_seconds=100,
+        )
+        deleted_target = dataclasses.replace(
+            make_target(image_value=good_image),
+            delete_date=start_time,
+        )
+        database = VuforiaDatabase(
+            targets={
+                active_target,
+                inactive_target,
+                failed_target,
+                processing_target,
+                deleted_target,
+            },
+        )
+
+        with freeze_time(start_time + timedelta(seconds=20)):
+            _assert_target_counts(
+                database=database,
+                active=1,
+                inactive=1,
+                failed=1,
+                processing=1,
+            )
+
+            database.targets.discard(active_target)
+            database.targets.discard(processing_target)
+            database.targets.add(make_target(image_value=failed_image))
+            database.targets.add(
+                make_target(image_value=good_image, active_flag=False),
+            )
+            database.targets.add(
+                make_target(
+                    image_value=good_image,
+                    processing_time_seconds=100,
+                ),
+            )
+            _assert_target_counts(
+                database=database,
+                active=0,
+                inactive=2,
+                failed=2,
+                processing=1,
+            )
+
+        with freeze_time(start_time + timedelta(seconds=200)):
+            _assert_target_counts(
+                database=database,
+                active=1,
+                inactive=2,
+                failed=2,
+                processing=0,
+            )
+
+    def test_time_goes_backwards(
+        self,
+        high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        When the time goes backwards, targets which finished processing after
+        the new time are processing again, and other targets are not.
+        """
+        start_time = datetime(2020, 1, 1, tzinfo=ZoneInfo('GMT'))
+        image_value = high_quality_image.getvalue()
+        targets = [
+            Target(
+                active_flag=True,
+                application_metadata=None,
+                image_value=image_value,
+                name=uuid.uuid4().hex,
+                processing_time_seconds=processing_time_seconds,
+                width=1,
+                last_modified_date=start_time,
+                upload_date=start_time,
+            )
+            for processing_time_seconds in (10, 20, 30)
+        ]
+        database = VuforiaDatabase(targets=set(targets))
+
+        with freeze_time(start_time + timedelta(seconds=40)):
+            _assert_target_counts(
+                database=database,
+                active=3,
+                inactive=0,
+                failed=0,
+                processing=0,
+            )
+
+        with freeze_time(start_time + timedelta(seconds=15)):
+            _assert_target_counts(
+                database=database,
+                active=1,
+                inactive=0,
+                failed=0,
+                processing=2,
+            )
+            assert database.active_targets == {targets[0]}
+
+        with freeze_time(start_time + timedelta(seconds=5)):
+            _assert_target_counts(
+                database=database,
+                active=0,
+                inactive=0,
+                failed=0,
+                processing=3,
+            )
+
+        with freeze_time(start_time + timedelta(seconds=25)):
+            _assert_target_counts(
+                database=database,
+                active=2,
+                inactive=0,
+                failed=0,
+                processing=1,
+            )
+            assert database.processing_targets == {targets[2]}
+
 
 class TestDatabaseToDict:
     """
@@ -452,6 +1458,103 @@ class TestDatabaseToDict:
         assert new_database == database
 
 
+class TestTargetManagerSnapshot:
+    """
+    Tests for saving a target manager to a snapshot file and loading it.
+    """
+
+    def test_save_and_load(
+        self,
+        high_quality_image: io.BytesIO,
+        tmp_path: Path,
+    ) -> None:
+        """
+        A target manager can be saved and loaded again with the same
+        databases and targets.
+        """
+        image_value = high_quality_image.getvalue()
+        image_store = ImageStore(directory=tmp_path / 'images')
+        database = VuforiaDatabase(
+            targets={
+                Target(
+                    name='example',
+                    active_flag=True,
+                    width=1,
+                    image_value=image_value,
+                    processing_time_seconds=0,
+                    application_metadata='bWV0YWRhdGE=',
+                ),
+                Target(
+                    name='example_stored',
+                    active_flag=False,
+                    width=2.5,
+                    image_value=image_store.add(image_value=image_value),
+                    processing_time_seconds=0.5,
+                    application_metadata=None,
+                    delete_date=datetime.now(tz=ZoneInfo('GMT')),
+                ),
+            },
+        )
+        other_database = VuforiaDatabase(state=States.PROJECT_INACTIVE)
+        target_manager = TargetManager()
+        target_manager.add_database(database=database)
+        target_manager.add_database(database=other_database)
+
+        snapshot_path = tmp_path / 'snapshot'
+        target_manager.save(path=snapshot_path)
+        # The image is saved once, without base64 encoding.
+        assert snapshot_path.stat().st_size < 2 * len(image_value)
+
+        new_target_manager = TargetManager.load(path=snapshot_path)
+        loaded_databases = {
+            loaded_database.database_name: loaded_database
+            for loaded_database in new_target_manager.databases
+        }
+        assert loaded_databases[other_database.database_name] == (
+            other_database
+        )
+        loaded_database = loaded_databases[database.database_name]
+        assert loaded_database.server_secret_key == database.server_secret_key
+        assert len(loaded_database.targets) == len(database.targets)
+        # Images are not loaded into memory, so we compare the targets as
+        # dictionaries.
+        for target in database.targets:
+            loaded_target = loaded_database.get_target(
+                target_id=target.target_id,
+            )
+            assert isinstance(loaded_target.image_value, MappedImage)
+            assert loaded_target.to_dict() == target.to_dict()
+
+        # A loaded target manager can be saved over the snapshot which its
+        # images are read from.
+        new_target_manager.save(path=snapshot_path)
+        for target in database.targets:
+            loaded_target = loaded_database.get_target(
+                target_id=target.target_id,
+            )
+            assert loaded_target.image_bytes == image_value
+        reloaded_target_manager = TargetManager.load(path=snapshot_path)
+        reloaded_database = reloaded_target_manager.get_database_by_name(
+            database_name=database.database_name,
+        )
+        assert reloaded_database is not None
+        for target in database.targets:
+            reloaded_target = reloaded_database.get_target(
+                target_id=target.target_id,
+            )
+            assert reloaded_target.to_dict() == target.to_dict()
+
+    def test_not_a_snapshot(self, tmp_path: Path) -> None:
+        """
+        An error is raised when loading a file which is not a snapshot.
+        """
+        path = tmp_path / 'not_a_snapshot'
+        path.write_bytes(b'{}' * 100)
+        expected = f'"{path}" is not a snapshot file.'
+        with pytest.raises(ValueError, match=expected):
+            TargetManager.load(path=path)
+
+
 class TestDateHeader:
     """
     Tests for the date header in responses from mock routes.
@@ -474,6 +1577,72 @@ class TestDateHeader:
         assert year == new_year
 
 
+class TestThreads:
+    """
+    Tests for using the mock from several threads.
+    """
+
+    def test_concurrent_changes(self, high_quality_image: io.BytesIO) -> None:
+        """
+        Targets can be added, updated and deleted from several threads at
+        once, and a name can only be used once.
+        """
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        image_value = high_quality_image.getvalue()
+
+        def add_target(name: str) -> str:
+            """
+            Add a target with the given name.
+            """
+            return vws_client.add_target(
+                name=name,
+                width=1,
+                image=io.BytesIO(image_value),
+                active_flag=True,
+                application_metadata=None,
+            )
+
+        def update_and_delete_target(target_id: str) -> None:
+            """
+            Update a target and then delete it.
+            """
+            vws_client.wait_for_target_processed(target_id=target_id)
+            vws_client.update_target(
+                target_id=target_id,
+                name=target_id,
+            )
+            vws_client.wait_for_target_processed(target_id=target_id)
+            vws_client.delete_target(target_id=target_id)
+
+        names = [f'example_{index}' for index in range(32)]
+        with MockVWS(processing_time_seconds=0.1) as mock:
+            mock.add_database(database=database)
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                target_ids = list(executor.map(add_target, names))
+                list(executor.map(update_and_delete_target, target_ids))
+                same_name_futures = [
+                    executor.submit(add_target, 'same_name') for _ in range(8)
+                ]
+            same_name_results = [
+                future.exception() for future in same_name_futures
+            ]
+
+        assert len(set(target_ids)) == len(names)
+        assert len(database.targets) == len(names) + 1
+        for target_id in target_ids:
+            target = database.get_target(target_id=target_id)
+            assert target.name == target_id
+            assert target.delete_date is not None
+        # Only one request to add a target with the same name succeeded.
+        assert same_name_results.count(None) == 1
+        for result in same_name_results:
+            assert result is None or isinstance(result, TargetNameExist)
+
+
 class TestAddDatabase:
     """
     Tests for adding databases to the mock.
@@ -531,3 +1700,111 @@ class TestAddDatabase:
                     mock.add_database(database=bad_database)
 
                 assert str(exc.value) == expected_message
+
+    def test_multiple_databases(self, high_quality_image: io.BytesIO) -> None:
+        """
+        Requests are authenticated against the database with the given access
+        key when there are multiple databases.
+        """
+        databases = [VuforiaDatabase() for _ in range(3)]
+        with MockVWS() as mock:
+            for database in databases:
+                mock.add_database(database=database)
+
+            for database in databases:
+                vws_client = VWS(
+                    server_access_key=database.server_access_key,
+                    server_secret_key=database.server_secret_key,
+                )
+                cloud_reco_client = CloudRecoService(
+                    client_access_key=database.client_access_key,
+                    client_secret_key=database.client_secret_key,
+                )
+                target_id = vws_client.add_target(
+                    name='example',
+                    width=1,
+                    image=high_quality_image,
+                    active_flag=True,
+                    application_metadata=None,
+                )
+                assert vws_client.list_targets() == [target_id]
+                assert cloud_reco_client.query(image=high_quality_image) == []
+
+            database = databases[0]
+            mismatched_client = VWS(
+                server_access_key=database.server_access_key,
+                server_secret_key=databases[1].server_secret_key,
+            )
+            with pytest.raises(AuthenticationFailure):
+                mismatched_client.list_targets()
+
+
+class TestRequestBodyParsing:
+    """
+    Tests for parsing the bodies of requests to the services endpoints.
+    """
+
+    def test_parsed_once(
+        self,
+        high_quality_image: io.BytesIO,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        The body of a request to add or update a target is parsed as JSON
+        once, and the image in it is decoded once.
+        """
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        image_value = high_quality_image.getvalue()
+        encoded_image = base64.b64encode(image_value).decode()
+        body_marker = 'parsed_once_example'
+        json_loads_calls = []
+        b64decode_calls = []
+        json_loads = json.loads
+        b64decode = base64.b64decode
+
+        def counting_json_loads(data: Any, **kwargs: Any) -> Any:
+            """
+            Record loading JSON which includes the target name.
+            """
+            text = data.decode() if isinstance(data, bytes) else data
+            if body_marker in text:
+                json_loads_calls.append(text)
+            return json_loads(data, **kwargs)
+
+        def counting_b64decode(data: Any, *args: Any, **kwargs: Any) -> bytes:
+            """
+            Record decoding the image.
+            """
+            if data[:100] == encoded_image[:100]:
+                b64decode_calls.append(data)
+            return b64decode(data, *args, **kwargs)
+
+        with MockVWS(processing_time_seconds=0) as mock:
+            mock.add_database(database=database)
+            monkeypatch.setattr(json, 'loads', counting_json_loads)
+            monkeypatch.setattr(base64, 'b64decode', counting_b64decode)
+            target_id = vws_client.add_target(
+                name=body_marker,
+                width=1,
+                image=io.BytesIO(image_value),
+                active_flag=True,
+                application_metadata=None,
+            )
+            assert len(json_loads_calls) == 1
+            assert len(b64decode_calls) == 1
+
+            monkeypatch.undo()
+            vws_client.wait_for_target_processed(target_id=target_id)
+            monkeypatch.setattr(json, 'loads', counting_json_loads)
+            monkeypatch.setattr(base64, 'b64decode', counting_b64decode)
+            vws_client.update_target(
+                target_id=target_id,
+                name=body_marker + '_updated',
+                image=io.BytesIO(image_value),
+            )
+            assert len(json_loads_calls) == 2
+            assert len(b64decode_calls) == 2